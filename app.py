@@ -8,10 +8,8 @@ TrailSync - Webアプリケーション
 Renderでのデプロイに対応しています。
 """
 
-import os
-import tempfile
 import base64
-from io import BytesIO
+import os
 from datetime import datetime
 import xml.etree.ElementTree as ET
 
@@ -21,14 +19,54 @@ from dash import dcc, html, callback, Input, Output, State
 import dash_bootstrap_components as dbc
 import pandas as pd
 import plotly.express as px
+from flask import abort, send_file
 
 # 改良版スクリプトのインポート
-from src.yamareco_to_runkeeper_improved import convert_gpx
+from src.yamareco_to_runkeeper_improved import convert_gpx, parse_gpx
+from src.trailsync.artifacts import ArtifactStore
+from src.trailsync.jobs import CANCELLED, SUCCEEDED, JobQueue, ProgressReader
+from src.trailsync.preview import DEFAULT_PAGE_SIZE, preview_index
+from src.trailsync.results import ResultCache, file_hash
+from src.trailsync.uploads import UploadStore
+from src.universal_gpx_converter.timestamps import parse_datetime
+from src.universal_gpx_converter.parser import GPXParser
+from src.universal_gpx_converter.stats import compute_statistics, format_statistics
 
 # Initialize the Dash app
-app = dash.Dash(__name__, title="TrailSync", external_stylesheets=[dbc.themes.BOOTSTRAP])
+# プレビューの操作部品は変換後に作成するため、レイアウトにないIDのコールバックを許可する
+app = dash.Dash(__name__, title="TrailSync", external_stylesheets=[dbc.themes.BOOTSTRAP],
+                suppress_callback_exceptions=True)
 server = app.server  # Expose the server for Render deployment
 
+# 変換結果はサーバー側に保存し、ダウンロードのルートから送信する
+artifacts = ArtifactStore()
+
+# アップロードは受け取った時点でサーバー側に保存し、ブラウザはセッションごとにIDのみを保持する
+# （変換し直す際にファイルを再送信せず、解析済みの文書も再利用する）
+uploads = UploadStore()
+
+# 同じ内容のファイルを同じオプションで変換した結果は、変換せずにキャッシュから返す
+results = ResultCache()
+
+# 変換はバックグラウンドのジョブとして実行し、進捗を一定間隔（ミリ秒）で問い合わせる
+jobs = JobQueue()
+JOB_POLL_INTERVAL = 500
+
+# 変換ジョブの各段階に割り当てる全体の進捗の範囲（進捗バーは段階が変わっても戻らない）
+JOB_STAGES = {
+    'parse': (0.0, 0.5),
+    'convert': (0.5, 1.0)
+}
+
+@server.route('/download/<artifact_id>')
+def download_artifact(artifact_id):
+    """保存した変換結果をファイルのまま送信（Content-Length・Content-Dispositionを付与）"""
+    artifact = artifacts.get(artifact_id)
+    if artifact is None:
+        abort(404)
+    return send_file(artifact.path, mimetype='application/gpx+xml', as_attachment=True,
+                     download_name=artifact.filename, max_age=0)
+
 # Define the layout
 app.layout = html.Div([
     html.H1("TrailSync", style={'textAlign': 'center', 'marginBottom': '30px'}),
@@ -38,6 +76,7 @@ app.layout = html.Div([
         
         # File Upload Status
         html.Div(id='upload-status', style={'marginBottom': '10px', 'color': 'blue'}),
+        dcc.Store(id='upload-id', storage_type='session'),
         
         # File Upload
         dcc.Upload(
@@ -163,30 +202,42 @@ app.layout = html.Div([
             'width': '100%'
         }),
         
-        # Status and Download
+        # Job progress, Status and Download
+        html.Div(id='job-container'),
         html.Div(id='conversion-status'),
         html.Div(id='download-container')
     ], style={'maxWidth': '800px', 'margin': '0 auto', 'padding': '20px', 'backgroundColor': '#f9f9f9', 'borderRadius': '10px'})
 ])
 
-# Callback for file upload status
+# Callback for file upload status (the upload is stored server-side and only its ID is kept in the browser)
 @app.callback(
-    Output('upload-status', 'children'),
+    [Output('upload-status', 'children'),
+     Output('upload-id', 'data')],
     [Input('upload-gpx', 'contents'),
      Input('upload-gpx', 'filename')]
 )
 def update_upload_status(contents, filename):
     if contents is not None:
-        return f"ファイルが選択されました: {filename}"
-    return ""
+        upload = uploads.add(filename or '', base64.b64decode(contents.split(',')[1]))
+        if upload is None:
+            return "ファイルを保存できませんでした。", None
+        status = f"ファイルが選択されました: {filename}"
+        
+        # 解析した文書は保持し、変換ではXMLを解析し直さずに再利用する
+        document = uploads.document(upload.id, load_upload)
+        if document:
+            status += (f"（サービス: {document['service']}、"
+                       f"期間: {document['start_time']} 〜 {document['end_time']}）")
+        return status, upload.id
+    return "", dash.no_update
 
-# Callback for file processing
+# Callback for file processing (the conversion runs as a background job and the request returns immediately)
 @app.callback(
     [Output('conversion-status', 'children'),
-     Output('download-container', 'children')],
+     Output('download-container', 'children'),
+     Output('job-container', 'children')],
     [Input('convert-button', 'n_clicks')],
-    [State('upload-gpx', 'contents'),
-     State('upload-gpx', 'filename'),
+    [State('upload-id', 'data'),
      State('activity-type', 'value'),
      State('track-name', 'value'),
      State('format-xml', 'value'),
@@ -195,24 +246,23 @@ def update_upload_status(contents, filename):
      State('add-metadata', 'value'),
      State('keep-source', 'value')]
 )
-def process_gpx(n_clicks, contents, filename, activity_type, track_name, format_xml, 
+def process_gpx(n_clicks, upload_id, activity_type, track_name, format_xml, 
                 coordinate_precision, elevation_adjustment, add_metadata, keep_source):
-    if n_clicks == 0 or contents is None:
-        return "", ""
+    if n_clicks == 0 or upload_id is None:
+        return "", "", ""
     
     try:
-        # Decode the file content
-        content_type, content_string = contents.split(',')
-        decoded = base64.b64decode(content_string)
-        
-        # Create a temporary file for the input
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.gpx') as temp_in:
-            temp_in.write(decoded)
-            input_path = temp_in.name
-        
-        # Create a temporary file for the output
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.gpx') as temp_out:
-            output_path = temp_out.name
+        upload = uploads.get(upload_id)
+        if upload is None:
+            return (
+                html.Div([
+                    html.H4("エラー", style={'color': 'red'}),
+                    html.P("アップロードしたファイルの保存期間が過ぎました。もう一度ファイルを選択してください。")
+                ]),
+                "",
+                ""
+            )
+        filename = upload.filename
         
         # Set options
         options = {
@@ -227,61 +277,14 @@ def process_gpx(n_clicks, contents, filename, activity_type, track_name, format_
         if track_name:
             options['track_name'] = track_name
         
-        # Convert the file using the improved converter
-        success = convert_gpx(input_path, output_path, **options)
-        
-        if success:
-            # Read the converted file
-            with open(output_path, 'r') as f:
-                converted_data = f.read()
-            
-            # Create a download link
-            b64 = base64.b64encode(converted_data.encode()).decode()
-            href = f"data:text/xml;base64,{b64}"
-            
-            # Clean up temporary files
-            os.unlink(input_path)
-            os.unlink(output_path)
-            
-            return (
-                html.Div([
-                    html.H4("変換成功", style={'color': 'green'}),
-                    html.P(f"ファイル '{filename}' を正常に変換しました。")
-                ]),
-                html.Div([
-                    html.H4("ダウンロード"),
-                    html.A(
-                        "変換されたGPXファイルをダウンロード",
-                        href=href,
-                        download="converted.gpx",
-                        style={
-                            'backgroundColor': '#008CBA',
-                            'color': 'white',
-                            'padding': '10px 20px',
-                            'textDecoration': 'none',
-                            'borderRadius': '4px',
-                            'display': 'inline-block',
-                            'marginBottom': '20px'
-                        }
-                    ),
-                    html.H4("プレビュー"),
-                    html.Div([
-                        html.Pre(converted_data, style={"max-height": "400px", "overflow": "auto"})
-                    ], style={"border": "1px solid #ddd", "padding": "10px", "borderRadius": "4px"})
-                ])
-            )
-        else:
-            # Clean up temporary files
-            os.unlink(input_path)
-            os.unlink(output_path)
-            
-            return (
-                html.Div([
-                    html.H4("変換失敗", style={'color': 'red'}),
-                    html.P("ファイルの変換中にエラーが発生しました。")
-                ]),
-                ""
-            )
+        job = jobs.submit(lambda job: run_conversion(job, upload, options), name=filename)
+        return "", "", html.Div([
+            dcc.Store(id='job-id', data=job.id),
+            dcc.Interval(id='job-poll', interval=JOB_POLL_INTERVAL),
+            html.P(f"ファイル '{filename}' を変換しています。", id='job-message'),
+            dbc.Progress(id='job-progress', value=0, label="0%", style={'marginBottom': '10px'}),
+            html.Button('キャンセル', id='job-cancel', n_clicks=0)
+        ], style={'marginTop': '20px'})
     
     except Exception as e:
         return (
@@ -289,8 +292,216 @@ def process_gpx(n_clicks, contents, filename, activity_type, track_name, format_
                 html.H4("エラー", style={'color': 'red'}),
                 html.P(f"エラーが発生しました: {str(e)}")
             ]),
+            "",
+            ""
+        )
+
+def load_upload(upload, job=None):
+    """アップロードを1回だけ解析し、変換に使う木とサービス・期間・元のファイルの統計の行を返す
+    
+    ジョブを指定した場合は読み込んだバイト数を進捗として報告する。結果はUploadStoreに保持し、
+    アップロード状況の表示と各変換で共有する。
+    """
+    with open(upload.path, 'rb') as f:
+        data = f.read()
+    if job is not None:
+        job.stage(*JOB_STAGES['parse'], "解析中")
+        data = ProgressReader(data, job)
+    tree = parse_gpx(data)
+    if tree is None:
+        return None
+    
+    # サービス・期間・統計は解析済みの木から列ごとに取り出して求める（XMLは解析し直さない）
+    parser = GPXParser()
+    gpx_data = parser.parse_file(tree, columnar=True)
+    if gpx_data is None:
+        return None
+    points = gpx_data['all_points']
+    return {
+        'tree': tree,
+        'service': parser.detect_service(gpx_data),
+        'start_time': points[0]['time'] if len(points) else None,
+        'end_time': points[-1]['time'] if len(points) else None,
+        'statistics': format_statistics(compute_statistics(points)) if len(points) else None
+    }
+
+def run_conversion(job, upload, options):
+    """変換ジョブ（ワーカースレッドで実行し、変換結果のIDと元のファイルの統計の行を返す）
+    
+    同じ内容・同じオプションの変換結果はキャッシュから取得し、同じアップロードの2回目以降は解析を省略する。
+    """
+    base_name = os.path.splitext(os.path.basename(upload.filename))[0] or 'converted'
+    filename = f"{base_name}_runkeeper.gpx"
+    
+    job.stage(*JOB_STAGES['parse'], "変換結果を検索中")
+    key = results.key(file_hash(upload.path), options)
+    cached = results.lookup(key)
+    if cached is not None:
+        artifact = artifacts.create(filename, lambda output: results.write(cached, output))
+        if artifact is not None:
+            return artifact.id, cached.metadata.get('statistics')
+    
+    document = uploads.document(upload.id, lambda upload: load_upload(upload, job))
+    if document is None:
+        return None, None
+    tree = document['tree']
+    
+    # Convert the parsed document using the improved converter (written directly to the server-side artifact)
+    # 一定数のトラックポイントごとに進捗を報告し、キャンセルされた場合は変換を中断する
+    job.stage(*JOB_STAGES['convert'], "変換中")
+    artifact = artifacts.create(filename, lambda output: convert_gpx(tree, output, progress=job.report, **options))
+    if artifact is None:
+        return None, None
+    
+    results.store(key, artifact.path, {'statistics': document['statistics']})
+    return artifact.id, document['statistics']
+
+def render_result(filename, artifact, statistics_lines):
+    """変換結果（状態とダウンロード・プレビュー）の表示"""
+    if artifact is None:
+        return (
+            html.Div([
+                html.H4("変換失敗", style={'color': 'red'}),
+                html.P("ファイルの変換中にエラーが発生しました。")
+            ]),
             ""
         )
+    
+    # The callback returns only a link to the download route
+    href = app.get_relative_path(f"/download/{artifact.id}")
+    # Preview only the header and the first page of trackpoints
+    preview = preview_index(artifact.path).page(0)
+    
+    statistics = []
+    if statistics_lines:
+        statistics = [html.Pre("\n".join(statistics_lines))]
+    
+    return (
+        html.Div([
+            html.H4("変換成功", style={'color': 'green'}),
+            html.P(f"ファイル '{filename}' を正常に変換しました。")
+        ] + statistics),
+        html.Div([
+            html.H4("ダウンロード"),
+            html.A(
+                f"変換されたGPXファイルをダウンロード（{artifact.size:,}バイト）",
+                href=href,
+                download=artifact.filename,
+                style={
+                    'backgroundColor': '#008CBA',
+                    'color': 'white',
+                    'padding': '10px 20px',
+                    'textDecoration': 'none',
+                    'borderRadius': '4px',
+                    'display': 'inline-block',
+                    'marginBottom': '20px'
+                }
+            ),
+            html.H4("プレビュー"),
+            dcc.Store(id='preview-artifact', data=artifact.id),
+            dcc.Store(id='preview-page', data=preview.page),
+            html.Div([
+                html.Button('前へ', id='preview-prev', n_clicks=0),
+                html.Button('次へ', id='preview-next', n_clicks=0, style={'marginLeft': '5px'}),
+                dcc.Input(id='preview-time', type='text', placeholder='例: 2025-01-31T08:00:00Z',
+                          style={'marginLeft': '15px'}),
+                html.Button('この時間へ移動', id='preview-jump', n_clicks=0, style={'marginLeft': '5px'}),
+                html.Span(preview_status(preview), id='preview-status', style={'marginLeft': '15px'})
+            ], style={'marginBottom': '10px'}),
+            html.Div([
+                html.Pre(preview.text, id='preview-content', style={"max-height": "400px", "overflow": "auto"})
+            ], style={"border": "1px solid #ddd", "padding": "10px", "borderRadius": "4px"})
+        ])
+    )
+
+# Callback for job progress (polled until the job finishes)
+@app.callback(
+    [Output('conversion-status', 'children', allow_duplicate=True),
+     Output('download-container', 'children', allow_duplicate=True),
+     Output('job-container', 'children', allow_duplicate=True),
+     Output('job-progress', 'value'),
+     Output('job-progress', 'label'),
+     Output('job-message', 'children')],
+    [Input('job-poll', 'n_intervals')],
+    [State('job-id', 'data')],
+    prevent_initial_call=True
+)
+def poll_job(n_intervals, job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return (
+            html.Div([
+                html.H4("エラー", style={'color': 'red'}),
+                html.P("変換ジョブが見つかりません。もう一度変換してください。")
+            ]),
+            "", "", dash.no_update, dash.no_update, dash.no_update
+        )
+    
+    if not job.done:
+        percent = round(job.progress * 100)
+        return (dash.no_update, dash.no_update, dash.no_update, percent, f"{percent}%",
+                f"ファイル '{job.name}' を{job.message or '変換待ち'}です。")
+    
+    if job.state == SUCCEEDED:
+        artifact_id, statistics_lines = job.result
+        status, download = render_result(job.name, artifacts.get(artifact_id) if artifact_id else None,
+                                         statistics_lines)
+    elif job.state == CANCELLED:
+        status, download = html.Div([html.H4("キャンセル"), html.P("変換をキャンセルしました。")]), ""
+    else:
+        status, download = html.Div([
+            html.H4("エラー", style={'color': 'red'}),
+            html.P(f"エラーが発生しました: {job.error}")
+        ]), ""
+    return status, download, "", dash.no_update, dash.no_update, dash.no_update
+
+# Callback for job cancellation (the job stops at its next progress report)
+@app.callback(
+    Output('job-cancel', 'disabled'),
+    [Input('job-cancel', 'n_clicks')],
+    [State('job-id', 'data')],
+    prevent_initial_call=True
+)
+def cancel_job(n_clicks, job_id):
+    return jobs.cancel(job_id) or dash.no_update
+
+def preview_status(preview):
+    """プレビューの表示範囲"""
+    return (f"{preview.page + 1} / {preview.pages}ページ"
+            f"（{preview.start + 1}〜{preview.end} / {preview.count}ポイント）")
+
+# Callback for preview paging (only the requested page is read and sent)
+@app.callback(
+    [Output('preview-content', 'children'),
+     Output('preview-status', 'children'),
+     Output('preview-page', 'data')],
+    [Input('preview-prev', 'n_clicks'),
+     Input('preview-next', 'n_clicks'),
+     Input('preview-jump', 'n_clicks')],
+    [State('preview-artifact', 'data'),
+     State('preview-page', 'data'),
+     State('preview-time', 'value')],
+    prevent_initial_call=True
+)
+def page_preview(prev_clicks, next_clicks, jump_clicks, artifact_id, page, jump_time):
+    artifact = artifacts.get(artifact_id)
+    if artifact is None:
+        return dash.no_update, "変換結果の保存期間が過ぎました。もう一度変換してください。", page
+    
+    index = preview_index(artifact.path)
+    trigger = dash.callback_context.triggered[0]['prop_id'].split('.')[0]
+    if trigger == 'preview-prev':
+        page -= 1
+    elif trigger == 'preview-next':
+        page += 1
+    elif jump_time:
+        try:
+            page = index.find_time(parse_datetime(jump_time.strip())) // DEFAULT_PAGE_SIZE
+        except ValueError:
+            return dash.no_update, f"時間を解析できません: {jump_time}", page
+    
+    preview = index.page(page)
+    return preview.text, preview_status(preview), preview.page
 
 if __name__ == "__main__":
     app.run_server(debug=True)
\ No newline at end of file
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+GPXパーサーのベンチマーク
+
+tests/test_dataのGPXファイルのトラックポイントを複製して拡大したファイルを作成し、
+トラックポイント1点あたりの解析時間を計測します。
+変更前の実装（baseline_parser.py、要素ごとに修飾名を組み立て、子孫要素を探索する方式）と
+現在の実装（修飾名を事前に作成し、子要素を1回だけ走査する方式）を、トラックの解析部分と
+ファイル全体の解析（parse_file）のそれぞれで比較します。
+
+使用方法:
+    python benchmarks/bench_parser.py --points 200000 --repeat 3
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from benchmarks.baseline_parser import GPXParser as BaselineGPXParser
+from src.universal_gpx_converter.parser import GPXParser
+
+TEST_DATA_DIR = Path(__file__).parent.parent / "tests" / "test_data"
+SAMPLE_FILES = ['yamareco.gpx', 'strava.gpx', 'runkeeper.gpx']
+
+
+def scale_gpx(source: Path, points: int, output_dir: str) -> str:
+    """トラックポイントを複製して指定した点数以上のGPXファイルを作成"""
+    text = source.read_text(encoding='utf-8')
+    start = text.index('<trkpt')
+    end = text.rindex('</trkpt>') + len('</trkpt>')
+    body = text[start:end]
+    copies = -(-points // body.count('<trkpt'))
+
+    output_file = os.path.join(output_dir, f"{source.stem}_x{copies}.gpx")
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(text[:start])
+        for _ in range(copies):
+            f.write(body)
+            f.write('\n')
+        f.write(text[end:])
+    return output_file
+
+
+def best_of(repeat: int, func) -> float:
+    """repeat回実行した中で最短の実行時間（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """メイン関数"""
+    arg_parser = argparse.ArgumentParser(description='GPXパーサーの1点あたりの解析時間を計測します')
+    arg_parser.add_argument('--points', type=int, default=200000, help='拡大後のトラックポイント数（目安）')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='計測の繰り返し回数')
+    args = arg_parser.parse_args()
+
+    parser = GPXParser()
+    baseline = BaselineGPXParser()
+
+    # トラックの解析（tracks）とファイル全体の解析（parse_file）のそれぞれで変更前・変更後を比較
+    print(f"{'ファイル':<16}{'ポイント数':>10}{'tracks前':>12}{'tracks後':>12}{'比':>8}"
+          f"{'parse前':>12}{'parse後':>12}{'比':>8}{'columnar':>12}")
+    print('-' * 102)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name in SAMPLE_FILES:
+            file_path = scale_gpx(TEST_DATA_DIR / name, args.points, temp_dir)
+            root = ET.parse(file_path).getroot()
+            ns = parser._detect_namespaces(root)
+            count = sum(len(track['points']) for track in parser._parse_tracks(root, ns))
+
+            # トラック解析部分のみ（XMLの読み込みを除く）
+            legacy = best_of(args.repeat, lambda: baseline._parse_tracks(root, ns))
+            current = best_of(args.repeat, lambda: parser._parse_tracks(root, ns))
+
+            # ファイル全体の解析（XMLの読み込み・ソート・補完を含む）
+            legacy_whole = best_of(args.repeat, lambda: baseline.parse_file(file_path))
+            whole = best_of(args.repeat, lambda: parser.parse_file(file_path))
+            columnar = best_of(args.repeat, lambda: parser.parse_file(file_path, columnar=True))
+
+            def per_point(seconds):
+                return f"{seconds / count * 1e6:.2f}us"
+
+            print(f"{name:<16}{count:>10}{per_point(legacy):>12}{per_point(current):>12}"
+                  f"{legacy / current:>7.2f}x{per_point(legacy_whole):>12}{per_point(whole):>12}"
+                  f"{legacy_whole / whole:>7.2f}x{per_point(columnar):>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+変換結果の保存モジュール
+
+このモジュールは、Webアプリケーションの変換結果をサーバー側のディレクトリに保存し、
+推測できないIDで参照するArtifactStoreを提供します。変換結果をbase64のdata URIとして
+コールバックの応答に含める代わりに、IDを含むダウンロード用のURLのみを返し、
+ファイルはダウンロードのルートからディスクのまま送信します。
+
+保存先はディレクトリのみで管理するため、複数のワーカープロセスから同じ変換結果を
+参照できます。保存から一定時間が経過したもの、合計サイズの上限を超えた場合は
+古いものから削除します。
+"""
+
+import json
+import logging
+import os
+import re
+import secrets
+import tempfile
+import time
+from typing import Any, BinaryIO, Callable, NamedTuple, Optional
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# 変換結果の拡張子
+ARTIFACT_EXTENSION = '.gpx'
+
+# ダウンロード時のファイル名等を保存するファイルの拡張子
+METADATA_EXTENSION = '.json'
+
+# 変換結果の合計サイズの上限（デフォルト）
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# 変換結果を保持する時間（秒、デフォルト）
+DEFAULT_MAX_AGE = 60 * 60
+
+# IDの形式（secrets.token_urlsafe(16)）
+_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{22}\Z')
+
+
+class Artifact(NamedTuple):
+    """保存した変換結果"""
+    id: str
+    path: str
+    filename: str
+    size: int
+
+
+class ArtifactStore:
+    """変換結果をディレクトリに保存し、IDで参照するクラス"""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age: float = DEFAULT_MAX_AGE):
+        """初期化
+
+        Args:
+            directory: 保存先のディレクトリ（指定しない場合は一時ディレクトリ内、存在しない場合は作成）
+            max_bytes: 変換結果の合計サイズの上限（超えた場合は古いものから削除）
+            max_age: 変換結果を保持する時間（秒）
+        """
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'trailsync-artifacts')
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, artifact_id: str, extension: str = ARTIFACT_EXTENSION) -> str:
+        return os.path.join(self.directory, artifact_id + extension)
+
+    def create(self, filename: str, write: Callable[[BinaryIO], Any]) -> Optional[Artifact]:
+        """変換結果を書き込んで保存
+
+        Args:
+            filename: ダウンロード時のファイル名
+            write: 書き込み先のファイルオブジェクト（バイナリモード）を受け取り、
+                成功したかどうかを返す関数（変換関数等）
+
+        Returns:
+            Optional[Artifact]: 保存した変換結果（書き込みに失敗した場合はNone）
+        """
+        artifact_id = secrets.token_urlsafe(16)
+        # 書き込み途中のファイルを送信しないよう、一時ファイルに書いてから置き換える
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                success = write(f)
+            if not success:
+                self._remove(temp_path)
+                return None
+            with open(self._path(artifact_id, METADATA_EXTENSION), 'w', encoding='utf-8') as f:
+                json.dump({'filename': filename}, f, ensure_ascii=False)
+            os.replace(temp_path, self._path(artifact_id))
+        except Exception as e:
+            logger.error(f"変換結果を保存できませんでした: {e}")
+            self._remove(temp_path)
+            self._remove(self._path(artifact_id, METADATA_EXTENSION))
+            return None
+
+        self.evict()
+        return self.get(artifact_id)
+
+    def get(self, artifact_id: str) -> Optional[Artifact]:
+        """IDから変換結果を取得
+
+        Args:
+            artifact_id: createで保存した変換結果のID
+
+        Returns:
+            Optional[Artifact]: 変換結果（IDの形式が不正な場合・削除された場合はNone）
+        """
+        # IDはファイル名に使うため、形式が正しいもの以外は参照しない
+        if not isinstance(artifact_id, str) or not _ID_PATTERN.match(artifact_id):
+            return None
+
+        path = self._path(artifact_id)
+        try:
+            stat = os.stat(path)
+            with open(self._path(artifact_id, METADATA_EXTENSION), encoding='utf-8') as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - stat.st_mtime > self.max_age:
+            self.remove(artifact_id)
+            return None
+        return Artifact(artifact_id, path, metadata['filename'], stat.st_size)
+
+    def remove(self, artifact_id: str) -> None:
+        """変換結果を削除
+
+        Args:
+            artifact_id: 変換結果のID
+        """
+        if _ID_PATTERN.match(artifact_id):
+            self._remove(self._path(artifact_id))
+            self._remove(self._path(artifact_id, METADATA_EXTENSION))
+
+    def evict(self) -> None:
+        """保持する時間を過ぎたものと、合計サイズが上限を超えた分を古いものから削除"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(ARTIFACT_EXTENSION):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.name[:-len(ARTIFACT_EXTENSION)]))
+
+        expires = time.time() - self.max_age
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, artifact_id in sorted(entries):
+            if total <= self.max_bytes and mtime >= expires:
+                break
+            self.remove(artifact_id)
+            total -= size
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
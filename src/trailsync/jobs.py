@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+バックグラウンドジョブモジュール
+
+このモジュールは、Webアプリケーションの変換をリクエストのスレッドとは別に実行する
+JobQueueを提供します。ジョブは状態（待機中・実行中・成功・失敗・キャンセル）と
+進捗（0〜1）を持ち、リクエストはジョブのIDを受け取ってすぐに戻り、
+以降は進捗を問い合わせて結果を受け取ります。
+
+ジョブの表はプロセス内に保持するため、同じジョブの問い合わせは同じプロセスで
+受ける必要があります（gunicornのワーカープロセスは1つとし、並行性はスレッドで確保）。
+終了したジョブは保持時間が過ぎると表から削除します。
+"""
+
+import logging
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Union
+
+try:
+    from universal_gpx_converter.sources import BufferReader
+except ImportError:
+    # リポジトリのルートから src パッケージとして読み込まれた場合
+    from ..universal_gpx_converter.sources import BufferReader
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# ジョブの状態
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+# 終了した状態
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# 同時に実行するジョブ数（デフォルト）
+DEFAULT_WORKERS = 2
+
+# 終了したジョブを保持する時間（秒、デフォルト）
+DEFAULT_RETENTION = 60 * 60
+
+
+class JobCancelled(Exception):
+    """ジョブがキャンセルされた場合に進捗の報告で送出する例外"""
+
+
+class Job:
+    """バックグラウンドで実行するジョブ
+
+    実行する関数はジョブを引数に受け取り、report()で進捗を報告します。
+    キャンセルが要求されている場合、report()はJobCancelledを送出して処理を中断します。
+    複数の段階がある場合は、stage()で各段階に全体の進捗の範囲を割り当てます
+    （全体の進捗は段階が変わっても減りません）。
+    """
+
+    def __init__(self, job_id: str, name: str = ''):
+        """初期化
+
+        Args:
+            job_id: ジョブのID
+            name: ジョブの名前（表示用）
+        """
+        self.id = job_id
+        self.name = name
+        self.state = QUEUED
+        self.progress = 0.0
+        self.message = ''
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._stage = (0.0, 1.0)
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+
+    @property
+    def cancel_requested(self) -> bool:
+        """キャンセルが要求されているかどうか"""
+        return self._cancel.is_set()
+
+    @property
+    def done(self) -> bool:
+        """終了したかどうか"""
+        return self.state in FINISHED_STATES
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """終了するまで待つ
+
+        Args:
+            timeout: 待つ時間の上限（秒、指定しない場合は終了するまで）
+
+        Returns:
+            bool: 終了したかどうか
+        """
+        return self._finished.wait(timeout)
+
+    def stage(self, start: float, end: float, message: Optional[str] = None) -> None:
+        """以降に報告する進捗を全体の進捗のstart〜endに割り当てる
+
+        Args:
+            start: 段階の開始時の全体の進捗（0〜1）
+            end: 段階の終了時の全体の進捗（0〜1）
+            message: 段階の説明（指定しない場合は変更しない）
+
+        Raises:
+            JobCancelled: キャンセルが要求されている場合
+        """
+        self._stage = (start, end)
+        self.report(0, 1, message)
+
+    def report(self, done: float, total: float, message: Optional[str] = None) -> None:
+        """進捗を報告
+
+        Args:
+            done: 処理済みの量（バイト数、ポイント数等）
+            total: 全体の量
+            message: 処理中の段階の説明（指定しない場合は変更しない）
+
+        Raises:
+            JobCancelled: キャンセルが要求されている場合
+        """
+        if self._cancel.is_set():
+            raise JobCancelled()
+        if message is not None:
+            self.message = message
+        if total > 0:
+            start, end = self._stage
+            progress = start + (end - start) * min(max(done / total, 0.0), 1.0)
+            self.progress = max(self.progress, progress)
+
+    def status(self) -> Dict[str, Any]:
+        """状態の辞書（結果を除く）"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'state': self.state,
+            'progress': self.progress,
+            'message': self.message,
+            'error': self.error
+        }
+
+
+class ProgressReader(BufferReader):
+    """読み込んだバイト数をジョブの進捗として報告するファイルオブジェクト
+
+    ストリーミング変換で先頭から読み直せるよう、位置の変更に対応します。
+    """
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview], job: Job):
+        """初期化
+
+        Args:
+            data: 読み込むバイト列
+            job: 進捗を報告するジョブ
+        """
+        super().__init__(data)
+        self._job = job
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        base = (0, self._position, len(self._view))[whence]
+        self._position = min(max(base + offset, 0), len(self._view))
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def readinto(self, buffer: Any) -> int:
+        """バッファに読み込み、進捗を報告"""
+        size = super().readinto(buffer)
+        self._job.report(self._position, len(self._view))
+        return size
+
+
+class JobQueue:
+    """ジョブをスレッドプールで実行し、IDで状態を参照するクラス"""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, retention: float = DEFAULT_RETENTION):
+        """初期化
+
+        Args:
+            workers: 同時に実行するジョブ数
+            retention: 終了したジョブを保持する時間（秒）
+        """
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='trailsync-job')
+        self._jobs: Dict[str, Job] = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, task: Callable[[Job], Any], name: str = '') -> Job:
+        """ジョブを登録し、すぐに戻る
+
+        Args:
+            task: ジョブを引数に受け取り、結果を返す関数
+            name: ジョブの名前（表示用）
+
+        Returns:
+            Job: 登録したジョブ
+        """
+        self._prune()
+        job = Job(secrets.token_urlsafe(16), name)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._futures[job.id] = self._executor.submit(self._run, job, task)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """IDからジョブを取得
+
+        Args:
+            job_id: ジョブのID
+
+        Returns:
+            Optional[Job]: ジョブ（存在しない場合・削除された場合はNone）
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """ジョブのキャンセルを要求
+
+        待機中のジョブはすぐにキャンセルし、実行中のジョブは次に進捗を報告した時点で中断します。
+
+        Args:
+            job_id: ジョブのID
+
+        Returns:
+            bool: キャンセルを要求できたかどうか（終了したジョブ・存在しないジョブはFalse）
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            future = self._futures.get(job_id)
+        if job is None or job.done:
+            return False
+        job._cancel.set()
+        if future is not None and future.cancel():
+            self._finish(job, CANCELLED)
+        return True
+
+    def _run(self, job: Job, task: Callable[[Job], Any]) -> None:
+        """ジョブを実行（ワーカースレッドで実行）"""
+        if job.cancel_requested:
+            self._finish(job, CANCELLED)
+            return
+        job.state = RUNNING
+        try:
+            result = task(job)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+            return
+        except Exception as e:
+            logger.error(f"ジョブ '{job.name or job.id}' でエラーが発生しました: {e}")
+            job.error = str(e)
+            self._finish(job, CANCELLED if job.cancel_requested else FAILED)
+            return
+        if job.cancel_requested:
+            # 進捗を報告しない処理の途中でキャンセルされた場合
+            self._finish(job, CANCELLED)
+            return
+        job.result = result
+        job.progress = 1.0
+        self._finish(job, SUCCEEDED)
+
+    def _finish(self, job: Job, state: str) -> None:
+        job.finished = time.time()
+        job.state = state
+        with self._lock:
+            self._futures.pop(job.id, None)
+        job._finished.set()
+
+    def _prune(self) -> None:
+        """保持する時間を過ぎた終了したジョブを削除"""
+        expires = time.time() - self.retention
+        with self._lock:
+            for job_id in [job.id for job in self._jobs.values() if job.done and job.finished < expires]:
+                del self._jobs[job_id]
+
+    def shutdown(self, wait: bool = True) -> None:
+        """待機中のジョブをキャンセルし、スレッドプールを終了
+
+        Args:
+            wait: 実行中のジョブの終了を待つかどうか
+        """
+        with self._lock:
+            job_ids = list(self._jobs)
+        for job_id in job_ids:
+            self.cancel(job_id)
+        self._executor.shutdown(wait=wait)
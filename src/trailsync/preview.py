@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+変換結果のプレビューモジュール
+
+このモジュールは、保存した変換結果（GPXファイル）をページに分けて表示するための
+PreviewIndexを提供します。ファイルを1回走査して各トラックポイント要素の開始位置のみを
+記録し、各ページではヘッダーと指定した範囲のトラックポイントの部分だけを読み込むため、
+応答の大きさはファイルの大きさによらずページの点数で決まります。
+
+時間の指定による移動は、トラックポイントが時間順に並んでいることを前提に、
+二分探索で必要な点の時間のみを読み込みます。
+"""
+
+import logging
+import mmap
+import os
+import re
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+try:
+    from universal_gpx_converter.timestamps import parse_datetime
+except ImportError:
+    # リポジトリのルートから src パッケージとして読み込まれた場合
+    from ..universal_gpx_converter.timestamps import parse_datetime
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# 1ページのトラックポイント数（デフォルト）
+DEFAULT_PAGE_SIZE = 100
+
+# 表示するヘッダーの上限（バイト）
+MAX_HEADER_BYTES = 16 * 1024
+
+# 索引を保持するファイル数
+INDEX_CACHE_SIZE = 8
+
+# トラックポイント要素の開始タグ・終了タグ
+_TRKPT_PATTERN = re.compile(rb'<trkpt[\s/>]')
+_TRKSEG_END = b'</trkseg>'
+_TIME_PATTERN = re.compile(rb'<time>([^<]*)</time>')
+
+
+class PreviewPage(NamedTuple):
+    """プレビューの1ページ"""
+    text: str
+    page: int
+    pages: int
+    start: int
+    end: int
+    count: int
+
+
+def _to_utc(value: datetime) -> datetime:
+    """タイムゾーンのない時間をUTCとみなす"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class PreviewIndex:
+    """GPXファイルのトラックポイント要素の位置の索引"""
+
+    def __init__(self, path: str):
+        """初期化（ファイルを走査して索引を作成）
+
+        Args:
+            path: GPXファイルのパス
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                starts = np.zeros(0, dtype=np.int64)
+                end = 0
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    starts = np.fromiter((match.start() for match in _TRKPT_PATTERN.finditer(data)),
+                                         dtype=np.int64)
+                    # 最後のトラックポイントはトラックセグメントの終了タグまで
+                    end = data.rfind(_TRKSEG_END, int(starts[-1])) if len(starts) else -1
+                    end = size if end < 0 else end
+        self.size = size
+        # offsets[i]からoffsets[i + 1]までがi番目のトラックポイント
+        self.offsets = np.append(starts, end)
+        self.header_end = int(starts[0]) if len(starts) else size
+
+    @property
+    def count(self) -> int:
+        """トラックポイント数"""
+        return len(self.offsets) - 1
+
+    def _read_bytes(self, start: int, end: int) -> bytes:
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            return f.read(max(end - start, 0))
+
+    def _read(self, start: int, end: int) -> str:
+        return self._read_bytes(start, end).decode('utf-8', errors='replace')
+
+    def header(self) -> str:
+        """最初のトラックポイントまでの部分（上限はMAX_HEADER_BYTES）"""
+        text = self._read(0, min(self.header_end, MAX_HEADER_BYTES))
+        if self.header_end > MAX_HEADER_BYTES:
+            text += "\n<!-- ヘッダーの残りは省略 -->\n"
+        return text
+
+    def trackpoints(self, start: int, end: int) -> str:
+        """start番目からend番目の手前までのトラックポイント要素の文字列"""
+        start = max(0, min(start, self.count))
+        end = max(start, min(end, self.count))
+        return self._read(int(self.offsets[start]), int(self.offsets[end]))
+
+    def footer(self) -> str:
+        """最後のトラックポイントより後の部分"""
+        return self._read(int(self.offsets[-1]), self.size)
+
+    def point_time(self, index: int) -> Optional[datetime]:
+        """index番目のトラックポイントの時間（ない場合・解析できない場合はNone）"""
+        match = _TIME_PATTERN.search(self._read_bytes(int(self.offsets[index]), int(self.offsets[index + 1])))
+        if not match:
+            return None
+        try:
+            return _to_utc(parse_datetime(match.group(1).decode('utf-8').strip()))
+        except ValueError:
+            return None
+
+    def find_time(self, value: datetime) -> int:
+        """指定した時間以降の最初のトラックポイントの番号を二分探索で求める
+
+        時間のないトラックポイントは直前の点と同じ時間とみなします。
+
+        Args:
+            value: 時間（タイムゾーンのない場合はUTC）
+
+        Returns:
+            int: トラックポイントの番号（全ての点が指定した時間より前の場合はcount）
+        """
+        value = _to_utc(value)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            index = middle
+            point_time = self.point_time(index)
+            while point_time is None and index > 0:
+                index -= 1
+                point_time = self.point_time(index)
+            if point_time is not None and point_time < value:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def page(self, page: int, page_size: int = DEFAULT_PAGE_SIZE) -> PreviewPage:
+        """ヘッダーと指定したページのトラックポイントのみのプレビューを作成
+
+        Args:
+            page: ページ番号（0から、範囲外の場合は最初・最後のページ）
+            page_size: 1ページのトラックポイント数
+
+        Returns:
+            PreviewPage: プレビューのページ
+        """
+        pages = max(1, -(-self.count // page_size))
+        page = max(0, min(page, pages - 1))
+        start = page * page_size
+        end = min(start + page_size, self.count)
+
+        parts = [self.header()]
+        if start > 0:
+            parts.append(f"<!-- {start}ポイント省略 -->\n")
+        parts.append(self.trackpoints(start, end))
+        if end < self.count:
+            parts.append(f"\n<!-- {self.count - end}ポイント省略 -->")
+        else:
+            parts.append(self.footer())
+        return PreviewPage(''.join(parts), page, pages, start, end, self.count)
+
+
+@lru_cache(maxsize=INDEX_CACHE_SIZE)
+def _load_index(path: str, size: int, mtime: float) -> PreviewIndex:
+    return PreviewIndex(path)
+
+
+def preview_index(path: str) -> PreviewIndex:
+    """GPXファイルの索引を取得（同じファイルの索引は再利用）
+
+    Args:
+        path: GPXファイルのパス
+
+    Returns:
+        PreviewIndex: 索引
+    """
+    stat = os.stat(path)
+    return _load_index(path, stat.st_size, stat.st_mtime)
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+変換結果キャッシュモジュール
+
+このモジュールは、Webアプリケーションの変換結果を入力の内容のハッシュと正規化した
+変換オプションをキーとして保持するResultCacheを提供します。同じファイルを同じオプションで
+変換し直す場合は、変換関数を呼ばずにキャッシュの内容を出力に書き込みます。
+
+変換結果はメモリとディレクトリの2段で保持し、それぞれ合計サイズの上限を超えた場合は
+最後に使われたものから順に残します（メモリは使われた順、ディレクトリは更新時刻）。
+変換結果と一緒に、表示用の情報（元のファイルの統計等）をJSONで保存できます。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, NamedTuple, Optional
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# キャッシュの形式のバージョン（キーに含める）
+CACHE_FORMAT_VERSION = '1'
+
+# 変換結果・表示用の情報の拡張子
+RESULT_EXTENSION = '.gpx'
+METADATA_EXTENSION = '.json'
+
+# ディレクトリに保存する変換結果の合計サイズの上限（デフォルト）
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# メモリに保持する変換結果の合計サイズの上限（デフォルト）
+DEFAULT_MAX_MEMORY_BYTES = 64 * 1024 * 1024
+
+# キーに含める変換オプションとデフォルト値（yamareco_to_runkeeper_improved.convert_gpxと同じ）
+CACHE_OPTIONS = {
+    'activity_type': 'hiking',
+    'coordinate_precision': 6,
+    'elevation_adjustment': 5.2,
+    'format_xml': True,
+    'add_metadata': True,
+    'keep_source': True,
+    'track_name': None
+}
+
+# ハッシュを計算する際の読み込みサイズ
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_hash(path: str) -> str:
+    """ファイルの内容のハッシュ（16進数のSHA-256）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def normalize_options(options: Dict[str, Any]) -> Dict[str, Any]:
+    """キーに含める変換オプションを正規化
+
+    指定されていないオプションはデフォルト値とし、値は変換結果が同じになるものが
+    同じ値になるよう型を揃えます（空のトラック名は指定なしと同じ）。
+
+    Args:
+        options: convert_gpxに渡す変換オプション
+
+    Returns:
+        Dict[str, Any]: 正規化した変換オプション
+    """
+    normalized = {name: options.get(name, default) for name, default in CACHE_OPTIONS.items()}
+    normalized['activity_type'] = str(normalized['activity_type'] or '')
+    normalized['coordinate_precision'] = int(normalized['coordinate_precision'])
+    normalized['elevation_adjustment'] = float(normalized['elevation_adjustment'])
+    for name in ('format_xml', 'add_metadata', 'keep_source'):
+        normalized[name] = bool(normalized[name])
+    normalized['track_name'] = normalized['track_name'] or None
+    return normalized
+
+
+class CachedResult(NamedTuple):
+    """キャッシュにある変換結果"""
+    path: str
+    metadata: Dict[str, Any]
+    data: Optional[bytes] = None
+
+
+class ResultCache:
+    """変換結果をメモリとディレクトリに保持するキャッシュ"""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES):
+        """初期化
+
+        Args:
+            directory: 保存先のディレクトリ（指定しない場合は一時ディレクトリ内、存在しない場合は作成）
+            max_bytes: ディレクトリに保存する変換結果の合計サイズの上限
+            max_memory_bytes: メモリに保持する変換結果の合計サイズの上限（0の場合はメモリに保持しない）
+        """
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'trailsync-results')
+        self.max_bytes = max_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, content_hash: str, options: Dict[str, Any]) -> str:
+        """入力の内容のハッシュと変換オプションからキーを作成
+
+        Args:
+            content_hash: 入力の内容のハッシュ（file_hash等）
+            options: convert_gpxに渡す変換オプション
+
+        Returns:
+            str: キー（16進数のSHA-256）
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{CACHE_FORMAT_VERSION}:{content_hash}:".encode('ascii'))
+        digest.update(json.dumps(normalize_options(options), sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key: str, extension: str = RESULT_EXTENSION) -> str:
+        return os.path.join(self.directory, key + extension)
+
+    def lookup(self, key: str) -> Optional[CachedResult]:
+        """キャッシュの変換結果を検索（ヒット・ミスの回数を数える）
+
+        Args:
+            key: keyで作成したキー
+
+        Returns:
+            Optional[CachedResult]: 変換結果のパスと保存時に指定した表示用の情報
+                （メモリにある場合は内容も含む、キャッシュにない場合はNone）
+        """
+        path = self._path(key)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+        if entry is not None:
+            return CachedResult(path, entry[1], entry[0])
+
+        try:
+            with open(self._path(key, METADATA_EXTENSION), encoding='utf-8') as f:
+                metadata = json.load(f)
+            size = os.path.getsize(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # 最後に使われた時刻を更新（LRU）し、上限以下の大きさの場合はメモリにも保持
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.disk_hits += 1
+        data = None
+        if size <= self.max_memory_bytes:
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                pass
+            else:
+                self._remember(key, data, metadata)
+        return CachedResult(path, metadata, data)
+
+    def write(self, result: CachedResult, output: BinaryIO) -> bool:
+        """lookupで取得した変換結果を出力に書き込む
+
+        Args:
+            result: lookupで取得した変換結果
+            output: 書き込み先のファイルオブジェクト（バイナリモード）
+
+        Returns:
+            bool: 書き込めたかどうか（検索後にディレクトリから削除された場合はFalse）
+        """
+        if result.data is not None:
+            output.write(result.data)
+            return True
+        try:
+            with open(result.path, 'rb') as f:
+                shutil.copyfileobj(f, output)
+        except OSError:
+            return False
+        return True
+
+    def load(self, key: str, output: BinaryIO) -> Optional[Dict[str, Any]]:
+        """キャッシュの変換結果を出力に書き込む
+
+        Args:
+            key: keyで作成したキー
+            output: 書き込み先のファイルオブジェクト（バイナリモード）
+
+        Returns:
+            Optional[Dict[str, Any]]: 保存時に指定した表示用の情報（キャッシュにない場合はNone）
+        """
+        result = self.lookup(key)
+        if result is None or not self.write(result, output):
+            return None
+        return result.metadata
+
+    def store(self, key: str, path: str, metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """変換結果のファイルをキャッシュに保存し、上限を超えた場合は古いものを削除
+
+        Args:
+            key: keyで作成したキー
+            path: 変換結果のファイルのパス
+            metadata: 変換結果と一緒に保存する表示用の情報（JSONに変換できるもの）
+
+        Returns:
+            bool: 保存できたかどうか
+        """
+        metadata = metadata or {}
+        try:
+            with open(self._path(key, METADATA_EXTENSION), 'w', encoding='utf-8') as f:
+                json.dump(metadata, f, ensure_ascii=False)
+            # 書き込み途中のファイルを読み込まないよう、一時ファイルに書いてから置き換える
+            fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+            try:
+                with os.fdopen(fd, 'wb') as f, open(path, 'rb') as source:
+                    shutil.copyfileobj(source, f)
+                os.replace(temp_path, self._path(key))
+            except BaseException:
+                self._remove(temp_path)
+                raise
+        except Exception as e:
+            logger.warning(f"変換結果をキャッシュに保存できませんでした: {e}")
+            return False
+
+        if os.path.getsize(path) <= self.max_memory_bytes:
+            with open(path, 'rb') as f:
+                self._remember(key, f.read(), metadata)
+        self.evict()
+        return True
+
+    def _remember(self, key: str, data: bytes, metadata: Dict[str, Any]) -> None:
+        """メモリに保持し、合計サイズが上限を超えた分を最後に使われた時刻が古いものから削除"""
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous[0])
+            self._memory[key] = (data, metadata)
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.max_memory_bytes:
+                _, (evicted, _) = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def evict(self) -> None:
+        """ディレクトリの合計サイズが上限以下になるまで、最後に使われた時刻が古いものから削除"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(RESULT_EXTENSION):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.name[:-len(RESULT_EXTENSION)]))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(self._path(key))
+            self._remove(self._path(key, METADATA_EXTENSION))
+            total -= size
+
+    def statistics(self) -> Dict[str, int]:
+        """ヒット・ミスの回数とメモリに保持している変換結果の合計サイズ"""
+        with self._lock:
+            return {
+                'hits': self.memory_hits + self.disk_hits,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes
+            }
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
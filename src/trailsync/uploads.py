@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+アップロードの保存モジュール
+
+このモジュールは、Webアプリケーションにアップロードされたファイルを受け取った時点で
+サーバー側に保存し、推測できないIDで参照するUploadStoreを提供します。ブラウザはIDのみを
+（セッションごとに）保持するため、変換オプションを変えて変換し直す際にファイルを再送信しません。
+
+ファイルはArtifactStoreと同じくディレクトリに保存し、解析済みの文書は件数と推定した
+メモリ使用量の合計の上限を持つメモリ上のキャッシュに最後に使われた順で保持するため、
+同じアップロードの2回目以降の変換では解析も省略します。
+"""
+
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Union
+
+from .artifacts import Artifact, ArtifactStore
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# アップロードの合計サイズの上限（デフォルト）
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+# アップロードを保持する時間（秒、最後に使われてから、デフォルト）
+DEFAULT_MAX_AGE = 60 * 60
+
+# 解析済みの文書を保持する件数（デフォルト）
+DEFAULT_MAX_DOCUMENTS = 8
+
+# 解析済みの文書を保持するメモリ使用量（推定）の合計の上限（デフォルト）
+DEFAULT_MAX_DOCUMENT_BYTES = 128 * 1024 * 1024
+
+# 解析済みの文書（ElementTree）のメモリ使用量のファイルのサイズに対する倍率
+# （テストデータをtracemallocで計測すると6.5〜10.4倍、統計を含めて切り上げた値）
+DOCUMENT_SIZE_FACTOR = 12
+
+
+class UploadStore:
+    """アップロードをディレクトリに保存し、解析済みの文書をメモリ上に保持するクラス"""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age: float = DEFAULT_MAX_AGE, max_documents: int = DEFAULT_MAX_DOCUMENTS,
+                 max_document_bytes: int = DEFAULT_MAX_DOCUMENT_BYTES):
+        """初期化
+
+        Args:
+            directory: 保存先のディレクトリ（指定しない場合は一時ディレクトリ内、存在しない場合は作成）
+            max_bytes: アップロードの合計サイズの上限（超えた場合は古いものから削除）
+            max_age: アップロードを保持する時間（秒、最後に使われてから）
+            max_documents: 解析済みの文書を保持する件数
+            max_document_bytes: 解析済みの文書を保持するメモリ使用量の合計の上限
+                （各文書のメモリ使用量はファイルのサイズのDOCUMENT_SIZE_FACTOR倍と推定）
+        """
+        self.files = ArtifactStore(directory or os.path.join(tempfile.gettempdir(), 'trailsync-uploads'),
+                                   max_bytes, max_age)
+        self.max_documents = max_documents
+        self.max_document_bytes = max_document_bytes
+        self._documents = OrderedDict()
+        self._document_bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, filename: str, data: Union[bytes, bytearray, memoryview]) -> Optional[Artifact]:
+        """アップロードを保存
+
+        Args:
+            filename: アップロードされたファイル名
+            data: ファイルの内容
+
+        Returns:
+            Optional[Artifact]: 保存したアップロード（保存に失敗した場合はNone）
+        """
+        return self.files.create(filename, lambda f: f.write(data) is not None)
+
+    def get(self, upload_id: str) -> Optional[Artifact]:
+        """IDからアップロードを取得し、保持する時間を延長
+
+        Args:
+            upload_id: addで保存したアップロードのID
+
+        Returns:
+            Optional[Artifact]: アップロード（IDの形式が不正な場合・削除された場合はNone）
+        """
+        upload = self.files.get(upload_id)
+        if upload is None:
+            self._forget(upload_id)
+            return None
+        try:
+            os.utime(upload.path)
+        except OSError:
+            pass
+        return upload
+
+    def document(self, upload_id: str, load: Callable[[Artifact], Any]) -> Optional[Any]:
+        """アップロードの解析済みの文書を取得（保持していない場合は解析して保持）
+
+        Args:
+            upload_id: アップロードのID
+            load: アップロードを受け取り、解析した文書を返す関数（失敗した場合はNone）
+
+        Returns:
+            Optional[Any]: 解析済みの文書（アップロードが削除された場合・解析に失敗した場合はNone）
+        """
+        upload = self.get(upload_id)
+        if upload is None:
+            return None
+
+        with self._lock:
+            entry = self._documents.get(upload_id)
+            if entry is not None:
+                self._documents.move_to_end(upload_id)
+                return entry[1]
+
+        document = load(upload)
+        if document is None:
+            return None
+
+        with self._lock:
+            if upload_id not in self._documents:
+                size = upload.size * DOCUMENT_SIZE_FACTOR
+                self._documents[upload_id] = (size, document)
+                self._document_bytes += size
+            # 最後に使われた時刻が古いものから削除（今回の文書は残す）
+            while len(self._documents) > 1 and (len(self._documents) > self.max_documents
+                                                or self._document_bytes > self.max_document_bytes):
+                _, (size, _) = self._documents.popitem(last=False)
+                self._document_bytes -= size
+        return document
+
+    def remove(self, upload_id: str) -> None:
+        """アップロードと解析済みの文書を削除
+
+        Args:
+            upload_id: アップロードのID
+        """
+        self._forget(upload_id)
+        self.files.remove(upload_id)
+
+    def _forget(self, upload_id: str) -> None:
+        with self._lock:
+            entry = self._documents.pop(upload_id, None)
+            if entry is not None:
+                self._document_bytes -= entry[0]
@@ -0,0 +1,566 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ストリーミング統計モジュール
+
+このモジュールは、解析中のトラックポイントを文書順に受け取り、解析と同時に
+統計（ポイント数、範囲、時間の範囲、日付ごとのポイント数、距離、累積標高、
+移動時間、最高速度）を集計するStatisticsCollectorと、集計項目ごとの
+Accumulatorを提供します。
+
+トラックポイントは一定数（DEFAULT_BATCH_SIZE）ごとにまとめて数値に変換し、
+各Accumulatorは直前のまとまりから引き継ぐ状態のみを保持するため、
+ストリーミング解析でもメモリ使用量は一定です。集計結果の項目は
+stats.compute_statisticsと同じで、ファイル内の順序が時間順であれば同じ値になります。
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .sources import GPXSource
+from .stats import (DEFAULT_ELEVATION_HYSTERESIS, DEFAULT_MOVING_SPEED, DEFAULT_SPEED_WINDOW,
+                    _window_starts, cumulative_distance, hysteresis_filter, point_columns, _float_column)
+from .timestamps import NO_TIME, decode_timestamps
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# 数値に変換して集計するまでに溜めるトラックポイント数
+DEFAULT_BATCH_SIZE = 4096
+
+_SECONDS_PER_DAY = 86400
+
+
+def _to_datetime(seconds: Optional[int]) -> Optional[datetime]:
+    return None if seconds is None else datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+
+def _add_by_day(totals: Dict[int, float], days: np.ndarray, values: np.ndarray) -> None:
+    """日付（1970-01-01からの日数）ごとにvaluesを合計してtotalsに加算"""
+    if not len(days):
+        return
+    unique_days, index = np.unique(days, return_inverse=True)
+    sums = np.bincount(index, weights=values, minlength=len(unique_days))
+    for day, value in zip(unique_days.tolist(), sums.tolist()):
+        totals[day] = totals.get(day, 0.0) + value
+
+
+class PointBatch:
+    """集計に渡すトラックポイントのまとまり（文書順）
+
+    lat/lon/eleはfloat64（欠損はNaN）、timeはUNIX時間（秒）のint64（欠損はNO_TIME）です。
+    累積距離と時間のある点は、最初に参照された時点で計算します。
+    """
+
+    __slots__ = ('lat', 'lon', 'ele', 'time', '_previous', '_distance', '_timed')
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, ele: np.ndarray, time: np.ndarray,
+                 previous: Optional[Tuple[float, float, float]] = None):
+        """初期化
+
+        Args:
+            lat, lon, ele, time: 各列
+            previous: 直前のまとまりの最後の点の(緯度, 経度, 累積距離)
+        """
+        self.lat = lat
+        self.lon = lon
+        self.ele = ele
+        self.time = time
+        self._previous = previous
+        self._distance = None
+        self._timed = None
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    @property
+    def distance(self) -> np.ndarray:
+        """各点までの累積距離（最初のまとまりの最初の点から、メートル）"""
+        if self._distance is None:
+            if self._previous is None:
+                self._distance = cumulative_distance(self.lat, self.lon)
+            else:
+                lat, lon, start = self._previous
+                self._distance = cumulative_distance(np.concatenate([[lat], self.lat]),
+                                                     np.concatenate([[lon], self.lon]))[1:] + start
+        return self._distance
+
+    @property
+    def timed(self) -> np.ndarray:
+        """時間が記録されている点のインデックス"""
+        if self._timed is None:
+            self._timed = np.flatnonzero(self.time != NO_TIME)
+        return self._timed
+
+
+class Accumulator:
+    """ストリーミング集計の基底クラス
+
+    update()にはトラックポイントのまとまりが文書順に渡されます。
+    result()は集計結果の辞書、day_results()は日付（1970-01-01からの日数）ごとの
+    集計結果の辞書を返します。
+    """
+
+    def update(self, batch: PointBatch) -> None:
+        """トラックポイントのまとまりを集計
+
+        Args:
+            batch: トラックポイントのまとまり
+        """
+        raise NotImplementedError
+
+    def result(self) -> Dict[str, Any]:
+        """集計結果"""
+        return {}
+
+    def day_results(self) -> Dict[int, Dict[str, Any]]:
+        """日付ごとの集計結果"""
+        return {}
+
+
+class PointCount(Accumulator):
+    """ポイント数"""
+
+    def __init__(self):
+        """初期化"""
+        self.points = 0
+
+    def update(self, batch: PointBatch) -> None:
+        self.points += len(batch)
+
+    def result(self) -> Dict[str, Any]:
+        return {'points': self.points}
+
+
+class BoundingBox(Accumulator):
+    """緯度・経度の範囲"""
+
+    def __init__(self):
+        """初期化"""
+        self.bounds = None
+
+    def update(self, batch: PointBatch) -> None:
+        valid = ~(np.isnan(batch.lat) | np.isnan(batch.lon))
+        if not valid.any():
+            return
+        lat = batch.lat[valid]
+        lon = batch.lon[valid]
+        bounds = [float(lat.min()), float(lon.min()), float(lat.max()), float(lon.max())]
+        if self.bounds is not None:
+            bounds = [min(bounds[0], self.bounds[0]), min(bounds[1], self.bounds[1]),
+                      max(bounds[2], self.bounds[2]), max(bounds[3], self.bounds[3])]
+        self.bounds = bounds
+
+    def result(self) -> Dict[str, Any]:
+        if self.bounds is None:
+            return {'bounds': None}
+        return {'bounds': dict(zip(('min_lat', 'min_lon', 'max_lat', 'max_lon'), self.bounds))}
+
+
+class TimeRange(Accumulator):
+    """開始・終了日時"""
+
+    def __init__(self):
+        """初期化"""
+        self.start = None
+        self.end = None
+
+    def update(self, batch: PointBatch) -> None:
+        if not len(batch.timed):
+            return
+        times = batch.time[batch.timed]
+        start = int(times.min())
+        end = int(times.max())
+        self.start = start if self.start is None else min(self.start, start)
+        self.end = end if self.end is None else max(self.end, end)
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            'start_time': _to_datetime(self.start),
+            'end_time': _to_datetime(self.end),
+            'elapsed_time': self.end - self.start if self.start is not None else 0
+        }
+
+
+class DayCounts(Accumulator):
+    """日付（UTC）ごとのポイント数と開始・終了日時"""
+
+    def __init__(self):
+        """初期化"""
+        self.days = {}
+
+    def update(self, batch: PointBatch) -> None:
+        if not len(batch.timed):
+            return
+        times = batch.time[batch.timed]
+        days, index, counts = np.unique(times // _SECONDS_PER_DAY, return_inverse=True, return_counts=True)
+        starts = np.full(len(days), np.iinfo(np.int64).max)
+        ends = np.full(len(days), np.iinfo(np.int64).min)
+        np.minimum.at(starts, index, times)
+        np.maximum.at(ends, index, times)
+        for day, count, start, end in zip(days.tolist(), counts.tolist(), starts.tolist(), ends.tolist()):
+            if day in self.days:
+                total, first, last = self.days[day]
+                self.days[day] = (total + count, min(first, start), max(last, end))
+            else:
+                self.days[day] = (count, start, end)
+
+    def day_results(self) -> Dict[int, Dict[str, Any]]:
+        return {
+            day: {'points': count, 'start_time': _to_datetime(start), 'end_time': _to_datetime(end)}
+            for day, (count, start, end) in self.days.items()
+        }
+
+
+class _TimedIntervals(Accumulator):
+    """時間が記録された点の間の区間（間の時間のない点の距離も含める）を集計する基底クラス"""
+
+    def __init__(self):
+        """初期化"""
+        self._last_time = None
+        self._last_distance = None
+
+    def update(self, batch: PointBatch) -> None:
+        timed = batch.timed
+        if not len(timed):
+            return
+        times = batch.time[timed]
+        distances = batch.distance[timed]
+        if self._last_time is None:
+            interval_time = np.diff(times)
+            interval_distance = np.diff(distances)
+            end_times = times[1:]
+        else:
+            interval_time = np.diff(times, prepend=self._last_time)
+            interval_distance = np.diff(distances, prepend=self._last_distance)
+            end_times = times
+        self._last_time = int(times[-1])
+        self._last_distance = float(distances[-1])
+        self.update_intervals(interval_distance, interval_time, end_times)
+
+    def update_intervals(self, interval_distance: np.ndarray, interval_time: np.ndarray,
+                         end_times: np.ndarray) -> None:
+        """区間の距離・時間と終点の時間を集計"""
+        raise NotImplementedError
+
+
+class Distance(_TimedIntervals):
+    """距離（日付ごとの集計では各区間を終点の日付に含める）"""
+
+    def __init__(self):
+        """初期化"""
+        super().__init__()
+        self.distance = 0.0
+        self.days = {}
+
+    def update(self, batch: PointBatch) -> None:
+        if len(batch):
+            self.distance = float(batch.distance[-1])
+        super().update(batch)
+
+    def update_intervals(self, interval_distance: np.ndarray, interval_time: np.ndarray,
+                         end_times: np.ndarray) -> None:
+        _add_by_day(self.days, end_times // _SECONDS_PER_DAY, interval_distance)
+
+    def result(self) -> Dict[str, Any]:
+        return {'distance': self.distance}
+
+    def day_results(self) -> Dict[int, Dict[str, Any]]:
+        return {day: {'distance': value} for day, value in self.days.items()}
+
+
+class MovingTime(_TimedIntervals):
+    """移動時間と平均移動速度"""
+
+    def __init__(self, moving_speed: float = DEFAULT_MOVING_SPEED):
+        """初期化
+
+        Args:
+            moving_speed: 移動中とみなす速度の下限（メートル/秒）
+        """
+        super().__init__()
+        self.moving_speed = moving_speed
+        self.moving_time = 0
+        self.moving_distance = 0.0
+        self.days = {}
+
+    def update_intervals(self, interval_distance: np.ndarray, interval_time: np.ndarray,
+                         end_times: np.ndarray) -> None:
+        moving = interval_distance >= self.moving_speed * interval_time
+        moving &= interval_time > 0
+        moving_seconds = np.where(moving, interval_time, 0)
+        self.moving_time += int(moving_seconds.sum())
+        self.moving_distance += float(interval_distance[moving].sum())
+        _add_by_day(self.days, end_times // _SECONDS_PER_DAY, moving_seconds)
+
+    def result(self) -> Dict[str, Any]:
+        average = self.moving_distance / self.moving_time if self.moving_time > 0 else 0.0
+        return {'moving_time': self.moving_time, 'average_speed': average}
+
+    def day_results(self) -> Dict[int, Dict[str, Any]]:
+        return {day: {'moving_time': int(value)} for day, value in self.days.items()}
+
+
+class MaxSpeed(Accumulator):
+    """最高速度（window秒以上の間隔で求めた速度の最大値）
+
+    時間順でない点があった場合は、stats.compute_statisticsと同様に区間ごとの速度の最大値とします。
+    直前のwindow秒分の点のみを引き継ぎます。
+    """
+
+    def __init__(self, window: float = DEFAULT_SPEED_WINDOW):
+        """初期化
+
+        Args:
+            window: 速度を平均する時間（秒）
+        """
+        self.window = max(1, int(np.ceil(window)))
+        self.ordered = True
+        self.window_max = None
+        self.interval_max = None
+        self._first = None
+        self._tail_time = np.zeros(0, dtype=np.int64)
+        self._tail_distance = np.zeros(0)
+
+    def update(self, batch: PointBatch) -> None:
+        timed = batch.timed
+        if not len(timed):
+            return
+        times = np.concatenate([self._tail_time, batch.time[timed]])
+        distances = np.concatenate([self._tail_distance, batch.distance[timed]])
+        if self._first is None:
+            self._first = (int(times[0]), float(distances[0]))
+        new = len(self._tail_time)
+
+        interval_time = np.diff(times)
+        interval_distance = np.diff(distances)
+        forward = interval_time > 0
+        if forward.any():
+            speed = float((interval_distance[forward] / interval_time[forward]).max())
+            self.interval_max = speed if self.interval_max is None else max(self.interval_max, speed)
+        if np.any(interval_time < 0):
+            self.ordered = False
+
+        if self.ordered:
+            starts = _window_starts(times, self.window)[new:]
+            valid = starts >= 0
+            if valid.any():
+                ends = np.flatnonzero(valid) + new
+                starts = starts[valid]
+                speed = float(((distances[ends] - distances[starts]) / (times[ends] - times[starts])).max())
+                self.window_max = speed if self.window_max is None else max(self.window_max, speed)
+            # 次のまとまりの点からwindow秒以上前の点を探せるよう、最後の点のwindow秒前の点から引き継ぐ
+            keep = max(int(np.searchsorted(times, times[-1] - self.window, side='right')) - 1, 0)
+        else:
+            keep = len(times) - 1
+        self._tail_time = times[keep:]
+        self._tail_distance = distances[keep:]
+
+    def result(self) -> Dict[str, Any]:
+        if not self.ordered:
+            return {'max_speed': self.interval_max or 0.0}
+        if self.window_max is not None:
+            return {'max_speed': self.window_max}
+        if self._first is None or not len(self._tail_time):
+            return {'max_speed': 0.0}
+        # 全体がwindow秒に満たない場合は最初と最後の点で求める
+        elapsed = int(self._tail_time[-1]) - self._first[0]
+        distance = float(self._tail_distance[-1]) - self._first[1]
+        return {'max_speed': distance / elapsed if elapsed > 0 else 0.0}
+
+
+class ElevationGain(Accumulator):
+    """累積標高（不感帯付き）と最低・最高標高"""
+
+    def __init__(self, hysteresis: float = DEFAULT_ELEVATION_HYSTERESIS):
+        """初期化
+
+        Args:
+            hysteresis: 無視する標高の変化の幅（メートル）
+        """
+        self.hysteresis = hysteresis
+        self.gain = 0.0
+        self.loss = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.days = {}
+        self._level = None
+
+    def update(self, batch: PointBatch) -> None:
+        index = np.flatnonzero(~np.isnan(batch.ele))
+        if not len(index):
+            return
+        values = batch.ele[index]
+        filtered = hysteresis_filter(values, self.hysteresis, self._level)
+        if self._level is None:
+            changes = np.diff(filtered)
+            index = index[1:]
+        else:
+            changes = np.diff(filtered, prepend=self._level)
+        self._level = float(filtered[-1])
+
+        gain = np.maximum(changes, 0)
+        loss = np.maximum(-changes, 0)
+        self.gain += float(gain.sum())
+        self.loss += float(loss.sum())
+        minimum = float(values.min())
+        maximum = float(values.max())
+        self.minimum = minimum if self.minimum is None else min(self.minimum, minimum)
+        self.maximum = maximum if self.maximum is None else max(self.maximum, maximum)
+
+        # 変化は終点の日付に含める（終点に時間がない変化は含めない）
+        times = batch.time[index]
+        dated = times != NO_TIME
+        days = times[dated] // _SECONDS_PER_DAY
+        _add_by_day(self.days.setdefault('gain', {}), days, gain[dated])
+        _add_by_day(self.days.setdefault('loss', {}), days, loss[dated])
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            'elevation_gain': self.gain,
+            'elevation_loss': self.loss,
+            'min_elevation': self.minimum,
+            'max_elevation': self.maximum
+        }
+
+    def day_results(self) -> Dict[int, Dict[str, Any]]:
+        gains = self.days.get('gain', {})
+        losses = self.days.get('loss', {})
+        return {
+            day: {'elevation_gain': gains.get(day, 0.0), 'elevation_loss': losses.get(day, 0.0)}
+            for day in set(gains) | set(losses)
+        }
+
+
+def default_accumulators(hysteresis: float = DEFAULT_ELEVATION_HYSTERESIS,
+                         moving_speed: float = DEFAULT_MOVING_SPEED,
+                         speed_window: float = DEFAULT_SPEED_WINDOW) -> List[Accumulator]:
+    """stats.compute_statisticsと同じ項目を集計するAccumulatorのリスト
+
+    Args:
+        hysteresis: 累積標高で無視する標高の変化の幅（メートル）
+        moving_speed: 移動中とみなす速度の下限（メートル/秒）
+        speed_window: 最高速度を求める際に速度を平均する時間（秒）
+
+    Returns:
+        List[Accumulator]: Accumulatorのリスト
+    """
+    return [PointCount(), BoundingBox(), TimeRange(), DayCounts(), Distance(),
+            ElevationGain(hysteresis), MovingTime(moving_speed), MaxSpeed(speed_window)]
+
+
+class StatisticsCollector:
+    """解析中のトラックポイントを受け取り、各Accumulatorで集計するクラス
+
+    GPXParser.parse_file(..., statistics=StatisticsCollector())のように指定すると、
+    解析と同時に集計されます（ストリーミングモードでは'all_points'を読み終えた時点で確定）。
+    """
+
+    def __init__(self, accumulators: Optional[Sequence[Accumulator]] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE):
+        """初期化
+
+        Args:
+            accumulators: 集計に使うAccumulator（指定しない場合はdefault_accumulators()）
+            batch_size: 数値に変換して集計するまでに溜めるトラックポイント数
+        """
+        self.accumulators = list(accumulators) if accumulators is not None else default_accumulators()
+        self.batch_size = batch_size
+        self._previous = None
+        self._lat = []
+        self._lon = []
+        self._ele = []
+        self._time = []
+
+    def add(self, lat: Optional[str], lon: Optional[str], ele: Optional[str] = None,
+            time: Optional[str] = None) -> None:
+        """トラックポイントを1点追加
+
+        Args:
+            lat: 緯度の文字列
+            lon: 経度の文字列
+            ele: 標高の文字列
+            time: 時間の文字列
+        """
+        self._lat.append(lat)
+        self._lon.append(lon)
+        self._ele.append(ele)
+        self._time.append(time)
+        if len(self._lat) >= self.batch_size:
+            self.flush()
+
+    def add_points(self, points: Sequence[Dict[str, Any]]) -> None:
+        """トラックポイントのリスト（TrackArrayも可）をまとめて追加
+
+        Args:
+            points: トラックポイントの辞書のリスト（TrackArrayも可）
+        """
+        self.flush()
+        if len(points):
+            self._update(*point_columns(points))
+
+    def flush(self) -> None:
+        """溜めているトラックポイントを集計"""
+        if not self._lat:
+            return
+        lat, lon, ele, time = self._lat, self._lon, self._ele, self._time
+        self._lat, self._lon, self._ele, self._time = [], [], [], []
+        self._update(_float_column(lat), _float_column(lon), _float_column(ele), decode_timestamps(time))
+
+    def _update(self, lat: np.ndarray, lon: np.ndarray, ele: np.ndarray, time: np.ndarray) -> None:
+        batch = PointBatch(lat, lon, np.asarray(ele, dtype=np.float64), time, self._previous)
+        for accumulator in self.accumulators:
+            accumulator.update(batch)
+        # 累積距離を使うAccumulatorがない場合は計算しない
+        distance = float(batch._distance[-1]) if batch._distance is not None else 0.0
+        self._previous = (float(lat[-1]), float(lon[-1]), distance)
+
+    def result(self) -> Dict[str, Any]:
+        """集計結果
+
+        Returns:
+            Dict[str, Any]: 各Accumulatorの集計結果をまとめた辞書
+                （'days'は日付ごとの集計結果に'date'を加えた辞書の日付順のリスト）
+        """
+        self.flush()
+        result = {}
+        days = {}
+        for accumulator in self.accumulators:
+            result.update(accumulator.result())
+            for day, values in accumulator.day_results().items():
+                days.setdefault(day, {}).update(values)
+
+        dates = np.datetime_as_string(np.array(sorted(days), dtype='datetime64[D]'), unit='D').tolist()
+        result['days'] = [dict({'date': date}, **days[day]) for date, day in zip(dates, sorted(days))]
+        return result
+
+
+def collect_statistics(source: GPXSource, accumulators: Optional[Sequence[Accumulator]] = None) -> Optional[Dict[str, Any]]:
+    """GPXファイルをストリーミングモードで解析しながら統計を集計
+
+    トラックポイントを保持しないため、メモリ使用量はファイルサイズによらず一定です。
+
+    Args:
+        source: GPXファイルのパス、GPXのバイト列、またはバイナリモードのファイルオブジェクト
+        accumulators: 集計に使うAccumulator（指定しない場合はdefault_accumulators()）
+
+    Returns:
+        Optional[Dict[str, Any]]: 集計結果（解析できない場合はNone）
+    """
+    from .parser import GPXParser
+
+    collector = StatisticsCollector(accumulators)
+    gpx_data = GPXParser().parse_file(source, streaming=True, statistics=collector)
+    if gpx_data is None:
+        return None
+    try:
+        for _ in gpx_data['all_points']:
+            pass
+    except Exception as e:
+        logger.error(f"統計の集計中にエラーが発生しました: {e}")
+        return None
+    return collector.result()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+一括変換モジュール
+
+このモジュールは、ファイル・ディレクトリ・グロブパターンで指定された多数のGPXファイルを
+プロセスプールで並列に変換する機能を提供します。出力は入力のディレクトリ構成を
+出力ディレクトリ以下に再現して書き込み、最後に処理速度（ファイル/秒、ポイント/秒）と
+失敗したファイルの集計を返します。
+"""
+
+import glob
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# ディレクトリから収集するファイルの拡張子
+GPX_EXTENSION = '.gpx'
+
+# 1ワーカーあたりのタスクの分割数（小さいファイルが多い場合のプロセス間通信を減らす）
+CHUNKS_PER_WORKER = 4
+
+# 変換関数の型: (入力ファイル, 出力ファイル) -> 変換したポイント数（失敗時はNone）
+ConvertFunction = Callable[[str, str], Optional[int]]
+
+
+def is_batch_input(inputs: List[str]) -> bool:
+    """一括変換として扱う入力かどうか（複数の入力・ディレクトリ・グロブパターン）"""
+    return len(inputs) != 1 or os.path.isdir(inputs[0]) or glob.has_magic(inputs[0])
+
+
+def expand_inputs(inputs: List[str], exclude_dir: Optional[str] = None,
+                  exclude_suffix: Optional[str] = None) -> List[Tuple[str, str]]:
+    """ファイル・ディレクトリ・グロブパターンを入力ファイルの一覧に展開
+
+    ディレクトリは再帰的に拡張子.gpxのファイルを収集し、グロブパターンは
+    `**`による再帰的な一致に対応します。
+
+    Args:
+        inputs: ファイル・ディレクトリ・グロブパターンのリスト
+        exclude_dir: 収集しないディレクトリ（出力ディレクトリ）
+        exclude_suffix: 収集しないファイル名の末尾（拡張子を除く、前回の出力ファイル）
+
+    Returns:
+        List[Tuple[str, str]]: (入力ファイルのパス, 出力先で再現する相対パス)のリスト
+    """
+    exclude_dir = os.path.realpath(exclude_dir) if exclude_dir else None
+
+    def excluded(path: str) -> bool:
+        if exclude_dir and os.path.realpath(path).startswith(exclude_dir + os.sep):
+            return True
+        return bool(exclude_suffix) and os.path.splitext(path)[0].endswith(exclude_suffix)
+
+    files = []
+    seen = set()
+
+    def add(path: str, base_dir: str) -> None:
+        key = os.path.realpath(path)
+        if key in seen or excluded(path):
+            return
+        seen.add(key)
+        files.append((path, os.path.relpath(path, base_dir)))
+
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            paths = [os.path.join(dir_path, file_name)
+                     for dir_path, _, file_names in os.walk(pattern)
+                     for file_name in file_names
+                     if file_name.lower().endswith(GPX_EXTENSION)]
+            for path in sorted(paths):
+                add(path, pattern)
+        elif glob.has_magic(pattern):
+            # パターンの固定部分（最初のワイルドカードより前のディレクトリ）を基準にする
+            parts = pattern.split(os.sep)
+            fixed = next(i for i, part in enumerate(parts) if glob.has_magic(part))
+            base_dir = os.sep.join(parts[:fixed]) or os.curdir
+            for path in sorted(glob.glob(pattern, recursive=True)):
+                if os.path.isfile(path):
+                    add(path, base_dir)
+        elif os.path.isfile(pattern):
+            add(pattern, os.path.dirname(pattern) or os.curdir)
+        else:
+            logger.warning(f"入力 '{pattern}' に一致するファイルがありません")
+
+    return files
+
+
+def batch_output_path(input_file: str, relative_path: str, output_dir: Optional[str],
+                      suffix: str) -> str:
+    """入力ファイルに対応する出力ファイルのパス
+
+    Args:
+        input_file: 入力ファイルのパス
+        relative_path: 出力先で再現する相対パス
+        output_dir: 出力ディレクトリ（指定しない場合は入力ファイルと同じ場所）
+        suffix: 出力ディレクトリを指定しない場合にファイル名に付ける末尾
+
+    Returns:
+        str: 出力ファイルのパス
+    """
+    if output_dir:
+        return os.path.join(output_dir, relative_path)
+    base_name, ext = os.path.splitext(input_file)
+    return f"{base_name}{suffix}{ext}"
+
+
+def duplicate_outputs(jobs: List[Tuple[str, str]]) -> Dict[str, List[str]]:
+    """同じ出力ファイルに書き込む入力ファイルを検出
+
+    複数の入力ディレクトリに同じ相対パスのファイルがある場合等、出力ファイルが重なると
+    後の変換が前の変換結果を上書きし、並列に変換すると同時に書き込まれます。
+
+    Args:
+        jobs: (入力ファイル, 出力ファイル)のリスト
+
+    Returns:
+        Dict[str, List[str]]: 重なる出力ファイルと、そこに書き込む入力ファイルのリストの辞書
+    """
+    inputs_by_output = {}
+    for input_file, output_file in jobs:
+        key = os.path.normcase(os.path.realpath(output_file))
+        inputs_by_output.setdefault(key, (output_file, []))[1].append(input_file)
+    return {output_file: inputs for output_file, inputs in inputs_by_output.values() if len(inputs) > 1}
+
+
+def format_duplicates(duplicates: Dict[str, List[str]]) -> List[str]:
+    """重なる出力ファイルを表示用の行に整形
+
+    Args:
+        duplicates: duplicate_outputsの結果
+
+    Returns:
+        List[str]: 表示する行のリスト
+    """
+    lines = ["複数の入力ファイルが同じ出力ファイルに書き込まれるため、一括変換を中止しました:"]
+    for output_file, inputs in duplicates.items():
+        lines.append(f"  {output_file}: {', '.join(inputs)}")
+    return lines
+
+
+def _run_job(convert: ConvertFunction,
+             job: Tuple[str, str]) -> Tuple[str, Optional[int], Optional[str]]:
+    """1ファイルを変換（ワーカープロセスで実行）"""
+    input_file, output_file = job
+    try:
+        output_dir = os.path.dirname(output_file)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        points = convert(input_file, output_file)
+        return input_file, points, None if points is not None else "変換に失敗しました"
+    except Exception as e:
+        return input_file, None, str(e)
+
+
+def run_batch(jobs: List[Tuple[str, str]], convert: ConvertFunction,
+              workers: Optional[int] = None) -> Dict[str, Any]:
+    """ファイルを並列に変換し、処理速度と失敗を集計
+
+    convertはワーカープロセスに渡すため、モジュールの最上位で定義された関数
+    （またはそのfunctools.partial）である必要があります。
+
+    Args:
+        jobs: (入力ファイル, 出力ファイル)のリスト
+        convert: 1ファイルを変換し、変換したポイント数を返す関数（失敗時はNone）
+        workers: ワーカープロセス数（指定しない場合はCPU数、1の場合は現在のプロセスで実行）
+
+    Returns:
+        Dict[str, Any]: 集計結果の辞書
+            'files': 入力ファイル数
+            'converted': 変換に成功したファイル数
+            'points': 変換したポイント数の合計
+            'failures': 失敗した(入力ファイル, エラー内容)のリスト
+            'elapsed': 経過時間（秒）
+            'files_per_second', 'points_per_second': 処理速度
+
+    Raises:
+        ValueError: 複数の入力ファイルが同じ出力ファイルに書き込まれる場合
+    """
+    duplicates = duplicate_outputs(jobs)
+    if duplicates:
+        raise ValueError("\n".join(format_duplicates(duplicates)))
+
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(jobs)))
+    run_job = partial(_run_job, convert)
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = list(map(run_job, jobs))
+    else:
+        chunksize = max(1, len(jobs) // (workers * CHUNKS_PER_WORKER))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run_job, jobs, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+
+    failures = [(input_file, error) for input_file, points, error in results if error]
+    points = sum(points for _, points, error in results if not error)
+
+    return {
+        'files': len(jobs),
+        'converted': len(jobs) - len(failures),
+        'points': points,
+        'failures': failures,
+        'elapsed': elapsed,
+        'files_per_second': len(jobs) / elapsed if elapsed > 0 else 0.0,
+        'points_per_second': points / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def format_summary(summary: Dict[str, Any]) -> List[str]:
+    """集計結果を表示用の行に整形
+
+    Args:
+        summary: run_batchの集計結果
+
+    Returns:
+        List[str]: 表示する行のリスト
+    """
+    lines = [
+        "一括変換の結果:",
+        f"  ファイル数: {summary['files']}（成功: {summary['converted']}、失敗: {len(summary['failures'])}）",
+        f"  ポイント数: {summary['points']}",
+        f"  経過時間: {summary['elapsed']:.2f}秒",
+        f"  処理速度: {summary['files_per_second']:.1f} ファイル/秒、{summary['points_per_second']:.0f} ポイント/秒"
+    ]
+    for input_file, error in summary['failures']:
+        lines.append(f"  失敗: {input_file}: {error}")
+    return lines
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+解析結果キャッシュモジュール
+
+このモジュールは、GPXParser.parse_fileの解析結果をファイルの内容のハッシュと
+パーサーのバージョンをキーとしてディレクトリに保存し、同じファイルを再度解析する際に
+XMLを解析せずに読み込むParseCacheを提供します。
+
+解析結果は1件ごとに1つの.npzファイルに保存します。トラックポイントは列ごとの配列
+（辞書形式の場合は元の文字列をNUL区切りで連結したバイト列）、作成者・メタデータ・
+ウェイポイント・トラックのヘッダーはJSONとして格納するため、読み込んだ結果は
+解析した結果と一致します。標高・時間は補完前の結果を保存し、GPXParserが
+読み込んだ後に補完します。
+
+キャッシュの合計サイズが上限を超えた場合は、最後に使われた時刻（更新時刻）が
+古いものから削除します。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from .parser import PARSER_VERSION
+from .timestamps import parse_datetime
+from .track_array import TrackArray
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# キャッシュファイルの形式のバージョン（キーに含める）
+CACHE_FORMAT_VERSION = '3'
+
+# キャッシュの拡張子
+CACHE_EXTENSION = '.npz'
+
+# キャッシュの合計サイズの上限（デフォルト）
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# 辞書形式のトラックポイントで文字列として保存する列
+STRING_FIELDS = ('lat', 'lon', 'ele', 'time')
+
+# 文字列の列の区切り（XMLの文字列に含まれない）
+_SEPARATOR = '\x00'
+
+
+def _encode_strings(values: List[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """文字列のリストを連結したバイト列とNoneの位置に変換"""
+    missing = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+    text = _SEPARATOR.join('' if value is None else value for value in values)
+    return np.frombuffer(text.encode('utf-8'), dtype=np.uint8), missing
+
+
+def _decode_strings(data: np.ndarray, missing: np.ndarray) -> List[Optional[str]]:
+    """_encode_stringsの逆変換"""
+    if not len(missing):
+        return []
+    values = data.tobytes().decode('utf-8').split(_SEPARATOR)
+    for index in np.flatnonzero(missing).tolist():
+        values[index] = None
+    return values
+
+
+def _decode_datetime(text: str) -> datetime:
+    """GPXParser._parse_trackpointと同じ規則で時間文字列をdatetimeに変換"""
+    try:
+        return parse_datetime(text)
+    except ValueError:
+        return datetime.min
+
+
+class ParseCache:
+    """GPXの解析結果をディレクトリに保存するキャッシュ
+
+    GPXParser(cache=ParseCache(...))のように指定すると、parse_fileの通常モード
+    （streaming・lazyでない場合）で利用されます。
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """初期化
+
+        Args:
+            cache_dir: キャッシュを保存するディレクトリ（存在しない場合は作成）
+            max_bytes: キャッシュの合計サイズの上限（超えた場合は古いものから削除）
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, content: Any, columnar: bool = False) -> str:
+        """ファイルの内容とパーサーのバージョンからキーを作成
+
+        Args:
+            content: GPXファイルの内容（bytes・memoryview等）
+            columnar: TrackArray形式の解析結果かどうか
+
+        Returns:
+            str: キー（16進数のSHA-256）
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{PARSER_VERSION}:{CACHE_FORMAT_VERSION}:{int(columnar)}:".encode('ascii'))
+        digest.update(content)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + CACHE_EXTENSION)
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """キャッシュから解析結果を読み込む
+
+        Args:
+            key: keyで作成したキー
+
+        Returns:
+            Optional[Dict[str, Any]]: 解析結果（キャッシュにない場合・読み込めない場合はNone）
+        """
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = dict(data)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"キャッシュ '{path}' を読み込めないため削除します: {e}")
+            self._remove(path)
+            return None
+
+        try:
+            result = self._decode(arrays)
+        except Exception as e:
+            logger.warning(f"キャッシュ '{path}' を読み込めないため削除します: {e}")
+            self._remove(path)
+            return None
+
+        # 最後に使われた時刻を更新（LRU）
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return result
+
+    def store(self, key: str, result: Dict[str, Any]) -> bool:
+        """解析結果をキャッシュに保存し、上限を超えた場合は古いものを削除
+
+        Args:
+            key: keyで作成したキー
+            result: GPXParser.parse_fileの解析結果
+
+        Returns:
+            bool: 保存できたかどうか
+        """
+        try:
+            arrays = self._encode(result)
+            # 書き込み途中のファイルを読み込まないよう、一時ファイルに書いてから置き換える
+            fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    np.savez(f, **arrays)
+                os.replace(temp_path, self._path(key))
+            except BaseException:
+                self._remove(temp_path)
+                raise
+        except Exception as e:
+            logger.warning(f"解析結果をキャッシュに保存できませんでした: {e}")
+            return False
+
+        self.evict()
+        return True
+
+    def evict(self) -> None:
+        """合計サイズが上限以下になるまで、最後に使われた時刻が古いものから削除"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(CACHE_EXTENSION):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self) -> None:
+        """キャッシュを全て削除"""
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(CACHE_EXTENSION):
+                self._remove(entry.path)
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _encode(self, result: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """解析結果を保存する配列の辞書に変換"""
+        tracks = result['tracks']
+        all_points = result['all_points']
+        columnar = isinstance(all_points, TrackArray)
+        header = {
+            'columnar': columnar,
+            'creator': result['creator'],
+            'metadata': result['metadata'],
+            'waypoints': result['waypoints'],
+            # 'points'はキーの順序を保つためNoneにしておく
+            'tracks': [{k: (None if k == 'points' else v) for k, v in track.items()} for track in tracks]
+        }
+        arrays = {
+            'track_lengths': np.array([len(track['points']) for track in tracks], dtype=np.int64)
+        }
+
+        if columnar:
+            points = TrackArray.concatenate([track['points'] for track in tracks])
+            arrays.update(self._encode_columns(points, ''))
+            # 各トラックを連結した順序と異なる場合（時間順に並べ替えた場合）のみ全ポイントを保存
+            if not self._columns_equal(points, all_points):
+                arrays.update(self._encode_columns(all_points, 'all_'))
+        else:
+            points = [point for track in tracks for point in track['points']]
+            for field in STRING_FIELDS:
+                arrays[field], arrays[field + '_missing'] = _encode_strings([point[field] for point in points])
+            header['extensions'] = {
+                str(index): point['extensions'] for index, point in enumerate(points) if point['extensions']
+            }
+            # 全ポイントは各トラックのポイントと同じ辞書を時間順に並べたもの
+            positions = {id(point): index for index, point in enumerate(points)}
+            arrays['order'] = np.array([positions[id(point)] for point in all_points], dtype=np.int64)
+
+        arrays['header'] = np.frombuffer(json.dumps(header, ensure_ascii=False).encode('utf-8'), dtype=np.uint8)
+        return arrays
+
+    def _decode(self, arrays: Dict[str, np.ndarray]) -> Dict[str, Any]:
+        """保存した配列の辞書から解析結果を復元"""
+        header = json.loads(arrays['header'].tobytes().decode('utf-8'))
+        ends = np.cumsum(arrays['track_lengths']).tolist()
+        starts = [0] + ends[:-1]
+
+        if header['columnar']:
+            points = self._decode_columns(arrays, '')
+            if 'all_lat' in arrays:
+                all_points = self._decode_columns(arrays, 'all_')
+            else:
+                all_points = points
+            # 各トラックの'points'は連結した配列のビュー（GPXParser._merge_track_arraysと同じ）
+            track_points = [points[start:end] for start, end in zip(starts, ends)]
+        else:
+            lats, lons, eles, times = [_decode_strings(arrays[field], arrays[field + '_missing'])
+                                       for field in STRING_FIELDS]
+            points = [
+                {'lat': lat, 'lon': lon, 'ele': ele, 'time': time, 'extensions': {}}
+                for lat, lon, ele, time in zip(lats, lons, eles, times)
+            ]
+            for index, extensions in header['extensions'].items():
+                points[int(index)]['extensions'] = extensions
+            for point, time in zip(points, times):
+                if time is not None:
+                    point['datetime'] = _decode_datetime(time)
+            all_points = [points[index] for index in arrays['order'].tolist()]
+            track_points = [points[start:end] for start, end in zip(starts, ends)]
+
+        tracks = header['tracks']
+        for track, track_point_list in zip(tracks, track_points):
+            track['points'] = track_point_list
+
+        return {
+            'creator': header['creator'],
+            'metadata': header['metadata'],
+            'waypoints': header['waypoints'],
+            'tracks': tracks,
+            'all_points': all_points
+        }
+
+    def _encode_columns(self, points: TrackArray, prefix: str) -> Dict[str, np.ndarray]:
+        """TrackArrayの列を保存する配列の辞書に変換"""
+        arrays = {
+            prefix + 'lat': points.lat,
+            prefix + 'lon': points.lon,
+            prefix + 'ele': points.ele,
+            prefix + 'time': points.time
+        }
+        for name, column in points.sensors.items():
+            arrays[prefix + 'sensor_' + name] = column
+        return arrays
+
+    def _decode_columns(self, arrays: Dict[str, np.ndarray], prefix: str) -> TrackArray:
+        """_encode_columnsの逆変換"""
+        sensor_prefix = prefix + 'sensor_'
+        sensors = {
+            name[len(sensor_prefix):]: column for name, column in arrays.items() if name.startswith(sensor_prefix)
+        }
+        return TrackArray(arrays[prefix + 'lat'], arrays[prefix + 'lon'], arrays[prefix + 'ele'],
+                          arrays[prefix + 'time'], sensors)
+
+    def _columns_equal(self, a: TrackArray, b: TrackArray) -> bool:
+        """2つのTrackArrayの全ての列が一致するかどうか"""
+        return (len(a) == len(b) and a.sensors.keys() == b.sensors.keys()
+                and np.array_equal(a.lat, b.lat, equal_nan=True)
+                and np.array_equal(a.lon, b.lon, equal_nan=True)
+                and np.array_equal(a.ele, b.ele, equal_nan=True)
+                and np.array_equal(a.time, b.time)
+                and all(np.array_equal(a.sensors[name], b.sensors[name], equal_nan=True) for name in a.sensors))
@@ -11,7 +11,12 @@ import xml.etree.ElementTree as ET
 from datetime import datetime
 import logging
 from typing import Dict, List, Any, Optional
-from xml.dom import minidom
+
+from .resample import format_resample, resample_tracks
+from .simplify import format_reduction, simplify_points
+from .sources import GPXTarget, open_output
+from .timestamps import parse_datetime
+from .writer import DEFAULT_INDENT, GPXWriter
 
 # ロギング設定
 logger = logging.getLogger(__name__)
@@ -40,16 +45,27 @@ class GPXConverter:
         # デフォルト名前空間
         ET.register_namespace('', 'http://www.topografix.com/GPX/1/1')
 
-    def convert_to_universal_format(self, gpx_data: Dict[str, Any], output_file: str, 
+    def convert_to_universal_format(self, gpx_data: Dict[str, Any], output_file: GPXTarget, 
                                    track_name: Optional[str] = None, 
-                                   activity_type: Optional[str] = None) -> bool:
+                                   activity_type: Optional[str] = None,
+                                   indent: Optional[str] = DEFAULT_INDENT,
+                                   simplify_tolerance: Optional[float] = None,
+                                   resample_interval: Optional[int] = None) -> bool:
         """GPXデータを統一フォーマットに変換
 
+        要素の木を作らずに、メタデータ・トラックのヘッダー・トラックポイントを
+        出力先へ順に書き込みます。
+
         Args:
             gpx_data: 変換するGPXデータ
-            output_file: 出力ファイルパス
+            output_file: 出力ファイルパス、またはバイナリモードのファイルオブジェクト
             track_name: トラック名（指定しない場合は元のデータから推測）
             activity_type: アクティビティタイプ（指定しない場合は元のデータから推測）
+            indent: 1段あたりの字下げ（Noneの場合は改行・字下げなしで出力）
+            simplify_tolerance: 指定した場合はトラックポイントをVisvalingam–Whyatt法で間引く
+                許容誤差（メートル、残した点の時間はそのまま出力）
+            resample_interval: 指定した場合はトラックポイントをトラックごとにこの間隔（秒）の点に
+                再サンプリングする（簡略化より先に行い、座標・標高はgpx_dataの'precision'の桁数で整形）
 
         Returns:
             bool: 変換が成功したかどうか
@@ -58,127 +74,123 @@ class GPXConverter:
             logger.error("変換するデータがありません")
             return False
         
-        self.register_namespaces()
-        
-        # ルート要素の作成
-        root = ET.Element('{http://www.topografix.com/GPX/1/1}gpx')
-        root.set('version', '1.1')
-        root.set('creator', 'Universal GPX Converter')
-        root.set('{http://www.w3.org/2001/XMLSchema-instance}schemaLocation', 
-                'http://www.topografix.com/GPX/1/1 http://www.topografix.com/GPX/1/1/gpx.xsd')
-        
-        # 名前空間の追加
-        for prefix, uri in self.namespaces.items():
-            if prefix != 'gpx' and prefix != 'xsi':
-                root.set(f'xmlns:{prefix}', uri)
-        
-        # メタデータの追加
-        metadata = self._create_metadata_element(gpx_data)
-        root.append(metadata)
-        
-        # トラックの作成
-        trk = self._create_track_element(gpx_data, track_name, activity_type)
-        root.append(trk)
-        
-        # XMLを整形して保存
-        xml_str = ET.tostring(root, encoding='utf-8')
-        pretty_xml = minidom.parseString(xml_str).toprettyxml(indent="  ")
-        
-        # XML宣言を修正（エンコーディングをUTF-8に）
-        pretty_xml = pretty_xml.replace('<?xml version="1.0" ?>', '<?xml version="1.0" encoding="UTF-8"?>')
-        
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(pretty_xml)
+        # トラックの再サンプリング（トラックの境界をまたいで補間せず、元のデータは変更しない）
+        if resample_interval:
+            original = len(gpx_data['all_points'])
+            tracks = [track['points'] for track in gpx_data.get('tracks', []) if 'points' in track]
+            resampled = resample_tracks(tracks or [gpx_data['all_points']], resample_interval,
+                                        precision=gpx_data.get('precision'))
+            gpx_data = dict(gpx_data, all_points=resampled)
+            logger.info(format_resample(original, len(gpx_data['all_points']), resample_interval))
+            if not gpx_data['all_points']:
+                logger.error("時間が記録されたトラックポイントがないため再サンプリングできません")
+                return False
+        
+        # トラックの簡略化（元のデータは変更しない）
+        if simplify_tolerance:
+            original = len(gpx_data['all_points'])
+            gpx_data = dict(gpx_data, all_points=simplify_points(gpx_data['all_points'], simplify_tolerance))
+            logger.info(format_reduction(original, len(gpx_data['all_points'])))
+        
+        with open_output(output_file) as stream:
+            writer = GPXWriter(stream, indent)
+            writer.declaration()
+            
+            # ルート要素（名前空間は1回ずつ宣言する）
+            attributes = {'xmlns': self.namespaces['gpx']}
+            for prefix, uri in self.namespaces.items():
+                if prefix != 'gpx':
+                    attributes[f'xmlns:{prefix}'] = uri
+            attributes['version'] = '1.1'
+            attributes['creator'] = 'Universal GPX Converter'
+            attributes['xsi:schemaLocation'] = \
+                'http://www.topografix.com/GPX/1/1 http://www.topografix.com/GPX/1/1/gpx.xsd'
+            writer.start('gpx', attributes)
+            
+            # メタデータの追加
+            self._write_metadata(writer, gpx_data)
+            
+            # トラックの追加
+            self._write_track(writer, gpx_data, track_name, activity_type)
+            
+            writer.close()
         
         return True
 
-    def _create_metadata_element(self, gpx_data: Dict[str, Any]) -> ET.Element:
-        """メタデータ要素を作成
+    def _write_metadata(self, writer: GPXWriter, gpx_data: Dict[str, Any]) -> None:
+        """メタデータ要素を書き込む
 
         Args:
+            writer: 書き込み先
             gpx_data: GPXデータ
-
-        Returns:
-            ET.Element: メタデータ要素
         """
-        metadata = ET.Element('{http://www.topografix.com/GPX/1/1}metadata')
+        metadata = gpx_data['metadata']
+        writer.start('metadata')
         
         # 名前
-        if gpx_data['metadata'].get('name'):
-            name_elem = ET.SubElement(metadata, '{http://www.topografix.com/GPX/1/1}name')
-            name_elem.text = gpx_data['metadata']['name']
+        if metadata.get('name'):
+            writer.element('name', metadata['name'])
         
         # 説明
-        if gpx_data['metadata'].get('desc'):
-            desc_elem = ET.SubElement(metadata, '{http://www.topografix.com/GPX/1/1}desc')
-            desc_elem.text = gpx_data['metadata']['desc']
+        if metadata.get('desc'):
+            writer.element('desc', metadata['desc'])
         
         # 時間
-        if gpx_data['metadata'].get('time'):
-            time_elem = ET.SubElement(metadata, '{http://www.topografix.com/GPX/1/1}time')
-            time_elem.text = gpx_data['metadata']['time']
+        if metadata.get('time'):
+            writer.element('time', metadata['time'])
         elif gpx_data['all_points'] and gpx_data['all_points'][0].get('time'):
-            time_elem = ET.SubElement(metadata, '{http://www.topografix.com/GPX/1/1}time')
-            time_elem.text = gpx_data['all_points'][0]['time']
+            writer.element('time', gpx_data['all_points'][0]['time'])
         
         # キーワード
-        if gpx_data['metadata'].get('keywords'):
-            keywords_elem = ET.SubElement(metadata, '{http://www.topografix.com/GPX/1/1}keywords')
-            keywords_elem.text = gpx_data['metadata']['keywords']
+        if metadata.get('keywords'):
+            writer.element('keywords', metadata['keywords'])
         
         # 作成者
-        if gpx_data['metadata'].get('author'):
-            author_elem = ET.SubElement(metadata, '{http://www.topografix.com/GPX/1/1}author')
-            author_name_elem = ET.SubElement(author_elem, '{http://www.topografix.com/GPX/1/1}name')
-            author_name_elem.text = gpx_data['metadata']['author']
+        if metadata.get('author'):
+            writer.start('author')
+            writer.element('name', metadata['author'])
+            writer.end()
         
         # リンク
-        if gpx_data['metadata'].get('link'):
-            link_elem = ET.SubElement(metadata, '{http://www.topografix.com/GPX/1/1}link')
-            link_elem.set('href', gpx_data['metadata']['link'])
-            
-            if gpx_data['metadata'].get('link_text'):
-                link_text_elem = ET.SubElement(link_elem, '{http://www.topografix.com/GPX/1/1}text')
-                link_text_elem.text = gpx_data['metadata']['link_text']
+        if metadata.get('link'):
+            writer.start('link', {'href': metadata['link']})
+            if metadata.get('link_text'):
+                writer.element('text', metadata['link_text'])
+            writer.end()
         
         # 拡張データ
-        extensions = ET.SubElement(metadata, '{http://www.topografix.com/GPX/1/1}extensions')
-        source_info = ET.SubElement(extensions, 'source_info')
+        writer.start('extensions')
+        writer.start('source_info')
         
         # 元のサービス
-        original_service = ET.SubElement(source_info, 'original_service')
-        original_service.text = gpx_data.get('service', 'unknown')
+        writer.element('original_service', gpx_data.get('service', 'unknown'))
         
         # 変換日時
-        conversion_date = ET.SubElement(source_info, 'conversion_date')
-        conversion_date.text = datetime.now().isoformat()
+        writer.element('conversion_date', datetime.now().isoformat())
         
-        return metadata
+        writer.end()
+        writer.end()
+        writer.end()
 
-    def _create_track_element(self, gpx_data: Dict[str, Any], 
-                             track_name: Optional[str], 
-                             activity_type: Optional[str]) -> ET.Element:
-        """トラック要素を作成
+    def _write_track(self, writer: GPXWriter, gpx_data: Dict[str, Any], 
+                     track_name: Optional[str], 
+                     activity_type: Optional[str]) -> None:
+        """トラック要素を書き込む
 
         Args:
+            writer: 書き込み先
             gpx_data: GPXデータ
             track_name: トラック名
             activity_type: アクティビティタイプ
-
-        Returns:
-            ET.Element: トラック要素
         """
-        trk = ET.Element('{http://www.topografix.com/GPX/1/1}trk')
+        writer.start('trk')
         
         # トラック名の設定
-        name = ET.SubElement(trk, '{http://www.topografix.com/GPX/1/1}name')
-        if track_name:
-            name.text = track_name
-        else:
+        if not track_name:
             # 既存のトラック名から推測
             existing_names = [t.get('name') for t in gpx_data['tracks'] if t.get('name')]
             if existing_names and existing_names[0] != 'track':
-                name.text = existing_names[0]
+                track_name = existing_names[0]
             else:
                 # 日付から自動生成
                 first_point = gpx_data['all_points'][0]
@@ -186,129 +198,102 @@ class GPXConverter:
                 
                 if 'time' in first_point and 'time' in last_point:
                     try:
-                        start_date = datetime.fromisoformat(first_point['time'].replace('Z', '+00:00'))
-                        end_date = datetime.fromisoformat(last_point['time'].replace('Z', '+00:00'))
+                        start_date = parse_datetime(first_point['time'])
+                        end_date = parse_datetime(last_point['time'])
                         days = (end_date.date() - start_date.date()).days
                         
                         if days > 0:
-                            name.text = f"アクティビティ {start_date.strftime('%Y-%m-%d')} から {days+1}日間"
+                            track_name = f"アクティビティ {start_date.strftime('%Y-%m-%d')} から {days+1}日間"
                         else:
-                            name.text = f"アクティビティ {start_date.strftime('%Y-%m-%d')}"
+                            track_name = f"アクティビティ {start_date.strftime('%Y-%m-%d')}"
                     except ValueError:
-                        name.text = "変換されたアクティビティ"
+                        track_name = "変換されたアクティビティ"
                 else:
-                    name.text = "変換されたアクティビティ"
+                    track_name = "変換されたアクティビティ"
+        writer.element('name', track_name)
         
         # アクティビティタイプの設定
-        if activity_type:
-            type_elem = ET.SubElement(trk, '{http://www.topografix.com/GPX/1/1}type')
-            type_elem.text = activity_type
-        else:
-            # 既存のタイプから推測
+        if not activity_type:
+            # 既存のタイプから推測（デフォルトはハイキング）
             existing_types = [t.get('type') for t in gpx_data['tracks'] if t.get('type')]
-            if existing_types:
-                type_elem = ET.SubElement(trk, '{http://www.topografix.com/GPX/1/1}type')
-                type_elem.text = existing_types[0]
-            else:
-                # デフォルトはハイキング
-                type_elem = ET.SubElement(trk, '{http://www.topografix.com/GPX/1/1}type')
-                type_elem.text = 'hiking'
+            activity_type = existing_types[0] if existing_types else 'hiking'
+        writer.element('type', activity_type)
         
         # トラック番号
         existing_numbers = [t.get('number') for t in gpx_data['tracks'] if t.get('number')]
         if existing_numbers:
-            number_elem = ET.SubElement(trk, '{http://www.topografix.com/GPX/1/1}number')
-            number_elem.text = existing_numbers[0]
+            writer.element('number', existing_numbers[0])
         
         # トラック説明
         existing_descs = [t.get('desc') for t in gpx_data['tracks'] if t.get('desc')]
         if existing_descs:
-            desc_elem = ET.SubElement(trk, '{http://www.topografix.com/GPX/1/1}desc')
-            desc_elem.text = existing_descs[0]
+            writer.element('desc', existing_descs[0])
         
         # 開始時間をトラックにも追加（Runkeeper形式）
         if gpx_data['all_points'] and gpx_data['all_points'][0].get('time'):
-            time_elem = ET.SubElement(trk, '{http://www.topografix.com/GPX/1/1}time')
-            time_elem.text = gpx_data['all_points'][0]['time']
+            writer.element('time', gpx_data['all_points'][0]['time'])
         
         # サービス固有の拡張データがあれば追加
         service_extensions = self._extract_service_extensions(gpx_data)
         if service_extensions:
-            extensions = ET.SubElement(trk, '{http://www.topografix.com/GPX/1/1}extensions')
-            service_data = ET.SubElement(extensions, 'service_data')
-            
+            writer.start('extensions')
+            writer.start('service_data')
+            # 名前空間付きの要素は「接頭辞:要素名」、名前空間なしの要素は要素名のまま
             for key, value in service_extensions.items():
-                if ':' in key:
-                    # 名前空間付きの要素
-                    ns_prefix, local_name = key.split(':')
-                    ext_elem = ET.SubElement(service_data, f'{{{self.namespaces[ns_prefix]}}}{local_name}')
-                else:
-                    # 名前空間なしの要素
-                    ext_elem = ET.SubElement(service_data, key)
-                ext_elem.text = value
+                writer.element(key, value)
+            writer.end()
+            writer.end()
         
         # トラックセグメントの作成
-        trkseg = ET.SubElement(trk, '{http://www.topografix.com/GPX/1/1}trkseg')
+        writer.start('trkseg')
         
         # トラックポイントの追加（時間順）
         for point in gpx_data['all_points']:
-            trkpt = self._create_trackpoint_element(point)
-            trkseg.append(trkpt)
+            if point['extensions']:
+                self._write_trackpoint(writer, point)
+            else:
+                writer.trackpoint(point['lat'], point['lon'], point['ele'], point['time'])
         
-        return trk
+        writer.end()
+        writer.end()
 
-    def _create_trackpoint_element(self, point: Dict[str, Any]) -> ET.Element:
-        """トラックポイント要素を作成
+    def _write_trackpoint(self, writer: GPXWriter, point: Dict[str, Any]) -> None:
+        """拡張データを持つトラックポイント要素を書き込む
 
         Args:
+            writer: 書き込み先
             point: トラックポイントデータ
-
-        Returns:
-            ET.Element: トラックポイント要素
         """
-        trkpt = ET.Element('{http://www.topografix.com/GPX/1/1}trkpt')
-        trkpt.set('lat', point['lat'])
-        trkpt.set('lon', point['lon'])
+        writer.start('trkpt', {'lat': point['lat'], 'lon': point['lon']})
         
         if point['ele']:
-            ele = ET.SubElement(trkpt, '{http://www.topografix.com/GPX/1/1}ele')
-            ele.text = point['ele']
+            writer.element('ele', point['ele'])
         
         if point['time']:
-            time_elem = ET.SubElement(trkpt, '{http://www.topografix.com/GPX/1/1}time')
-            time_elem.text = point['time']
-        
-        # 拡張データがあれば追加
-        if point['extensions']:
-            extensions = ET.SubElement(trkpt, '{http://www.topografix.com/GPX/1/1}extensions')
-            
-            # Garmin拡張データ
-            garmin_ext = {}
-            for key, value in point['extensions'].items():
-                if key in ['hr', 'cad', 'temp', 'atemp']:
-                    garmin_ext[key] = value
-            
-            if garmin_ext:
-                tpx = ET.SubElement(extensions, '{http://www.garmin.com/xmlschemas/TrackPointExtension/v1}TrackPointExtension')
-                
-                for key, value in garmin_ext.items():
-                    if key == 'hr':
-                        hr_elem = ET.SubElement(tpx, '{http://www.garmin.com/xmlschemas/TrackPointExtension/v1}hr')
-                        hr_elem.text = value
-                    elif key == 'cad':
-                        cad_elem = ET.SubElement(tpx, '{http://www.garmin.com/xmlschemas/TrackPointExtension/v1}cad')
-                        cad_elem.text = value
-                    elif key == 'temp' or key == 'atemp':
-                        temp_elem = ET.SubElement(tpx, '{http://www.garmin.com/xmlschemas/TrackPointExtension/v1}temp')
-                        temp_elem.text = value
-            
-            # その他の拡張データ
-            for key, value in point['extensions'].items():
-                if key not in ['hr', 'cad', 'temp', 'atemp']:
-                    ext_elem = ET.SubElement(extensions, key)
-                    ext_elem.text = value
-        
-        return trkpt
+            writer.element('time', point['time'])
+        
+        writer.start('extensions')
+        
+        # Garmin拡張データ
+        garmin_ext = {}
+        for key, value in point['extensions'].items():
+            if key in ['hr', 'cad', 'temp', 'atemp']:
+                garmin_ext[key] = value
+        
+        if garmin_ext:
+            writer.start('gpxtpx:TrackPointExtension')
+            for key, value in garmin_ext.items():
+                # atempもtempとして出力
+                writer.element('gpxtpx:temp' if key == 'atemp' else f'gpxtpx:{key}', value)
+            writer.end()
+        
+        # その他の拡張データ
+        for key, value in point['extensions'].items():
+            if key not in ['hr', 'cad', 'temp', 'atemp']:
+                writer.element(key, value)
+        
+        writer.end()
+        writer.end()
 
     def _extract_service_extensions(self, gpx_data: Dict[str, Any]) -> Dict[str, str]:
         """サービス固有の拡張データを抽出
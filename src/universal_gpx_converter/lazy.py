@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+遅延読み込みGPX文書モジュール
+
+このモジュールは、GPXファイルのヘッダー（作成者、メタデータ、ウェイポイント）と
+トラックの概要（名前、タイプ、時間等）だけを先に読み込み、トラックポイントは
+最初に参照された時点で解析するLazyGPXDocumentを提供します。
+サービスの判定やアップロード状況の表示など、トラックポイントを必要としない処理は
+ファイル全体を解析せずに行えます。
+"""
+
+import logging
+import mmap
+import re
+import xml.etree.ElementTree as ET
+from collections.abc import Mapping, MutableMapping
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+import numpy as np
+
+from .parser import GPXParser, gpx_tags
+from .sources import GPXSource, is_path, read_input
+from .timestamps import NO_TIME, decode_timestamps
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# 文書の辞書としてのキー（GPXParser.parse_fileの戻り値と同じ）
+DOCUMENT_KEYS = ('creator', 'metadata', 'waypoints', 'tracks', 'all_points')
+
+# 要素名の直後に来る文字（<trkが<trksegや<trkptに一致しないように確認する）
+_NAME_TERMINATORS = b' \t\r\n/>'
+
+# 開始タグの要素名
+_TAG_NAME = re.compile(rb'<([^\s/>]+)')
+
+
+def _find_start_tag(buf: Any, name: bytes, start: int, end: int) -> int:
+    """指定した要素名の開始タグの位置を探す（見つからない場合は-1）"""
+    pattern = b'<' + name
+    while True:
+        pos = buf.find(pattern, start, end)
+        if pos < 0:
+            return -1
+        next_char = buf[pos + len(pattern):pos + len(pattern) + 1]
+        if next_char and next_char in _NAME_TERMINATORS:
+            return pos
+        start = pos + 1
+
+
+def _find_root(buf: Any) -> Tuple[int, bytes]:
+    """ルート要素の開始タグの終了位置と要素名を返す
+
+    XML宣言・処理命令・コメント・DOCTYPE宣言を読み飛ばし、最初の要素を探します。
+    """
+    pos = 0
+    while True:
+        pos = buf.find(b'<', pos)
+        if pos < 0:
+            raise ValueError("ルート要素が見つかりません")
+        if buf[pos:pos + 2] == b'<?':
+            end = buf.find(b'?>', pos)
+            pos = end + 2 if end >= 0 else -1
+        elif buf[pos:pos + 4] == b'<!--':
+            end = buf.find(b'-->', pos)
+            pos = end + 3 if end >= 0 else -1
+        elif buf[pos:pos + 2] == b'<!':
+            end = buf.find(b'>', pos)
+            pos = end + 1 if end >= 0 else -1
+        else:
+            break
+        if pos < 0:
+            raise ValueError("ルート要素が見つかりません")
+
+    match = _TAG_NAME.match(buf, pos)
+    end = buf.find(b'>', pos)
+    if not match or end < 0:
+        raise ValueError("ルート要素の開始タグが不正です")
+    return end + 1, match.group(1)
+
+
+class LazyTrack(MutableMapping):
+    """トラックの概要を保持し、'points'は参照された時点で読み込むトラック
+
+    名前・タイプ・番号・時間・説明は作成時に確定しています。'points'を参照すると
+    所属する文書の全トラックのトラックポイントをまとめて読み込みます
+    （欠けている標高と時間の補完は文書全体の時間順で決まるため）。
+    """
+
+    def __init__(self, header: Dict[str, Any], document: 'LazyGPXDocument', index: int):
+        """初期化
+
+        Args:
+            header: トラックのヘッダー情報の辞書
+            document: 所属する文書
+            index: 文書内のトラックの番号
+        """
+        self._data = header
+        self._document = document
+        self._index = index
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'points' and key not in self._data:
+            self._document.load_points()
+        return self._data[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._data[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del self._data[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key == 'points' or key in self._data
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._data
+        if 'points' not in self._data:
+            yield 'points'
+
+    def __len__(self) -> int:
+        return len(self._data) + ('points' not in self._data)
+
+    def __repr__(self) -> str:
+        header = {key: value for key, value in self._data.items() if key != 'points'}
+        return f"LazyTrack({header}, loaded={self.loaded})"
+
+    @property
+    def loaded(self) -> bool:
+        """トラックポイントを読み込み済みかどうか"""
+        return 'points' in self._data
+
+    @property
+    def point_count(self) -> int:
+        """トラックポイントの数（未読み込みの場合は解析せずに数える）"""
+        if self.loaded:
+            return len(self._data['points'])
+        return self._document._count_points(self._index)
+
+
+class LazyGPXDocument(Mapping):
+    """ヘッダーとトラックの概要のみを先に読み込むGPX文書
+
+    作成時にファイルのバイト列を走査して各トラックの位置を記録し、ヘッダーと
+    トラックの概要のみを解析します。トラックポイントは'all_points'または
+    いずれかのトラックの'points'が最初に参照された時点で、記録した位置から
+    各トラックの範囲だけを読み込んで解析します。
+
+    GPXParser.parse_fileの戻り値と同じキーを持つ読み取り用の辞書として扱えるため、
+    detect_serviceや各サービスのdetectはトラックポイントを読み込まずに利用できます。
+    """
+
+    def __init__(self, source: GPXSource, parser: Optional[GPXParser] = None,
+                 columnar: bool = False):
+        """初期化
+
+        Args:
+            source: GPXファイルのパス、GPXのバイト列、またはバイナリモードのファイルオブジェクト
+                （memoryviewとファイルオブジェクトは読み込んだバイト列を保持する）
+            parser: トラックの解析に使うパーサー（指定しない場合は新規作成）
+            columnar: Trueの場合はトラックポイントをTrackArrayとして読み込む
+
+        Raises:
+            ValueError: GPXとして解析できない場合
+        """
+        if not is_path(source) and not isinstance(source, (bytes, bytearray)):
+            # 走査にbytesのfind等を使うため、memoryviewやストリームはbytesにする
+            source = bytes(read_input(source))
+        self._source = source
+        self._parser = parser or GPXParser()
+        self._columnar = columnar
+        self._all_points = None
+
+        with self._open() as buf:
+            self._scan(buf)
+
+    @contextmanager
+    def _open(self) -> Iterator[Any]:
+        """バイト列を開く（ファイルはmmapで必要な範囲のみ参照する）"""
+        if isinstance(self._source, (bytes, bytearray)):
+            yield self._source
+            return
+
+        with open(self._source, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                yield buf
+
+    def _scan(self, buf: Any) -> None:
+        """トラックの位置を記録し、ヘッダーとトラックの概要を解析"""
+        root_end, root_name = _find_root(buf)
+        if root_name.rpartition(b':')[2] != b'gpx':
+            raise ValueError("GPXファイルではありません")
+
+        # GPXの要素はルート要素と同じ接頭辞を使う（通常は接頭辞なし）
+        prefix = root_name[:-len(b'gpx')]
+        self._prefix = prefix
+        self._prolog = bytes(buf[:root_end])
+        self._root_close = b'</' + root_name + b'>'
+        trk_close = b'</' + prefix + b'trk>'
+
+        # 各トラックの開始位置・トラックセグメントの開始位置・終了タグの位置
+        self._index = []
+        size = len(buf)
+        pos = root_end
+        while True:
+            start = _find_start_tag(buf, prefix + b'trk', pos, size)
+            if start < 0:
+                break
+            close = buf.find(trk_close, start)
+            if close < 0:
+                raise ValueError("トラック要素が閉じていません")
+            segment = _find_start_tag(buf, prefix + b'trkseg', start, close)
+            self._index.append((start, segment if segment >= 0 else close, close))
+            pos = close + len(trk_close)
+
+        # ヘッダーと各トラックのセグメントより前の部分だけで小さな文書を組み立てて解析
+        if self._index:
+            header_end = self._index[0][0]
+        else:
+            header_end = buf.rfind(self._root_close)
+            if header_end < root_end:
+                raise ValueError("ルート要素が閉じていません")
+
+        parts = [self._prolog, buf[root_end:header_end]]
+        for start, segment, _ in self._index:
+            parts.append(buf[start:segment])
+            parts.append(trk_close)
+        parts.append(self._root_close)
+        root = ET.fromstring(b''.join(parts))
+
+        self._ns = self._parser._detect_namespaces(root)
+        self._creator = root.get('creator', 'Unknown')
+        self._metadata = self._parser._parse_metadata(root, self._ns)
+        self._waypoints = self._parser._parse_waypoints(root, self._ns)
+
+        trk_elems = root.findall(gpx_tags(self._ns['gpx'])['trk'])
+        if len(trk_elems) != len(self._index):
+            raise ValueError("トラック要素の位置を特定できません")
+
+        # 各トラックの最初と最後のトラックポイントの時間（トラック内は時間順とみなす）
+        self._time_bounds = [self._find_time_bounds(buf, segment, close)
+                             for _, segment, close in self._index]
+
+        self._tracks = []
+        for i, trk in enumerate(trk_elems):
+            header = self._parser._parse_track_header(trk, self._ns)
+            del header['points']
+            # トラック時間がない場合は最初のポイントの時間を使用
+            first_time = self._time_bounds[i][0]
+            if 'time' not in header and first_time:
+                header['time'] = first_time
+            self._tracks.append(LazyTrack(header, self, i))
+
+        if 'time' not in self._metadata and self.start_time:
+            self._metadata['time'] = self.start_time
+
+    def _find_time_bounds(self, buf: Any, start: int, end: int) -> Tuple[Optional[str], Optional[str]]:
+        """範囲内の最初と最後のトラックポイントの時間の文字列を探す"""
+        time_open = b'<' + self._prefix + b'time>'
+        first_point = _find_start_tag(buf, self._prefix + b'trkpt', start, end)
+        if first_point < 0:
+            return None, None
+
+        bounds = []
+        for pos in (buf.find(time_open, first_point, end), buf.rfind(time_open, first_point, end)):
+            if pos < 0:
+                bounds.append(None)
+                continue
+            text_start = pos + len(time_open)
+            text_end = buf.find(b'<', text_start, end)
+            bounds.append(bytes(buf[text_start:text_end]).decode('utf-8').strip() or None)
+        return bounds[0], bounds[1]
+
+    def _count_points(self, index: int) -> int:
+        """トラックポイントを解析せずに数える"""
+        _, segment, close = self._index[index]
+        name = self._prefix + b'trkpt'
+        pattern = re.compile(b'<' + re.escape(name) + rb'[\s/>]')
+        with self._open() as buf:
+            return sum(1 for _ in pattern.finditer(buf, segment, close))
+
+    def load_points(self) -> None:
+        """全トラックのトラックポイントを読み込む（読み込み済みの場合は何もしない）
+
+        記録した位置から各トラックの範囲だけを読み込み、1トラックずつ解析します。
+        時間順の並べ替えと欠けている値の補完はGPXParser.parse_fileと同じです。
+        """
+        if self._all_points is not None:
+            return
+
+        try:
+            with self._open() as buf:
+                for track, (start, _, close) in zip(self._tracks, self._index):
+                    end = close + len(b'</' + self._prefix + b'trk>')
+                    fragment = ET.fromstring(self._prolog + buf[start:end] + self._root_close)
+                    parsed = self._parser._parse_tracks(fragment, self._ns, self._columnar)
+                    track['points'] = parsed[0]['points']
+
+            self._all_points = self._parser._collect_points(self._tracks, self._metadata,
+                                                            self._columnar)
+        except Exception as e:
+            logger.error(f"トラックポイントの読み込み中にエラーが発生しました: {e}")
+            raise
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in DOCUMENT_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: object) -> bool:
+        # Mappingの既定の実装は値を参照するため、トラックポイントを読み込まないよう上書き
+        return key in DOCUMENT_KEYS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(DOCUMENT_KEYS)
+
+    def __len__(self) -> int:
+        return len(DOCUMENT_KEYS)
+
+    def __repr__(self) -> str:
+        return (f"LazyGPXDocument(creator={self._creator!r}, tracks={len(self._tracks)}, "
+                f"loaded={self.loaded})")
+
+    @property
+    def creator(self) -> str:
+        """作成者"""
+        return self._creator
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """メタデータの辞書"""
+        return self._metadata
+
+    @property
+    def waypoints(self) -> List[Dict[str, Any]]:
+        """ウェイポイントのリスト"""
+        return self._waypoints
+
+    @property
+    def tracks(self) -> List[LazyTrack]:
+        """トラックのリスト（'points'は参照時に読み込む）"""
+        return self._tracks
+
+    @property
+    def all_points(self) -> List[Dict[str, Any]]:
+        """時間順の全トラックポイント（初回の参照時に読み込む）"""
+        self.load_points()
+        return self._all_points
+
+    @property
+    def loaded(self) -> bool:
+        """トラックポイントを読み込み済みかどうか"""
+        return self._all_points is not None
+
+    @property
+    def point_count(self) -> int:
+        """全トラックポイントの数（未読み込みの場合は解析せずに数える）"""
+        return sum(track.point_count for track in self._tracks)
+
+    @property
+    def start_time(self) -> Optional[str]:
+        """最初のトラックポイントの時間
+
+        トラックポイントの読み込み前は、各トラックの最初のトラックポイントの時間のうち
+        最も早いものを返します。
+        """
+        if self.loaded:
+            return self._all_points[0]['time'] if len(self._all_points) else None
+        return self._pick_time([first for first, _ in self._time_bounds], np.argmin)
+
+    @property
+    def end_time(self) -> Optional[str]:
+        """最後のトラックポイントの時間
+
+        トラックポイントの読み込み前は、各トラックの最後のトラックポイントの時間のうち
+        最も遅いものを返します。
+        """
+        if self.loaded:
+            return self._all_points[-1]['time'] if len(self._all_points) else None
+        return self._pick_time([last for _, last in self._time_bounds], np.argmax)
+
+    def _pick_time(self, texts: List[Optional[str]], select) -> Optional[str]:
+        """時間の文字列のうち最も早い（遅い）ものを選ぶ"""
+        texts = [text for text in texts if text]
+        if not texts:
+            return None
+        values = decode_timestamps(texts)
+        valid = values != NO_TIME
+        if not valid.any():
+            return texts[0]
+        candidates = [text for text, ok in zip(texts, valid.tolist()) if ok]
+        return candidates[int(select(values[valid]))]
+
+    def copy(self) -> Dict[str, Any]:
+        """通常の辞書に変換（トラックポイントを読み込む）
+
+        各サービスのconvert_to_universalはgpx_data.copy()を変換結果の元にするため、
+        GPXParser.parse_fileの戻り値と同じ浅いコピーを返します。
+
+        Returns:
+            Dict[str, Any]: 解析結果を含む辞書
+        """
+        return {key: self[key] for key in DOCUMENT_KEYS}
@@ -9,11 +9,17 @@ GPXファイルを、最も互換性の高い統一フォーマットに変換
 
 使用方法:
     python universal_gpx_converter.py input.gpx -o output.gpx -n "アクティビティ名" -t "アクティビティタイプ"
+    python universal_gpx_converter.py logs/ "more/**/*.gpx" --output-dir converted --workers 8
 
 オプション:
     -o, --output: 出力ファイル名（指定しない場合は入力ファイル名_converted.gpx）
     -n, --name: トラック名（指定しない場合は元のファイルから推測または自動生成）
     -t, --type: アクティビティタイプ（hiking, running, cycling等、デフォルト: hiking）
+    -i, --info: ヘッダー情報のみを表示（トラックポイントは解析しない）
+    --simplify: トラックを簡略化する許容誤差（メートル、指定した場合のみ間引く）
+    --resample: トラックポイントを再サンプリングする間隔（秒、指定した場合のみ）
+    --output-dir: 一括変換の出力ディレクトリ（入力のディレクトリ構成を再現）
+    --workers: 一括変換のワーカープロセス数（デフォルト: CPU数）
 """
 
 import argparse
@@ -24,6 +30,28 @@ import xml.etree.ElementTree as ET
 from datetime import datetime
 from xml.dom import minidom
 import logging
+from functools import partial
+
+if __package__:
+    from .accumulators import StatisticsCollector
+    from .batch import batch_output_path, duplicate_outputs, expand_inputs, format_duplicates, format_summary, is_batch_input, run_batch
+    from .parser import GPXParser, gpx_tags, merge_points_by_time
+    from .resample import format_resample, resample_tracks
+    from .simplify import format_reduction, simplify_points
+    from .sources import open_input, source_name, write_text
+    from .stats import compute_statistics, format_statistics
+    from .timestamps import parse_datetime
+else:
+    # スクリプトとして直接実行された場合はsrcディレクトリからパッケージを読み込む
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from universal_gpx_converter.accumulators import StatisticsCollector
+    from universal_gpx_converter.batch import batch_output_path, duplicate_outputs, expand_inputs, format_duplicates, format_summary, is_batch_input, run_batch
+    from universal_gpx_converter.parser import GPXParser, gpx_tags, merge_points_by_time
+    from universal_gpx_converter.resample import format_resample, resample_tracks
+    from universal_gpx_converter.simplify import format_reduction, simplify_points
+    from universal_gpx_converter.sources import open_input, source_name, write_text
+    from universal_gpx_converter.stats import compute_statistics, format_statistics
+    from universal_gpx_converter.timestamps import parse_datetime
 
 # ロギング設定
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
@@ -36,6 +64,10 @@ NAMESPACES = {
     'gpxtpx': 'http://www.garmin.com/xmlschemas/TrackPointExtension/v1'
 }
 
+# 再サンプリングで補間した座標・標高の小数点以下の桁数（各サービスの形式と同じ）
+RESAMPLE_COORDINATE_DIGITS = 9
+RESAMPLE_ELEVATION_DIGITS = 1
+
 def register_namespaces():
     """XMLの名前空間を登録"""
     for prefix, uri in NAMESPACES.items():
@@ -43,33 +75,41 @@ def register_namespaces():
     # デフォルト名前空間
     ET.register_namespace('', 'http://www.topografix.com/GPX/1/1')
 
-def parse_gpx_file(file_path):
-    """GPXファイルを解析し、トラックポイントとメタデータを抽出"""
+def parse_gpx_file(file_path, statistics=None):
+    """GPXファイル（パス・バイト列・ファイルオブジェクト）を解析し、トラックポイントとメタデータを抽出
+    
+    statisticsにStatisticsCollectorを指定すると、各トラックの解析と同時に統計を集計する
+    """
     try:
-        tree = ET.parse(file_path)
+        with open_input(file_path) as f:
+            tree = ET.parse(f)
         root = tree.getroot()
         
         # 名前空間を取得（ファイルによって異なる場合がある）
-        ns = {'gpx': root.tag.split('}')[0].strip('{')} if '}' in root.tag else NAMESPACES['gpx']
+        namespace = root.tag.split('}')[0].strip('{') if '}' in root.tag else NAMESPACES['gpx']
+        tags = gpx_tags(namespace)
+        ele_tag = tags['ele']
+        time_tag = tags['time']
+        extensions_tag = tags['extensions']
         
         # ファイル情報
         creator = root.get('creator', 'Unknown')
         
         # メタデータ
         metadata = {}
-        metadata_elem = root.find('.//{{{0}}}metadata'.format(ns['gpx']))
+        metadata_elem = root.find(tags['metadata'])
         if metadata_elem is not None:
-            time_elem = metadata_elem.find('.//{{{0}}}time'.format(ns['gpx']))
+            time_elem = metadata_elem.find(time_tag)
             if time_elem is not None:
                 metadata['time'] = time_elem.text
         
         # 全トラックとポイントを抽出
         tracks = []
-        for trk in root.findall('.//{{{0}}}trk'.format(ns['gpx'])):
+        for trk in root.findall(tags['trk']):
             track = {'points': []}
             
             # トラック名
-            name_elem = trk.find('.//{{{0}}}name'.format(ns['gpx']))
+            name_elem = trk.find(tags['name'])
             if name_elem is not None:
                 # CDATAセクションを処理
                 if name_elem.text and ']]>' in name_elem.text:
@@ -78,18 +118,18 @@ def parse_gpx_file(file_path):
                     track['name'] = name_elem.text
             
             # トラックタイプ
-            type_elem = trk.find('.//{{{0}}}type'.format(ns['gpx']))
+            type_elem = trk.find(tags['type'])
             if type_elem is not None:
                 track['type'] = type_elem.text
             
             # トラック時間（Runkeeper形式）
-            time_elem = trk.find('.//{{{0}}}time'.format(ns['gpx']))
+            time_elem = trk.find(time_tag)
             if time_elem is not None:
                 track['time'] = time_elem.text
             
             # トラックセグメントとポイント
-            for trkseg in trk.findall('.//{{{0}}}trkseg'.format(ns['gpx'])):
-                for trkpt in trkseg.findall('.//{{{0}}}trkpt'.format(ns['gpx'])):
+            for trkseg in trk.findall(tags['trkseg']):
+                for trkpt in trkseg.findall(tags['trkpt']):
                     point = {
                         'lat': trkpt.get('lat'),
                         'lon': trkpt.get('lon'),
@@ -98,36 +138,31 @@ def parse_gpx_file(file_path):
                         'extensions': {}
                     }
                     
-                    ele_elem = trkpt.find('.//{{{0}}}ele'.format(ns['gpx']))
-                    if ele_elem is not None:
-                        point['ele'] = ele_elem.text
-                    
-                    time_elem = trkpt.find('.//{{{0}}}time'.format(ns['gpx']))
-                    if time_elem is not None:
-                        point['time'] = time_elem.text
-                        # 時間情報をdatetimeオブジェクトに変換（ソート用）
-                        try:
-                            point['datetime'] = datetime.fromisoformat(time_elem.text.replace('Z', '+00:00'))
-                        except ValueError:
-                            point['datetime'] = datetime.min
-                    
-                    # 拡張データ（Garmin等）
-                    extensions_elem = trkpt.find('.//{{{0}}}extensions'.format(ns['gpx']))
-                    if extensions_elem is not None:
-                        for ext in extensions_elem:
-                            tag = ext.tag.split('}')[-1]
-                            point['extensions'][tag] = ext.text
+                    # 子要素を1回だけ走査して要素名で振り分ける
+                    for child in trkpt:
+                        tag = child.tag
+                        if tag == ele_tag:
+                            point['ele'] = child.text
+                        elif tag == time_tag:
+                            point['time'] = child.text
+                            # 時間情報をdatetimeオブジェクトに変換（ソート用）
+                            try:
+                                point['datetime'] = parse_datetime(child.text)
+                            except ValueError:
+                                point['datetime'] = datetime.min
+                        elif tag == extensions_tag:
+                            # 拡張データ（Garmin等）
+                            for ext in child:
+                                point['extensions'][ext.tag.split('}')[-1]] = ext.text
                     
                     track['points'].append(point)
             
+            if statistics is not None:
+                statistics.add_points(track['points'])
             tracks.append(track)
         
         # 最初と最後の時間を取得
-        all_points = []
-        for track in tracks:
-            all_points.extend(track['points'])
-        
-        all_points.sort(key=lambda x: x.get('datetime', datetime.min))
+        all_points = merge_points_by_time([track['points'] for track in tracks])
         
         if all_points:
             first_point = all_points[0]
@@ -148,7 +183,7 @@ def parse_gpx_file(file_path):
         }
     
     except Exception as e:
-        logger.error(f"ファイル '{file_path}' の解析中にエラーが発生しました: {e}")
+        logger.error(f"ファイル '{source_name(file_path)}' の解析中にエラーが発生しました: {e}")
         return None
 
 def create_universal_gpx(gpx_data, output_file, track_name=None, activity_type=None):
@@ -199,8 +234,8 @@ def create_universal_gpx(gpx_data, output_file, track_name=None, activity_type=N
             
             if 'time' in first_point and 'time' in last_point:
                 try:
-                    start_date = datetime.fromisoformat(first_point['time'].replace('Z', '+00:00'))
-                    end_date = datetime.fromisoformat(last_point['time'].replace('Z', '+00:00'))
+                    start_date = parse_datetime(first_point['time'])
+                    end_date = parse_datetime(last_point['time'])
                     days = (end_date.date() - start_date.date()).days
                     
                     if days > 0:
@@ -263,16 +298,71 @@ def create_universal_gpx(gpx_data, output_file, track_name=None, activity_type=N
     # XML宣言を修正（エンコーディングをUTF-8に）
     pretty_xml = pretty_xml.replace('<?xml version="1.0" ?>', '<?xml version="1.0" encoding="UTF-8"?>')
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(pretty_xml)
+    write_text(output_file, pretty_xml)
     
     return True
 
-def analyze_gpx(gpx_data):
-    """GPXデータの分析情報を表示"""
-    if not gpx_data:
-        return
+def simplify_gpx(gpx_data, tolerance):
+    """全トラックポイントを間引き、削減率を表示（残した点の時間はそのまま）"""
+    original = len(gpx_data['all_points'])
+    gpx_data['all_points'] = simplify_points(gpx_data['all_points'], tolerance)
+    logger.info(format_reduction(original, len(gpx_data['all_points'])))
+
+def resample_gpx(gpx_data, interval):
+    """全トラックポイントをトラックごとに一定の時間間隔に再サンプリング（トラックの境界・夜間等の中断をまたいで補間しない）"""
+    original = len(gpx_data['all_points'])
+    gpx_data['all_points'] = resample_tracks([track['points'] for track in gpx_data['tracks']], interval,
+                                             precision=(RESAMPLE_COORDINATE_DIGITS, RESAMPLE_ELEVATION_DIGITS))
+    logger.info(format_resample(original, len(gpx_data['all_points']), interval))
+
+def convert_file(input_file, output_file, track_name=None, activity_type=None, simplify_tolerance=None,
+                 resample_interval=None):
+    """GPXファイルを統一フォーマットに変換し、ポイント数を返す（一括変換用、失敗時はNone）"""
+    gpx_data = parse_gpx_file(input_file)
+    if gpx_data and resample_interval:
+        resample_gpx(gpx_data, resample_interval)
+    if gpx_data and simplify_tolerance:
+        simplify_gpx(gpx_data, simplify_tolerance)
+    if not gpx_data or not create_universal_gpx(gpx_data, output_file, track_name, activity_type):
+        return None
+    return len(gpx_data['all_points'])
+
+def batch_convert(args):
+    """ファイル・ディレクトリ・グロブパターンで指定された複数のGPXファイルを一括変換"""
+    suffix = '_converted'
+    files = expand_inputs(args.input_file, exclude_dir=args.output_dir,
+                          exclude_suffix=None if args.output_dir else suffix)
+    if not files:
+        logger.error("変換するGPXファイルがありません")
+        return 1
+    
+    if args.output:
+        logger.warning("一括変換では-o/--outputは使用しません（--output-dirを指定してください）")
+    
+    jobs = [(input_file, batch_output_path(input_file, relative_path, args.output_dir, suffix))
+            for input_file, relative_path in files]
+    
+    duplicates = duplicate_outputs(jobs)
+    if duplicates:
+        for line in format_duplicates(duplicates):
+            logger.error(line)
+        return 1
+    
+    logger.info(f"{len(jobs)}個のGPXファイルを一括変換中...")
+    convert = partial(convert_file, track_name=args.name, activity_type=args.type,
+                      simplify_tolerance=args.simplify, resample_interval=args.resample)
+    summary = run_batch(jobs, convert, args.workers)
+    
+    for line in format_summary(summary):
+        logger.info(line)
     
+    return 1 if summary['failures'] else 0
+
+def analyze_gpx_header(gpx_data):
+    """GPXデータのヘッダー情報（作成者、メタデータ、トラック）を表示
+    
+    遅延読み込みの文書（LazyGPXDocument）の場合はトラックポイントを解析せずに表示する
+    """
     logger.info("GPXファイル分析:")
     logger.info(f"  作成者: {gpx_data['creator']}")
     
@@ -289,53 +379,72 @@ def analyze_gpx(gpx_data):
             logger.info(f"    名前: {track['name']}")
         if 'type' in track:
             logger.info(f"    タイプ: {track['type']}")
-        logger.info(f"    ポイント数: {len(track['points'])}")
+        if hasattr(track, 'point_count'):
+            logger.info(f"    ポイント数: {track.point_count}")
+        else:
+            logger.info(f"    ポイント数: {len(track['points'])}")
+
+def analyze_gpx(gpx_data, statistics=None):
+    """GPXデータの分析情報を表示
+    
+    statisticsに解析と同時に集計した統計を指定した場合は、トラックポイントを再度走査しない
+    """
+    if not gpx_data:
+        return
+    
+    analyze_gpx_header(gpx_data)
     
-    # 日付分析
+    # 距離・標高・速度と日付ごとの集計（列ごとにまとめて計算）
     if gpx_data['all_points']:
-        dates = {}
-        min_date = None
-        max_date = None
-        
-        for point in gpx_data['all_points']:
-            if 'datetime' in point:
-                dt = point['datetime']
-                date_str = dt.strftime('%Y-%m-%d')
-                dates[date_str] = dates.get(date_str, 0) + 1
-                
-                if min_date is None or dt < min_date:
-                    min_date = dt
-                if max_date is None or dt > max_date:
-                    max_date = dt
-        
-        if min_date and max_date:
-            logger.info("  日付分析:")
-            logger.info(f"    開始日時: {min_date.strftime('%Y-%m-%d %H:%M:%S')}")
-            logger.info(f"    終了日時: {max_date.strftime('%Y-%m-%d %H:%M:%S')}")
-            
-            days = (max_date.date() - min_date.date()).days
-            logger.info(f"    期間: {days}日")
-            
-            logger.info(f"    ユニークな日付: {len(dates)}")
-            logger.info("    日付ごとのポイント数:")
-            for date, count in sorted(dates.items()):
-                logger.info(f"      {date}: {count}ポイント")
+        if statistics is None:
+            statistics = compute_statistics(gpx_data['all_points'])
+        for line in format_statistics(statistics):
+            logger.info(line)
 
 def main():
     """メイン関数"""
     parser = argparse.ArgumentParser(description='様々なサービスのGPXファイルを統一フォーマットに変換します')
-    parser.add_argument('input_file', help='入力GPXファイル')
+    parser.add_argument('input_file', nargs='+',
+                        help='入力GPXファイル（複数のファイル・ディレクトリ・グロブパターンを指定すると一括変換）')
     parser.add_argument('-o', '--output', help='出力ファイル名（指定しない場合は入力ファイル名_converted.gpx）')
     parser.add_argument('-n', '--name', help='トラック名（指定しない場合は元のファイルから推測または自動生成）')
     parser.add_argument('-t', '--type', help='アクティビティタイプ（hiking, running, cycling等、デフォルト: 元のファイルから推測またはhiking）')
     parser.add_argument('-a', '--analyze', action='store_true', help='GPXファイルの分析情報を表示')
+    parser.add_argument('-i', '--info', action='store_true', help='ヘッダー情報のみを表示（トラックポイントは解析しない）')
+    parser.add_argument('--simplify', type=float, metavar='METERS',
+                        help='トラックを簡略化する許容誤差（メートル、指定した場合のみVisvalingam–Whyatt法で間引く）')
+    parser.add_argument('--resample', type=int, metavar='SECONDS',
+                        help='トラックポイントを一定の間隔（秒）に再サンプリングする（簡略化より先に行う）')
+    parser.add_argument('--output-dir', help='一括変換の出力ディレクトリ（入力のディレクトリ構成を再現、指定しない場合は入力ファイルと同じ場所）')
+    parser.add_argument('--workers', type=int, help='一括変換のワーカープロセス数（デフォルト: CPU数）')
     
     args = parser.parse_args()
     
+    # 一括変換
+    if args.output_dir or is_batch_input(args.input_file):
+        return batch_convert(args)
+    
+    args.input_file = args.input_file[0]
+    
     if not os.path.exists(args.input_file):
         logger.error(f"ファイル '{args.input_file}' が見つかりません")
         return 1
     
+    # ヘッダー情報のみの表示（変換は行わない）
+    if args.info:
+        gpx_parser = GPXParser()
+        document = gpx_parser.parse_file(args.input_file, lazy=True)
+        if not document:
+            logger.error("ヘッダー情報の読み込みに失敗しました")
+            return 1
+        
+        analyze_gpx_header(document)
+        service, confidence = gpx_parser.detect_service_confidence(document)
+        logger.info(f"  サービス: {service}（確信度: {confidence:.2f}）")
+        logger.info(f"  開始時間: {document.start_time}")
+        logger.info(f"  終了時間: {document.end_time}")
+        return 0
+    
     # 出力ファイル名の決定
     if args.output:
         output_file = args.output
@@ -344,7 +453,9 @@ def main():
         output_file = f"{base_name}_converted{ext}"
     
     logger.info(f"GPXファイル '{args.input_file}' を解析中...")
-    gpx_data = parse_gpx_file(args.input_file)
+    # 分析する場合は解析と同時に統計を集計
+    collector = StatisticsCollector() if args.analyze else None
+    gpx_data = parse_gpx_file(args.input_file, collector)
     
     if not gpx_data:
         logger.error("変換に失敗しました")
@@ -352,7 +463,13 @@ def main():
     
     # 分析情報の表示
     if args.analyze:
-        analyze_gpx(gpx_data)
+        analyze_gpx(gpx_data, collector.result())
+    
+    # トラックの再サンプリングと簡略化（分析は元のトラックポイントで行う）
+    if args.resample:
+        resample_gpx(gpx_data, args.resample)
+    if args.simplify:
+        simplify_gpx(gpx_data, args.simplify)
     
     logger.info(f"統一フォーマットのGPXファイルを作成中...")
     if create_universal_gpx(gpx_data, output_file, args.name, args.type):
@@ -370,8 +487,8 @@ def main():
             
             if 'time' in first_point and 'time' in last_point:
                 try:
-                    start_time = datetime.fromisoformat(first_point['time'].replace('Z', '+00:00'))
-                    end_time = datetime.fromisoformat(last_point['time'].replace('Z', '+00:00'))
+                    start_time = parse_datetime(first_point['time'])
+                    end_time = parse_datetime(last_point['time'])
                     duration = end_time - start_time
                     
                     logger.info(f"  開始時間: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+トラックポイント正規化モジュール
+
+このモジュールは、各サービスのnormalize_trackpoints・convert_to_universalが共通で使う
+トラックポイントの正規化（座標・標高の桁数の調整）を提供します。座標と標高は
+1点ずつではなく列ごとにまとめて変換・整形し、各トラックの'points'と'all_points'に
+同じトラックポイントが含まれる場合は1回だけ正規化した結果を両方で共有します。
+"""
+
+import logging
+from typing import Dict, List, Any, Mapping, Sequence
+
+from .track_array import TrackArray
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+
+def format_decimals(values: Sequence[str], digits: int) -> List[str]:
+    """文字列の列を浮動小数点数として小数点以下digits桁に整形
+
+    各値にf"{float(value):.{digits}f}"を適用した結果と同じで、浮動小数点数に
+    変換できない値（ValueError）は元の文字列のままにします。
+
+    Args:
+        values: 数値の文字列の列
+        digits: 小数点以下の桁数
+
+    Returns:
+        List[str]: 整形した文字列のリスト
+    """
+    try:
+        numbers = tuple(map(float, values))
+    except ValueError:
+        # 変換できない値がある場合は1つずつ整形する
+        results = []
+        for value in values:
+            try:
+                results.append(f"{float(value):.{digits}f}")
+            except ValueError:
+                results.append(value)
+        return results
+
+    if not numbers:
+        return []
+    # 全ての値を1回の書式化でまとめて文字列にする
+    return ((f"%.{digits}f\n" * len(numbers)) % numbers).split('\n')[:-1]
+
+
+def _normalize_field(points: List[Dict[str, Any]], normalized: List[Dict[str, Any]],
+                     field: str, digits: int, skip_empty: bool = False) -> None:
+    """トラックポイントの1項目を列としてまとめて整形し、normalizedに設定"""
+    try:
+        values = [point[field] for point in points]
+        indices = None
+    except KeyError:
+        indices = [i for i, point in enumerate(points) if field in point]
+        values = [points[i][field] for i in indices]
+
+    if skip_empty:
+        present = [i for i, value in enumerate(values) if value]
+        if len(present) != len(values):
+            indices = present if indices is None else [indices[i] for i in present]
+            values = [values[i] for i in present]
+
+    formatted = format_decimals(values, digits)
+    if indices is None:
+        for point, value in zip(normalized, formatted):
+            point[field] = value
+    else:
+        for i, value in zip(indices, formatted):
+            normalized[i][field] = value
+
+
+def normalize_points(points: List[Dict[str, Any]], coordinate_digits: int,
+                     elevation_digits: int, copy: bool = True) -> List[Dict[str, Any]]:
+    """トラックポイントの座標・標高を指定した桁数に整形
+
+    標高が空のトラックポイントはそのままにします。
+
+    Args:
+        points: トラックポイントのリスト（TrackArrayも可）
+        coordinate_digits: 緯度・経度の小数点以下の桁数
+        elevation_digits: 標高の小数点以下の桁数
+        copy: Trueの場合は元のトラックポイントを変更せず、整形した値を持つコピーを返す
+            （Falseの場合は元のトラックポイントを書き換える）
+
+    Returns:
+        List[Dict[str, Any]]: 正規化したトラックポイントのリスト
+            （TrackArrayを渡した場合はTrackArray）
+    """
+    if isinstance(points, TrackArray):
+        # 値は変更せず、辞書表現で整形する桁数を指定（辞書形式と同じ文字列になる）
+        return points.with_precision(coordinate_digits, elevation_digits, in_place=not copy)
+
+    points = list(points)
+    normalized = list(map(dict.copy, points)) if copy else points
+    _normalize_field(points, normalized, 'lat', coordinate_digits)
+    _normalize_field(points, normalized, 'lon', coordinate_digits)
+    _normalize_field(points, normalized, 'ele', elevation_digits, skip_empty=True)
+    return normalized
+
+
+def prepare_gpx_data(gpx_data: Mapping[str, Any], copy: bool = False) -> Dict[str, Any]:
+    """各サービスのconvert_to_universalで変換するGPXデータを用意
+
+    copy=Falseの場合は、変換がgpx_dataを直接書き換えるため、gpx_dataをそのまま返します
+    （LazyGPXDocumentは辞書に変換します）。copy=Trueの場合は、変換で書き換える辞書
+    （全体・メタデータ・各トラック）をコピーして返し、gpx_dataは変更しません
+    （トラックポイントはnormalize_gpx_points(copy=True)がコピーします）。
+
+    Args:
+        gpx_data: GPXデータ（GPXParser.parse_fileの解析結果）
+        copy: 元のgpx_dataを変更しないようにコピーするかどうか
+
+    Returns:
+        Dict[str, Any]: 変換するGPXデータ
+    """
+    if not copy:
+        return gpx_data if isinstance(gpx_data, dict) else gpx_data.copy()
+
+    data = dict(gpx_data)
+    if isinstance(data.get('metadata'), dict):
+        data['metadata'] = dict(data['metadata'])
+    if 'tracks' in data:
+        data['tracks'] = [dict(track) for track in data['tracks']]
+    return data
+
+
+def normalize_gpx_points(gpx_data: Dict[str, Any], coordinate_digits: int,
+                         elevation_digits: int, copy: bool = False) -> None:
+    """GPXデータの各トラックの'points'と'all_points'を正規化
+
+    同じトラックポイント（辞書の場合は同じオブジェクト）は1回だけ正規化し、各トラックの
+    'points'と'all_points'で結果を共有します。TrackArrayは値を変更せずに辞書表現の桁数のみを
+    指定するため、各トラックと'all_points'は元の列を共有したままです。
+    指定した桁数はgpx_dataの'precision'に（座標、標高）として記録し、変換時に補間した点
+    （再サンプリング等）も同じ桁数で整形します。
+
+    Args:
+        gpx_data: GPXデータ（各サービスのconvert_to_universalの変換結果）
+        coordinate_digits: 緯度・経度の小数点以下の桁数
+        elevation_digits: 標高の小数点以下の桁数
+        copy: Trueの場合はトラックポイントをコピーして正規化し、各トラックの'points'と
+            'all_points'を置き換える（Falseの場合はトラックポイントを直接書き換える）
+    """
+    gpx_data['precision'] = (coordinate_digits, elevation_digits)
+    tracks = [track for track in gpx_data.get('tracks', []) if 'points' in track]
+    has_all_points = 'all_points' in gpx_data
+    all_points = gpx_data.get('all_points')
+    if has_all_points and not isinstance(all_points, (list, TrackArray)):
+        # ストリーミング解析のイテレータ等
+        all_points = list(all_points)
+        gpx_data['all_points'] = all_points
+    point_lists = [track['points'] for track in tracks]
+    if has_all_points:
+        point_lists.append(all_points)
+
+    if any(isinstance(points, TrackArray) for points in point_lists):
+        # TrackArrayは列を共有したまま桁数のみを指定するため、それぞれ正規化する
+        for track in tracks:
+            track['points'] = normalize_points(track['points'], coordinate_digits, elevation_digits, copy)
+        if has_all_points:
+            gpx_data['all_points'] = normalize_points(all_points, coordinate_digits, elevation_digits, copy)
+        return
+
+    # 各トラックと全ポイントに含まれるトラックポイントを重複なく集める
+    positions = {}
+    unique_points = []
+    for points in point_lists:
+        for point in points:
+            if id(point) not in positions:
+                positions[id(point)] = len(unique_points)
+                unique_points.append(point)
+
+    normalized = normalize_points(unique_points, coordinate_digits, elevation_digits, copy)
+    if not copy:
+        # トラックポイントを書き換えたため、各リストはそのままでよい
+        return
+    for track in tracks:
+        track['points'] = [normalized[positions[id(point)]] for point in track['points']]
+    if has_all_points:
+        gpx_data['all_points'] = [normalized[positions[id(point)]] for point in all_points]
@@ -10,8 +10,17 @@ GPXファイルを解析し、統一的なデータ構造に変換する機能
 
 import xml.etree.ElementTree as ET
 from datetime import datetime
+from functools import lru_cache
+import itertools
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+import operator
+from typing import Dict, List, Any, Optional, Tuple, Iterator
+
+import numpy as np
+
+from .sources import GPXSource, open_input, read_input, source_name
+from .timestamps import parse_datetime
+from .track_array import TrackArray, TrackArrayBuilder
 
 # ロギング設定
 logger = logging.getLogger(__name__)
@@ -23,24 +32,184 @@ NAMESPACES = {
     'gpxtpx': 'http://www.garmin.com/xmlschemas/TrackPointExtension/v1'
 }
 
+# ストリーミングモードで補完値が確定するまで保留するトラックポイントの上限
+FILL_LOOKAHEAD = 1000
+
+# 解析結果の形式のバージョン（解析結果が変わる変更をした場合は更新する、キャッシュのキーに使用）
+PARSER_VERSION = '1'
+
+# ソートに使うトラックポイントの時間の取り出し
+_DATETIME_GETTER = operator.itemgetter('datetime')
+
+# 修飾名を事前に作成しておくGPXの要素名
+GPX_ELEMENTS = (
+    'metadata', 'wpt', 'trk', 'trkseg', 'trkpt',
+    'name', 'desc', 'time', 'keywords', 'author', 'link', 'text',
+    'ele', 'sym', 'type', 'number', 'extensions'
+)
+
+
+@lru_cache(maxsize=None)
+def gpx_tags(namespace: str) -> Dict[str, str]:
+    """GPXの要素名から修飾名（{名前空間}要素名）への辞書を作成
+
+    修飾名は名前空間ごとに一度だけ作成し、以降はキャッシュした辞書を返します
+    （返した辞書は共有されるため変更しないこと）。
+
+    Args:
+        namespace: GPXの名前空間URI
+
+    Returns:
+        Dict[str, str]: 要素名と修飾名の辞書
+    """
+    return {name: f'{{{namespace}}}{name}' for name in GPX_ELEMENTS}
+
+
+def _point_time(point: Dict[str, Any]) -> datetime:
+    """ソートに使うトラックポイントの時間（時間のない点はdatetime.min）"""
+    return point.get('datetime', datetime.min)
+
+
+def merge_points_by_time(point_lists: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """トラックごとのトラックポイントを時間順に併合
+
+    結果は全ポイントを連結して時間で安定ソートした場合と同じです。
+    トラック内のポイントは通常すでに時間順のため、連結した列が時間順かを
+    線形時間で確認し、時間順でない場合のみ安定ソートします。
+    安定ソート（Timsort）は時間順に並んだ各トラックを既存の区間として
+    併合するため、トラック数kに対してO(n log k)で済みます。
+
+    Args:
+        point_lists: トラックごとのトラックポイントのリスト
+
+    Returns:
+        List[Dict[str, Any]]: 時間順に並べた全トラックポイント
+    """
+    all_points = []
+    for points in point_lists:
+        all_points.extend(points)
+    
+    # 全ポイントに時間がある場合（通常はこちら）はC実装のitemgetterで時間を取り出す
+    key = _DATETIME_GETTER
+    try:
+        times = list(map(key, all_points))
+    except KeyError:
+        key = _point_time
+        times = list(map(key, all_points))
+    
+    # 複数日のヤマレコのように各トラックが前後に並んでいる場合は並べ替え不要
+    if all(map(operator.le, times, itertools.islice(times, 1, None))):
+        return all_points
+    
+    all_points.sort(key=key)
+    return all_points
+
+
 class GPXParser:
     """GPXファイルを解析するクラス"""
 
-    def __init__(self):
-        """初期化"""
+    def __init__(self, cache: Optional['ParseCache'] = None):
+        """初期化
+
+        Args:
+            cache: 解析結果のキャッシュ（指定した場合はparse_fileの通常モードで利用）
+        """
         self.namespaces = NAMESPACES
+        self.cache = cache
 
-    def parse_file(self, file_path: str) -> Dict[str, Any]:
+    def parse_file(self, file_path: GPXSource, streaming: bool = False,
+                   columnar: bool = False, lazy: bool = False,
+                   statistics: Optional['StatisticsCollector'] = None) -> Dict[str, Any]:
         """GPXファイルを解析し、トラックポイントとメタデータを抽出
 
         Args:
-            file_path: GPXファイルのパス
+            file_path: GPXファイルのパス、GPXのバイト列（bytes・memoryview等）、
+                またはバイナリモードのファイルオブジェクト（解析済みのElementTreeの場合は
+                XMLを解析し直さず、キャッシュも使わない）
+            streaming: Trueの場合はiterparseで逐次解析し、'all_points'を
+                トラックポイントのイテレータとして返す（メモリ使用量が一定）
+            columnar: Trueの場合は各トラックの'points'と'all_points'を
+                辞書のリストではなくTrackArrayとして返す
+            lazy: Trueの場合はヘッダーとトラックの概要のみを読み込み、
+                トラックポイントは最初に参照された時点で解析する
+                LazyGPXDocumentを返す
+            statistics: 解析と同時に統計を集計するStatisticsCollector
+                （トラックポイントを文書順に渡す、ストリーミングモードでは
+                'all_points'を読み終えた時点で集計が確定）
 
         Returns:
             Dict[str, Any]: 解析結果を含む辞書
         """
+        if isinstance(file_path, ET.ElementTree):
+            return self._parse_tree(file_path, columnar, statistics)
+        
+        if streaming:
+            return self._parse_file_streaming(file_path, statistics)
+        
+        if lazy:
+            if statistics is not None:
+                logger.warning("遅延読み込みでは解析と同時の統計の集計は行いません")
+            return self._parse_file_lazy(file_path, columnar)
+        
+        if self.cache is not None:
+            return self._parse_file_cached(file_path, columnar, statistics)
+        
+        return self._parse_tree(file_path, columnar, statistics)
+
+    def _parse_file_cached(self, file_path: GPXSource, columnar: bool = False,
+                           statistics: Optional['StatisticsCollector'] = None) -> Dict[str, Any]:
+        """キャッシュにある解析結果を返し、ない場合は解析してキャッシュに保存
+
+        Args:
+            file_path: GPXファイルのパス、GPXのバイト列、またはバイナリモードのファイルオブジェクト
+            columnar: Trueの場合はトラックポイントをTrackArrayとして返す
+            statistics: 統計を集計するStatisticsCollector（キャッシュにある場合は各トラックの補完前のポイントから集計）
+
+        Returns:
+            Dict[str, Any]: 解析結果を含む辞書（エラー時はNone）
+        """
         try:
-            tree = ET.parse(file_path)
+            content = read_input(file_path)
+        except Exception as e:
+            logger.error(f"ファイル '{source_name(file_path)}' の読み込み中にエラーが発生しました: {e}")
+            return None
+        
+        # キャッシュには補完前の解析結果を保存し、統計はキャッシュの有無によらず補完前のポイントから集計する
+        key = self.cache.key(content, columnar)
+        result = self.cache.load(key)
+        if result is not None:
+            if statistics is not None:
+                for track in result['tracks']:
+                    statistics.add_points(track['points'])
+        else:
+            result = self._parse_tree(content, columnar, statistics, fill=False)
+            if result is None:
+                return None
+            self.cache.store(key, result)
+        
+        self._fill_missing(result['all_points'], result['tracks'], columnar)
+        return result
+
+    def _parse_tree(self, file_path: GPXSource, columnar: bool = False,
+                    statistics: Optional['StatisticsCollector'] = None, fill: bool = True) -> Dict[str, Any]:
+        """GPXファイル全体をElementTreeで解析
+
+        Args:
+            file_path: GPXファイルのパス、GPXのバイト列、バイナリモードのファイルオブジェクト、
+                または解析済みのElementTree
+            columnar: Trueの場合はトラックポイントをTrackArrayとして返す
+            statistics: 解析と同時に統計を集計するStatisticsCollector
+            fill: Falseの場合は標高と時間の情報がないポイントを補完しない
+
+        Returns:
+            Dict[str, Any]: 解析結果を含む辞書（エラー時はNone）
+        """
+        try:
+            if isinstance(file_path, ET.ElementTree):
+                tree = file_path
+            else:
+                with open_input(file_path) as f:
+                    tree = ET.parse(f)
             root = tree.getroot()
             
             # 名前空間を取得（ファイルによって異なる場合がある）
@@ -56,29 +225,8 @@ class GPXParser:
             waypoints = self._parse_waypoints(root, ns)
             
             # 全トラックとポイントを抽出
-            tracks = self._parse_tracks(root, ns)
-            
-            # 全ポイントを時間順にソート
-            all_points = []
-            for track in tracks:
-                all_points.extend(track['points'])
-            
-            all_points.sort(key=lambda x: x.get('datetime', datetime.min))
-            
-            # 最初と最後の時間を取得
-            if all_points:
-                first_point = all_points[0]
-                last_point = all_points[-1]
-                
-                if 'time' in first_point and 'time' in last_point:
-                    start_time = first_point['time']
-                    end_time = last_point['time']
-                    
-                    if 'time' not in metadata:
-                        metadata['time'] = start_time
-            
-            # 標高と時間の情報がない場合は補完
-            self._fill_missing_data(all_points)
+            tracks = self._parse_tracks(root, ns, columnar, statistics)
+            all_points = self._collect_points(tracks, metadata, columnar, fill)
             
             return {
                 'creator': creator,
@@ -89,9 +237,239 @@ class GPXParser:
             }
         
         except Exception as e:
-            logger.error(f"ファイル '{file_path}' の解析中にエラーが発生しました: {e}")
+            logger.error(f"ファイル '{source_name(file_path)}' の解析中にエラーが発生しました: {e}")
+            return None
+
+    def _collect_points(self, tracks: List[Dict[str, Any]], metadata: Dict[str, Any],
+                        columnar: bool = False, fill: bool = True) -> List[Dict[str, Any]]:
+        """全トラックのポイントを時間順にまとめ、標高と時間の情報がない場合は補完
+
+        Args:
+            tracks: トラックのリスト
+            metadata: メタデータの辞書（時間がない場合は最初のポイントの時間を設定）
+            columnar: Trueの場合は各トラックの'points'がTrackArray
+            fill: Falseの場合は補完しない（_fill_missingで後から補完する）
+
+        Returns:
+            List[Dict[str, Any]]: 時間順の全トラックポイント（columnarの場合はTrackArray）
+        """
+        # 全ポイントを時間順にソート
+        if columnar:
+            all_points = self._merge_track_arrays(tracks)
+        else:
+            all_points = merge_points_by_time([track['points'] for track in tracks])
+        
+        # 最初と最後の時間を取得
+        if all_points:
+            first_point = all_points[0]
+            last_point = all_points[-1]
+            
+            if 'time' in first_point and 'time' in last_point:
+                start_time = first_point['time']
+                end_time = last_point['time']
+                
+                if 'time' not in metadata:
+                    metadata['time'] = start_time
+        
+        # 標高と時間の情報がない場合は補完
+        if fill:
+            self._fill_missing(all_points, tracks, columnar)
+        
+        return all_points
+
+    def _fill_missing(self, all_points: List[Dict[str, Any]], tracks: List[Dict[str, Any]],
+                      columnar: bool = False) -> None:
+        """時間順の全ポイントと各トラックで標高と時間の情報がない場合は補完
+
+        Args:
+            all_points: 時間順の全トラックポイント（columnarの場合はTrackArray）
+            tracks: トラックのリスト
+            columnar: Trueの場合は各トラックの'points'がTrackArray
+        """
+        if columnar:
+            self._fill_missing_columns(all_points, [track['points'] for track in tracks])
+        else:
+            self._fill_missing_data(all_points)
+
+    def _parse_file_lazy(self, source: GPXSource, columnar: bool = False) -> Optional['LazyGPXDocument']:
+        """GPXファイルのヘッダーとトラックの概要のみを読み込む
+
+        Args:
+            source: GPXファイルのパス、GPXのバイト列、またはバイナリモードのファイルオブジェクト
+            columnar: Trueの場合はトラックポイントをTrackArrayとして読み込む
+
+        Returns:
+            Optional[LazyGPXDocument]: 遅延読み込みのGPX文書（エラー時はNone）
+        """
+        from .lazy import LazyGPXDocument
+        
+        try:
+            return LazyGPXDocument(source, parser=self, columnar=columnar)
+        except Exception as e:
+            logger.error(f"ファイル '{source_name(source)}' の解析中にエラーが発生しました: {e}")
+            return None
+
+    def _parse_file_streaming(self, file_path: GPXSource,
+                              statistics: Optional['StatisticsCollector'] = None) -> Dict[str, Any]:
+        """GPXファイルをiterparseで逐次解析
+
+        最初のトラックポイントまで読み進めた時点で、作成者・メタデータ・
+        ウェイポイント・最初のトラックのヘッダーが確定した辞書を返します。
+        'all_points'は残りのトラックポイントを文書順に返すイテレータで、
+        読み進めるにつれて'tracks'に後続トラックのヘッダーが追加されます。
+        処理済みの要素は随時破棄されるため、ファイルサイズによらず
+        メモリ使用量はほぼ一定です（時間順のソートは行いません）。
+
+        Args:
+            file_path: GPXファイルのパス、GPXのバイト列、またはバイナリモードのファイルオブジェクト
+            statistics: トラックポイントを読み進めるごとに統計を集計するStatisticsCollector
+
+        Returns:
+            Dict[str, Any]: 解析結果を含む辞書（'all_points'はイテレータ）
+        """
+        result = {
+            'creator': 'Unknown',
+            'metadata': {},
+            'waypoints': [],
+            'tracks': [],
+            'all_points': iter(())
+        }
+
+        try:
+            points = self._fill_missing_stream(self._iterparse_trackpoints(file_path, result, statistics))
+            first_point = next(points, None)
+        except Exception as e:
+            logger.error(f"ファイル '{source_name(file_path)}' の解析中にエラーが発生しました: {e}")
             return None
 
+        if first_point is not None:
+            if first_point['time'] and 'time' not in result['metadata']:
+                result['metadata']['time'] = first_point['time']
+            result['all_points'] = itertools.chain([first_point], points)
+
+        return result
+
+    def _iterparse_trackpoints(self, file_path: GPXSource, result: Dict[str, Any],
+                               statistics: Optional['StatisticsCollector'] = None) -> Iterator[Dict[str, Any]]:
+        """iterparseでトラックポイントを逐次取り出す
+
+        ヘッダー情報（作成者、メタデータ、ウェイポイント、トラック）は
+        要素が閉じた時点でresultに書き込みます。
+
+        Args:
+            file_path: GPXファイルのパス、GPXのバイト列、またはバイナリモードのファイルオブジェクト
+            result: ヘッダー情報を書き込む解析結果の辞書
+            statistics: 統計を集計するStatisticsCollector（補完前の値を渡す）
+
+        Yields:
+            Dict[str, Any]: トラックポイントの辞書
+        """
+        root = None
+        ns = None
+        trk_elem = None
+        trkseg_elem = None
+        track = None
+        depth = 0
+
+        with open_input(file_path) as f:
+            for event, elem in ET.iterparse(f, events=('start', 'end')):
+                if event == 'start':
+                    depth += 1
+                    if depth == 1:
+                        # ルート要素から名前空間と作成者を取得
+                        root = elem
+                        ns = self._detect_namespaces(root)
+                        tags = gpx_tags(ns['gpx'])
+                        metadata_tag = tags['metadata']
+                        wpt_tag = tags['wpt']
+                        trk_tag = tags['trk']
+                        trkseg_tag = tags['trkseg']
+                        trkpt_tag = tags['trkpt']
+                        result['creator'] = root.get('creator', 'Unknown')
+                    elif depth == 2 and elem.tag == trk_tag:
+                        trk_elem = elem
+                        track = None
+                    elif depth == 3 and elem.tag == trkseg_tag and trk_elem is not None:
+                        trkseg_elem = elem
+                        # トラックセグメントの開始時点でトラックヘッダーは揃っている
+                        if track is None:
+                            track = self._parse_track_header(trk_elem, ns)
+                            result['tracks'].append(track)
+                    continue
+
+                depth -= 1
+
+                if depth == 3 and elem.tag == trkpt_tag and trkseg_elem is not None:
+                    point = self._parse_trackpoint(elem, tags)
+                    # トラック時間がない場合は最初のポイントの時間を使用
+                    if 'time' not in track and point['time']:
+                        track['time'] = point['time']
+                    if statistics is not None:
+                        statistics.add(point['lat'], point['lon'], point['ele'], point['time'])
+                    # 処理済みのトラックポイントを破棄
+                    del trkseg_elem[:]
+                    yield point
+
+                elif depth == 2 and elem.tag == trkseg_tag:
+                    trkseg_elem = None
+
+                elif depth == 1:
+                    if elem.tag == metadata_tag:
+                        result['metadata'].update(self._parse_metadata_element(elem, ns))
+                    elif elem.tag == wpt_tag:
+                        result['waypoints'].append(self._parse_waypoint(elem, ns))
+                    elif elem.tag == trk_tag:
+                        # セグメントを持たないトラックもヘッダーは記録する
+                        if track is None:
+                            result['tracks'].append(self._parse_track_header(trk_elem, ns))
+                        trk_elem = None
+                        track = None
+                    # 処理済みのルート直下の要素を破棄
+                    del root[:]
+
+    def _fill_missing_stream(self, points: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """ストリーミングモードで標高と時間の情報がない場合は補完
+
+        補完値が確定するまで（最大FILL_LOOKAHEAD点）トラックポイントを保留し、
+        以降は確定した補完値で逐次補完します。
+
+        Args:
+            points: トラックポイントのイテレータ
+
+        Yields:
+            Dict[str, Any]: 補完済みのトラックポイントの辞書
+        """
+        pending = []
+        ele_value = None
+        time_value = None
+
+        for point in points:
+            if pending is not None:
+                if point['ele']:
+                    ele_value = point['ele']
+                if point['time']:
+                    time_value = point['time']
+                pending.append(point)
+
+                if (ele_value and time_value) or len(pending) >= FILL_LOOKAHEAD:
+                    ele_value = ele_value or "0"
+                    time_value = time_value or datetime.now().isoformat()
+                    for pending_point in pending:
+                        self._fill_point(pending_point, ele_value, time_value)
+                        yield pending_point
+                    pending = None
+                continue
+
+            self._fill_point(point, ele_value, time_value)
+            yield point
+
+        if pending:
+            ele_value = ele_value or "0"
+            time_value = time_value or datetime.now().isoformat()
+            for pending_point in pending:
+                self._fill_point(pending_point, ele_value, time_value)
+                yield pending_point
+
     def _detect_namespaces(self, root: ET.Element) -> Dict[str, str]:
         """XMLの名前空間を検出
 
@@ -119,48 +497,67 @@ class GPXParser:
             root: XMLのルート要素
             ns: 名前空間の辞書
 
+        Returns:
+            Dict[str, Any]: メタデータの辞書
+        """
+        metadata_elem = root.find(gpx_tags(ns['gpx'])['metadata'])
+        
+        if metadata_elem is None:
+            return {}
+        
+        return self._parse_metadata_element(metadata_elem, ns)
+
+    def _parse_metadata_element(self, metadata_elem: ET.Element,
+                                ns: Dict[str, str]) -> Dict[str, Any]:
+        """メタデータ要素を解析
+
+        Args:
+            metadata_elem: メタデータ要素
+            ns: 名前空間の辞書
+
         Returns:
             Dict[str, Any]: メタデータの辞書
         """
         metadata = {}
-        metadata_elem = root.find('.//{{{0}}}metadata'.format(ns['gpx']))
         
         if metadata_elem is not None:
+            tags = gpx_tags(ns['gpx'])
+            
             # 時間
-            time_elem = metadata_elem.find('.//{{{0}}}time'.format(ns['gpx']))
+            time_elem = metadata_elem.find(tags['time'])
             if time_elem is not None:
                 metadata['time'] = time_elem.text
             
             # 名前
-            name_elem = metadata_elem.find('.//{{{0}}}name'.format(ns['gpx']))
+            name_elem = metadata_elem.find(tags['name'])
             if name_elem is not None:
                 metadata['name'] = name_elem.text
             
             # 説明
-            desc_elem = metadata_elem.find('.//{{{0}}}desc'.format(ns['gpx']))
+            desc_elem = metadata_elem.find(tags['desc'])
             if desc_elem is not None:
                 metadata['desc'] = desc_elem.text
             
             # キーワード
-            keywords_elem = metadata_elem.find('.//{{{0}}}keywords'.format(ns['gpx']))
+            keywords_elem = metadata_elem.find(tags['keywords'])
             if keywords_elem is not None:
                 metadata['keywords'] = keywords_elem.text
             
             # 作成者
-            author_elem = metadata_elem.find('.//{{{0}}}author'.format(ns['gpx']))
+            author_elem = metadata_elem.find(tags['author'])
             if author_elem is not None:
-                author_name_elem = author_elem.find('.//{{{0}}}name'.format(ns['gpx']))
+                author_name_elem = author_elem.find(tags['name'])
                 if author_name_elem is not None:
                     metadata['author'] = author_name_elem.text
             
             # リンク
-            link_elem = metadata_elem.find('.//{{{0}}}link'.format(ns['gpx']))
+            link_elem = metadata_elem.find(tags['link'])
             if link_elem is not None:
                 link_href = link_elem.get('href')
                 if link_href:
                     metadata['link'] = link_href
                 
-                link_text_elem = link_elem.find('.//{{{0}}}text'.format(ns['gpx']))
+                link_text_elem = link_elem.find(tags['text'])
                 if link_text_elem is not None:
                     metadata['link_text'] = link_text_elem.text
         
@@ -178,108 +575,198 @@ class GPXParser:
         """
         waypoints = []
         
-        for wpt in root.findall('.//{{{0}}}wpt'.format(ns['gpx'])):
-            waypoint = {
-                'lat': wpt.get('lat'),
-                'lon': wpt.get('lon'),
-                'ele': None,
-                'time': None,
-                'name': None,
-                'sym': None,
-                'extensions': {}
-            }
-            
-            # 標高
-            ele_elem = wpt.find('.//{{{0}}}ele'.format(ns['gpx']))
-            if ele_elem is not None:
-                waypoint['ele'] = ele_elem.text
-            
-            # 時間
-            time_elem = wpt.find('.//{{{0}}}time'.format(ns['gpx']))
-            if time_elem is not None:
-                waypoint['time'] = time_elem.text
-            
-            # 名前
-            name_elem = wpt.find('.//{{{0}}}name'.format(ns['gpx']))
-            if name_elem is not None:
-                waypoint['name'] = name_elem.text
-            
-            # シンボル
-            sym_elem = wpt.find('.//{{{0}}}sym'.format(ns['gpx']))
-            if sym_elem is not None:
-                waypoint['sym'] = sym_elem.text
-            
-            # 拡張データ
-            extensions_elem = wpt.find('.//{{{0}}}extensions'.format(ns['gpx']))
-            if extensions_elem is not None:
-                for ext in extensions_elem:
-                    tag = ext.tag.split('}')[-1]
-                    waypoint['extensions'][tag] = ext.text
-            
-            waypoints.append(waypoint)
+        for wpt in root.findall(gpx_tags(ns['gpx'])['wpt']):
+            waypoints.append(self._parse_waypoint(wpt, ns))
         
         return waypoints
 
-    def _parse_tracks(self, root: ET.Element, ns: Dict[str, str]) -> List[Dict[str, Any]]:
+    def _parse_waypoint(self, wpt: ET.Element, ns: Dict[str, str]) -> Dict[str, Any]:
+        """ウェイポイントを解析
+
+        Args:
+            wpt: ウェイポイント要素
+            ns: 名前空間の辞書
+
+        Returns:
+            Dict[str, Any]: ウェイポイントの辞書
+        """
+        waypoint = {
+            'lat': wpt.get('lat'),
+            'lon': wpt.get('lon'),
+            'ele': None,
+            'time': None,
+            'name': None,
+            'sym': None,
+            'extensions': {}
+        }
+        tags = gpx_tags(ns['gpx'])
+        
+        # 標高
+        ele_elem = wpt.find(tags['ele'])
+        if ele_elem is not None:
+            waypoint['ele'] = ele_elem.text
+        
+        # 時間
+        time_elem = wpt.find(tags['time'])
+        if time_elem is not None:
+            waypoint['time'] = time_elem.text
+        
+        # 名前
+        name_elem = wpt.find(tags['name'])
+        if name_elem is not None:
+            waypoint['name'] = name_elem.text
+        
+        # シンボル
+        sym_elem = wpt.find(tags['sym'])
+        if sym_elem is not None:
+            waypoint['sym'] = sym_elem.text
+        
+        # 拡張データ
+        extensions_elem = wpt.find(tags['extensions'])
+        if extensions_elem is not None:
+            for ext in extensions_elem:
+                tag = ext.tag.split('}')[-1]
+                waypoint['extensions'][tag] = ext.text
+        
+        return waypoint
+
+    def _parse_tracks(self, root: ET.Element, ns: Dict[str, str], columnar: bool = False,
+                      statistics: Optional['StatisticsCollector'] = None) -> List[Dict[str, Any]]:
         """トラックを解析
 
         Args:
             root: XMLのルート要素
             ns: 名前空間の辞書
+            columnar: Trueの場合はトラックポイントをTrackArrayとして返す
+            statistics: 統計を集計するStatisticsCollector（トラックごとに補完前のポイントを渡す）
 
         Returns:
             List[Dict[str, Any]]: トラックのリスト
         """
         tracks = []
+        tags = gpx_tags(ns['gpx'])
         
-        for trk in root.findall('.//{{{0}}}trk'.format(ns['gpx'])):
-            track = {'points': []}
-            
-            # トラック名
-            name_elem = trk.find('.//{{{0}}}name'.format(ns['gpx']))
-            if name_elem is not None:
-                # CDATAセクションを処理
-                if name_elem.text and ']]>' in name_elem.text:
-                    track['name'] = name_elem.text.replace('<![CDATA[', '').replace(']]>', '')
-                else:
-                    track['name'] = name_elem.text
-            
-            # トラックタイプ
-            type_elem = trk.find('.//{{{0}}}type'.format(ns['gpx']))
-            if type_elem is not None:
-                track['type'] = type_elem.text
+        # GPXの仕様上trk・trkseg・trkptは直下の子要素のみのため、子孫は探索しない
+        for trk in root.findall(tags['trk']):
+            track = self._parse_track_header(trk, ns)
             
-            # トラック番号
-            number_elem = trk.find('.//{{{0}}}number'.format(ns['gpx']))
-            if number_elem is not None:
-                track['number'] = number_elem.text
-            
-            # トラック時間（Runkeeper形式）
-            time_elem = trk.find('.//{{{0}}}time'.format(ns['gpx']))
-            if time_elem is not None:
-                track['time'] = time_elem.text
-            
-            # トラック説明
-            desc_elem = trk.find('.//{{{0}}}desc'.format(ns['gpx']))
-            if desc_elem is not None:
-                track['desc'] = desc_elem.text
+            if columnar:
+                builder = TrackArrayBuilder()
+                for trkseg in trk.findall(tags['trkseg']):
+                    for trkpt in trkseg.findall(tags['trkpt']):
+                        self._append_trackpoint(builder, trkpt, tags)
+                
+                # トラック時間がない場合は最初のポイントの時間を使用
+                if 'time' not in track and builder.first_time:
+                    track['time'] = builder.first_time
+                
+                track['points'] = builder.build()
+                if statistics is not None:
+                    statistics.add_points(track['points'])
+                tracks.append(track)
+                continue
             
             # トラックセグメントとポイント
-            for trkseg in trk.findall('.//{{{0}}}trkseg'.format(ns['gpx'])):
-                for trkpt in trkseg.findall('.//{{{0}}}trkpt'.format(ns['gpx'])):
-                    point = self._parse_trackpoint(trkpt, ns)
-                    track['points'].append(point)
+            points = track['points']
+            for trkseg in trk.findall(tags['trkseg']):
+                for trkpt in trkseg.findall(tags['trkpt']):
+                    points.append(self._parse_trackpoint(trkpt, tags))
+            
+            # トラック時間がない場合は最初のポイントの時間を使用
+            if 'time' not in track:
+                for point in track['points']:
+                    if point['time']:
+                        track['time'] = point['time']
+                        break
             
+            if statistics is not None:
+                statistics.add_points(points)
             tracks.append(track)
         
         return tracks
 
-    def _parse_trackpoint(self, trkpt: ET.Element, ns: Dict[str, str]) -> Dict[str, Any]:
+    def _merge_track_arrays(self, tracks: List[Dict[str, Any]]) -> TrackArray:
+        """各トラックのTrackArrayを連結し、時間順に並べる
+
+        連結後、各トラックの'points'は連結した配列のビューに置き換えます。
+
+        Args:
+            tracks: トラックのリスト
+
+        Returns:
+            TrackArray: 時間順に並べた全トラックポイント
+        """
+        merged = TrackArray.concatenate([track['points'] for track in tracks])
+        
+        start = 0
+        for track in tracks:
+            end = start + len(track['points'])
+            track['points'] = merged[start:end]
+            start = end
+        
+        # 各トラックが時間順かつ時間帯が重ならない場合は並べ替え不要
+        if np.all(merged.time[1:] >= merged.time[:-1]):
+            return merged
+        
+        # 時間のない点は先頭に並べる（辞書形式のdatetime.minと同じ扱い）
+        # 安定ソートは既に並んでいる区間をまとめて扱うため、時間順のトラックの併合は高速
+        return merged.take(np.argsort(merged.time, kind='stable'))
+
+    def _parse_track_header(self, trk: ET.Element, ns: Dict[str, str]) -> Dict[str, Any]:
+        """トラックのヘッダー情報（名前、タイプ、番号、時間、説明）を解析
+
+        ストリーミング解析中はトラックセグメント以降が未確定のため、
+        トラック要素の直下の子要素のみを参照します。
+
+        Args:
+            trk: トラック要素
+            ns: 名前空間の辞書
+
+        Returns:
+            Dict[str, Any]: トラックのヘッダー情報の辞書（'points'は空のリスト）
+        """
+        track = {'points': []}
+        tags = gpx_tags(ns['gpx'])
+        
+        # トラック名
+        name_elem = trk.find(tags['name'])
+        if name_elem is not None:
+            # CDATAセクションを処理
+            if name_elem.text and ']]>' in name_elem.text:
+                track['name'] = name_elem.text.replace('<![CDATA[', '').replace(']]>', '')
+            else:
+                track['name'] = name_elem.text
+        
+        # トラックタイプ
+        type_elem = trk.find(tags['type'])
+        if type_elem is not None:
+            track['type'] = type_elem.text
+        
+        # トラック番号
+        number_elem = trk.find(tags['number'])
+        if number_elem is not None:
+            track['number'] = number_elem.text
+        
+        # トラック時間（Runkeeper形式）
+        time_elem = trk.find(tags['time'])
+        if time_elem is not None:
+            track['time'] = time_elem.text
+        
+        # トラック説明
+        desc_elem = trk.find(tags['desc'])
+        if desc_elem is not None:
+            track['desc'] = desc_elem.text
+        
+        return track
+
+    def _parse_trackpoint(self, trkpt: ET.Element, tags: Dict[str, str]) -> Dict[str, Any]:
         """トラックポイントを解析
 
+        子要素を1回だけ走査し、要素名で振り分けます。
+
         Args:
             trkpt: トラックポイント要素
-            ns: 名前空間の辞書
+            tags: gpx_tagsで作成した修飾名の辞書
 
         Returns:
             Dict[str, Any]: トラックポイントの辞書
@@ -291,36 +778,78 @@ class GPXParser:
             'time': None,
             'extensions': {}
         }
+        ele_tag = tags['ele']
+        time_tag = tags['time']
+        extensions_tag = tags['extensions']
         
-        # 標高
-        ele_elem = trkpt.find('.//{{{0}}}ele'.format(ns['gpx']))
-        if ele_elem is not None:
-            point['ele'] = ele_elem.text
+        for child in trkpt:
+            tag = child.tag
+            if tag == ele_tag:
+                # 標高
+                point['ele'] = child.text
+            elif tag == time_tag:
+                # 時間
+                point['time'] = child.text
+                # 時間情報をdatetimeオブジェクトに変換（ソート用）
+                try:
+                    point['datetime'] = parse_datetime(child.text)
+                except ValueError:
+                    point['datetime'] = datetime.min
+            elif tag == extensions_tag:
+                # 拡張データ（Garmin等）
+                point['extensions'] = self._parse_extensions(child)
         
-        # 時間
-        time_elem = trkpt.find('.//{{{0}}}time'.format(ns['gpx']))
-        if time_elem is not None:
-            point['time'] = time_elem.text
-            # 時間情報をdatetimeオブジェクトに変換（ソート用）
-            try:
-                point['datetime'] = datetime.fromisoformat(time_elem.text.replace('Z', '+00:00'))
-            except ValueError:
-                point['datetime'] = datetime.min
+        return point
+
+    def _parse_extensions(self, extensions_elem: ET.Element) -> Dict[str, Any]:
+        """トラックポイントの拡張データを解析
+
+        Args:
+            extensions_elem: 拡張データ要素
+
+        Returns:
+            Dict[str, Any]: 拡張データの辞書
+        """
+        extensions = {}
         
-        # 拡張データ（Garmin等）
-        extensions_elem = trkpt.find('.//{{{0}}}extensions'.format(ns['gpx']))
-        if extensions_elem is not None:
-            for ext in extensions_elem:
-                tag = ext.tag.split('}')[-1]
-                point['extensions'][tag] = ext.text
-                
-                # Garmin拡張の場合は特別処理
-                if 'TrackPointExtension' in ext.tag:
-                    for child in ext:
-                        child_tag = child.tag.split('}')[-1]
-                        point['extensions'][child_tag] = child.text
+        for ext in extensions_elem:
+            tag = ext.tag.split('}')[-1]
+            extensions[tag] = ext.text
+            
+            # Garmin拡張の場合は特別処理
+            if 'TrackPointExtension' in ext.tag:
+                for child in ext:
+                    child_tag = child.tag.split('}')[-1]
+                    extensions[child_tag] = child.text
         
-        return point
+        return extensions
+
+    def _append_trackpoint(self, builder: TrackArrayBuilder, trkpt: ET.Element,
+                           tags: Dict[str, str]) -> None:
+        """トラックポイントを辞書を作らずに列指向のビルダーへ追加
+
+        Args:
+            builder: 追加先のビルダー
+            trkpt: トラックポイント要素
+            tags: gpx_tagsで作成した修飾名の辞書
+        """
+        ele = None
+        time = None
+        extensions = None
+        ele_tag = tags['ele']
+        time_tag = tags['time']
+        extensions_tag = tags['extensions']
+        
+        for child in trkpt:
+            tag = child.tag
+            if tag == ele_tag:
+                ele = child.text
+            elif tag == time_tag:
+                time = child.text
+            elif tag == extensions_tag:
+                extensions = self._parse_extensions(child)
+        
+        builder.append(trkpt.get('lat'), trkpt.get('lon'), ele, time, extensions)
 
     def _fill_missing_data(self, points: List[Dict[str, Any]]) -> None:
         """標高と時間の情報がない場合は補完
@@ -350,43 +879,92 @@ class GPXParser:
         
         # 標高と時間の情報がない場合は補完
         for point in points:
-            if not point['ele']:
-                point['ele'] = ele_value
-            if not point['time']:
-                point['time'] = time_value
-                try:
-                    point['datetime'] = datetime.fromisoformat(time_value.replace('Z', '+00:00'))
-                except ValueError:
-                    point['datetime'] = datetime.min
+            self._fill_point(point, ele_value, time_value)
+
+    def _fill_missing_columns(self, points: TrackArray, tracks: List[TrackArray]) -> None:
+        """列指向のトラックポイントで標高と時間の情報がない場合は補完
+
+        補完値は_fill_missing_dataと同じ規則で時間順の全ポイントから決め、
+        全ポイントと各トラックの両方に書き込みます。
+
+        Args:
+            points: 時間順の全トラックポイント
+            tracks: 各トラックのトラックポイント
+        """
+        ele_indices = np.flatnonzero(~np.isnan(points.ele))
+        time_indices = np.flatnonzero(points.has_time())
+        
+        # 標高と時間の両方が見つかった位置までで最後の値を補完値とする
+        if len(ele_indices) and len(time_indices):
+            limit = max(ele_indices[0], time_indices[0])
+            ele_indices = ele_indices[ele_indices <= limit]
+            time_indices = time_indices[time_indices <= limit]
+        
+        ele_value = points.ele[ele_indices[-1]] if len(ele_indices) else 0.0
+        time_value = points.time[time_indices[-1]] if len(time_indices) else int(datetime.now().timestamp())
+        
+        for array in [points] + tracks:
+            array.ele[np.isnan(array.ele)] = ele_value
+            array.time[~array.has_time()] = time_value
+
+    def _fill_point(self, point: Dict[str, Any], ele_value: str, time_value: str) -> None:
+        """トラックポイントの欠けている標高と時間を補完値で埋める
+
+        Args:
+            point: トラックポイントの辞書
+            ele_value: 標高の補完値
+            time_value: 時間の補完値
+        """
+        if not point['ele']:
+            point['ele'] = ele_value
+        if not point['time']:
+            point['time'] = time_value
+            try:
+                point['datetime'] = parse_datetime(time_value)
+            except ValueError:
+                point['datetime'] = datetime.min
+
+    def detect_service_file(self, file_path: GPXSource) -> str:
+        """GPXファイルの先頭のみを読み込んでサービスを検出
+
+        ファイル全体は解析せず、最初のトラックポイントまでのヘッダー情報から
+        detect_serviceと同じ規則で判定します。
+
+        Args:
+            file_path: GPXファイルのパス（バイト列・ファイルオブジェクトも可）
+
+        Returns:
+            str: 検出されたサービス名（読み込めない場合は'unknown'）
+        """
+        from .prescan import prescan_header
+        
+        header = prescan_header(file_path)
+        return header['service'] if header else 'unknown'
 
     def detect_service(self, gpx_data: Dict[str, Any]) -> str:
         """GPXデータからサービスを検出
 
+        各サービスの判定ルールをまとめて評価し、最も確信度が高いサービスを返します
+        （確信度はdetect_service_confidenceで取得できます）。
+
         Args:
             gpx_data: GPXデータの辞書
 
         Returns:
-            str: 検出されたサービス名
+            str: 検出されたサービス名（判定できない場合は'unknown'）
         """
-        creator = gpx_data.get('creator', '').lower()
-        
-        if 'runkeeper' in creator:
-            return 'runkeeper'
-        elif 'yamareco' in creator:
-            return 'yamareco'
-        elif 'strava' in creator:
-            return 'strava'
-        elif 'garmin' in creator:
-            return 'garmin'
-        else:
-            # トラック名やメタデータから推測
-            for track in gpx_data.get('tracks', []):
-                name = track.get('name', '').lower()
-                if 'runkeeper' in name:
-                    return 'runkeeper'
-                elif 'yamareco' in name or 'track' == name:
-                    return 'yamareco'
-                elif 'strava' in name:
-                    return 'strava'
-            
-            return 'unknown'
\ No newline at end of file
+        return self.detect_service_confidence(gpx_data)[0]
+
+    def detect_service_confidence(self, gpx_data: Dict[str, Any]) -> Tuple[str, float]:
+        """GPXデータからサービスと確信度を検出
+
+        Args:
+            gpx_data: GPXデータの辞書
+
+        Returns:
+            Tuple[str, float]: 検出されたサービス名と確信度（0〜1）
+        """
+        from .services import registry
+        
+        result = registry.detect(gpx_data)
+        return result.service, result.confidence
\ No newline at end of file
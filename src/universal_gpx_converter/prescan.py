@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+GPXヘッダー事前走査モジュール
+
+このモジュールは、GPXファイルの先頭から数KBずつ読み込み、最初のトラックポイントに
+到達した時点で読み込みを打ち切ってヘッダー情報（作成者、メタデータ、最初のトラックの
+名前・タイプ・番号等）とサービスの判定結果を返す機能を提供します。
+ファイル全体を解析せずにサービスごとの振り分けを行うために利用します。
+"""
+
+import logging
+import xml.etree.ElementTree as ET
+from typing import Dict, Any, Optional
+
+from .parser import GPXParser, gpx_tags
+from .sources import GPXSource, open_input
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# 1回に読み込むバイト数
+PRESCAN_CHUNK_SIZE = 4096
+
+# 最初のトラックポイントが見つからない場合に読み込むバイト数の上限
+PRESCAN_MAX_BYTES = 256 * 1024
+
+
+def prescan_header(source: GPXSource, max_bytes: int = PRESCAN_MAX_BYTES,
+                   chunk_size: int = PRESCAN_CHUNK_SIZE) -> Optional[Dict[str, Any]]:
+    """GPXファイルの先頭のみを読み込み、ヘッダー情報とサービスを判定
+
+    chunk_sizeずつプルパーサーに渡し、最初のトラックポイントの終了タグに到達した
+    時点で読み込みを打ち切ります。トラック時間とメタデータの時間がない場合は、
+    GPXParser.parse_fileと同様に最初のトラックポイントの時間を使用します。
+
+    Args:
+        source: GPXファイルのパス、GPXのバイト列、またはバイナリモードのファイルオブジェクト
+        max_bytes: 最初のトラックポイントが見つからない場合に読み込む上限
+        chunk_size: 1回に読み込むバイト数
+
+    Returns:
+        Optional[Dict[str, Any]]: ヘッダー情報の辞書（エラー時はNone）
+            'service': 判定したサービス名（GPXParser.detect_serviceと同じ）
+            'creator', 'metadata': 作成者とメタデータ
+            'tracks': 最初のトラックまでのトラックのヘッダー情報のリスト（'points'は空）
+            'bytes_read': 読み込んだバイト数
+            'complete': 最初のトラックポイントまたはファイルの終わりまで読み込めたかどうか
+    """
+    parser = GPXParser()
+    result = {
+        'service': 'unknown',
+        'creator': 'Unknown',
+        'metadata': {},
+        'tracks': [],
+        'bytes_read': 0,
+        'complete': False
+    }
+
+    pull_parser = ET.XMLPullParser(events=('start', 'end'))
+    root = None
+    ns = None
+    tags = None
+    trk_elem = None
+    track = None
+    depth = 0
+
+    try:
+        with open_input(source) as stream:
+            while not result['complete'] and result['bytes_read'] < max_bytes:
+                chunk = stream.read(min(chunk_size, max_bytes - result['bytes_read']))
+                if not chunk:
+                    # ファイルの終わりまで読み込んだ（トラックポイントがない）
+                    result['complete'] = True
+                    break
+                result['bytes_read'] += len(chunk)
+                pull_parser.feed(chunk)
+
+                for event, elem in pull_parser.read_events():
+                    if event == 'start':
+                        depth += 1
+                        if depth == 1:
+                            root = elem
+                            ns = parser._detect_namespaces(root)
+                            tags = gpx_tags(ns['gpx'])
+                            result['creator'] = root.get('creator', 'Unknown')
+                        elif depth == 2 and elem.tag == tags['trk']:
+                            trk_elem = elem
+                            track = None
+                        elif depth == 3 and elem.tag == tags['trkseg'] and trk_elem is not None:
+                            # トラックセグメントの開始時点でトラックヘッダーは揃っている
+                            if track is None:
+                                track = parser._parse_track_header(trk_elem, ns)
+                                result['tracks'].append(track)
+                        continue
+
+                    depth -= 1
+
+                    if depth == 3 and elem.tag == tags['trkpt'] and track is not None:
+                        time_elem = elem.find(tags['time'])
+                        if time_elem is not None and time_elem.text:
+                            # トラック時間・メタデータの時間がない場合は最初のポイントの時間を使用
+                            track.setdefault('time', time_elem.text)
+                            result['metadata'].setdefault('time', time_elem.text)
+                        result['complete'] = True
+                        break
+
+                    if depth == 1:
+                        if elem.tag == tags['metadata']:
+                            result['metadata'].update(parser._parse_metadata_element(elem, ns))
+                        elif elem.tag == tags['trk']:
+                            # セグメントを持たないトラックもヘッダーは記録する
+                            if track is None:
+                                result['tracks'].append(parser._parse_track_header(elem, ns))
+                            trk_elem = None
+                            track = None
+                        # 処理済みのルート直下の要素（ウェイポイント等）を破棄
+                        del root[:]
+
+    except Exception as e:
+        logger.error(f"ヘッダーの事前走査中にエラーが発生しました: {e}")
+        return None
+
+    if root is None:
+        logger.error("ヘッダーの事前走査中にエラーが発生しました: ルート要素が見つかりません")
+        return None
+
+    result['service'] = parser.detect_service(result)
+    return result
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+トラック再サンプリングモジュール
+
+このモジュールは、トラックポイントを一定の時間間隔の点に置き換える機能を提供します。
+緯度・経度・標高・センサー値を時間で線形補間し、点の間隔が機器やサービスによらず
+揃うようにします。計算は全区間分の時刻の格子を作ってnp.interpでまとめて行います。
+
+時間の間隔がmax_gapを超える箇所（記録の中断、複数日の山行の夜間等）で区間を分け、
+区間をまたいで補間しません。複数のトラックはresample_tracksでトラックごとに再サンプリングし、
+トラックの境界もまたいで補間しません。各区間の格子は区間の最初の点の時間から始まり、
+区間の最後の点の時間で終わります。
+"""
+
+import logging
+from typing import Dict, List, Any, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .timestamps import NO_TIME
+from .track_array import TrackArray
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# 再サンプリングの既定の間隔（秒）
+DEFAULT_RESAMPLE_INTERVAL = 5
+
+# 区間を分ける時間の間隔（秒、これを超える間隔は補間しない）
+DEFAULT_MAX_GAP = 600
+
+
+def _interpolate(grid: np.ndarray, time: np.ndarray, values: np.ndarray,
+                 segment: np.ndarray, grid_segment: np.ndarray) -> np.ndarray:
+    """欠損（NaN）を除いた値を区間ごとに時間で線形補間
+
+    各格子は同じ区間の値のある点のみから求め、区間の最初・最後の値のある点より外側の格子は
+    その点の値とします（値のある点がない区間の格子はNaN）。
+
+    Args:
+        grid: 格子の時間
+        time: 元の点の時間（昇順）
+        values: 元の点の値
+        segment: 元の点の区間の番号（昇順）
+        grid_segment: 格子の区間の番号
+
+    Returns:
+        np.ndarray: 格子の値
+    """
+    values = values.astype(np.float64)
+    valid = ~np.isnan(values)
+    if valid.all():
+        return np.interp(grid, time, values)
+    result = np.full(len(grid), np.nan)
+    if not valid.any():
+        return result
+
+    # 区間ごとの値のある点の範囲に格子を制限し、前後の区間の値を使わないようにする
+    time, values, segment = time[valid], values[valid], segment[valid]
+    segments = np.arange(int(grid_segment[-1]) + 1)
+    first = np.searchsorted(segment, segments, side='left')
+    last = np.searchsorted(segment, segments, side='right') - 1
+    present = (last >= first)[grid_segment]
+    owner = grid_segment[present]
+    result[present] = np.interp(np.clip(grid[present], time[first[owner]], time[last[owner]]), time, values)
+    return result
+
+
+def resample_track(track: TrackArray, interval: int = DEFAULT_RESAMPLE_INTERVAL,
+                   max_gap: int = DEFAULT_MAX_GAP) -> TrackArray:
+    """TrackArrayを一定の時間間隔に再サンプリング
+
+    時間・座標のない点は使わず、時間順でない場合は時間順に並べ替えます
+    （同じ時間の点は最初の点を使用）。辞書表現の桁数（precision）は元のTrackArrayと同じです。
+
+    Args:
+        track: 再サンプリングするTrackArray
+        interval: 点の時間間隔（秒）
+        max_gap: 区間を分ける時間の間隔（秒）
+
+    Returns:
+        TrackArray: 再サンプリングしたTrackArray
+
+    Raises:
+        ValueError: 間隔が1秒未満の場合
+    """
+    interval = int(interval)
+    if interval < 1:
+        raise ValueError(f"再サンプリングの間隔は1秒以上を指定してください: {interval}")
+
+    index = np.flatnonzero((track.time != NO_TIME) & ~np.isnan(track.lat) & ~np.isnan(track.lon))
+    time = track.time[index]
+    if np.any(time[1:] < time[:-1]):
+        order = np.argsort(time, kind='stable')
+        index = index[order]
+        time = time[order]
+    unique = np.concatenate([[True], time[1:] > time[:-1]]) if len(time) else np.zeros(0, dtype=bool)
+    index = index[unique]
+    time = time[unique]
+    if not len(index):
+        return TrackArray.empty()
+
+    # 区間ごとの最初と最後の時間
+    breaks = np.flatnonzero(np.diff(time) > max_gap) + 1
+    starts = time[np.concatenate([[0], breaks])]
+    ends = time[np.concatenate([breaks - 1, [len(time) - 1]])]
+
+    # 区間ごとに最初の時間からinterval秒ごとの格子を作り、最後の格子は区間の最後の時間に揃える
+    counts = -(-(ends - starts) // interval) + 1
+    offsets = np.arange(int(counts.sum()), dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+    grid = np.repeat(starts, counts) + offsets * interval
+    np.minimum(grid, np.repeat(ends, counts), out=grid)
+
+    # 座標は全ての点にあり格子は区間の内側にあるため、全体をまとめて補間しても区間をまたがない
+    # （欠損のある標高・センサー値は_interpolateで区間ごとの値のある範囲に制限する）
+    source_time = time.astype(np.float64)
+    grid_time = grid.astype(np.float64)
+    segment = np.zeros(len(time), dtype=np.int64)
+    segment[breaks] = 1
+    np.cumsum(segment, out=segment)
+    grid_segment = np.repeat(np.arange(len(counts)), counts)
+
+    def interpolate(column: np.ndarray) -> np.ndarray:
+        return _interpolate(grid_time, source_time, column[index], segment, grid_segment)
+
+    return TrackArray(
+        np.interp(grid_time, source_time, track.lat[index]),
+        np.interp(grid_time, source_time, track.lon[index]),
+        interpolate(track.ele),
+        grid,
+        {name: interpolate(column) for name, column in track.sensors.items()},
+        track.precision
+    )
+
+
+def resample_points(points: Union[Sequence[Dict[str, Any]], TrackArray],
+                    interval: int = DEFAULT_RESAMPLE_INTERVAL,
+                    max_gap: int = DEFAULT_MAX_GAP,
+                    precision: Optional[Tuple[int, int]] = None) -> Union[List[Dict[str, Any]], TrackArray]:
+    """トラックポイントを一定の時間間隔に再サンプリング
+
+    Args:
+        points: トラックポイントの辞書のリスト（TrackArrayも可）
+        interval: 点の時間間隔（秒）
+        max_gap: 区間を分ける時間の間隔（秒）
+        precision: 補間した座標・標高を整形する小数点以下の桁数（座標、標高）
+            （指定しない場合はTrackArrayの桁数、辞書の場合は元の値に戻せる最短の10進数）
+
+    Returns:
+        Union[List[Dict[str, Any]], TrackArray]: 再サンプリングしたトラックポイント
+            （TrackArrayの場合はTrackArray、それ以外はトラックポイントの辞書のリスト）
+    """
+    return resample_tracks([points], interval, max_gap, precision)
+
+
+def resample_tracks(tracks: Sequence[Union[Sequence[Dict[str, Any]], TrackArray]],
+                    interval: int = DEFAULT_RESAMPLE_INTERVAL,
+                    max_gap: int = DEFAULT_MAX_GAP,
+                    precision: Optional[Tuple[int, int]] = None) -> Union[List[Dict[str, Any]], TrackArray]:
+    """複数のトラックをトラックごとに再サンプリングし、時間順に並べる
+
+    トラック（trk）の境界をまたいで補間しないため、時間が重ならないトラックの間の点は
+    作りません。
+
+    Args:
+        tracks: トラックごとのトラックポイント（辞書のリストまたはTrackArray）のリスト
+        interval: 点の時間間隔（秒）
+        max_gap: 区間を分ける時間の間隔（秒）
+        precision: 補間した座標・標高を整形する小数点以下の桁数（座標、標高）
+            （指定しない場合はTrackArrayの桁数、辞書の場合は元の値に戻せる最短の10進数）
+
+    Returns:
+        Union[List[Dict[str, Any]], TrackArray]: 再サンプリングした全トラックポイント
+            （全てTrackArrayの場合はTrackArray、それ以外はトラックポイントの辞書のリスト）
+    """
+    columnar = all(isinstance(points, TrackArray) for points in tracks)
+    resampled = TrackArray.concatenate([
+        resample_track(TrackArray.from_points(points), interval, max_gap) for points in tracks
+    ])
+    if np.any(resampled.time[1:] < resampled.time[:-1]):
+        resampled = resampled.take(np.argsort(resampled.time, kind='stable'))
+    if precision is not None:
+        resampled = resampled.with_precision(*precision)
+    return resampled if columnar else resampled.to_points()
+
+
+def format_resample(original: int, resampled: int, interval: int) -> str:
+    """再サンプリングの結果を表示用の文字列に整形
+
+    Args:
+        original: 元の点数
+        resampled: 再サンプリング後の点数
+        interval: 点の時間間隔（秒）
+
+    Returns:
+        str: 表示する文字列
+    """
+    return f"トラックを{interval}秒間隔に再サンプリングしました: {original}ポイント → {resampled}ポイント"
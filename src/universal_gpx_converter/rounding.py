@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+固定小数点による丸めモジュール
+
+このモジュールは、10進数の文字列を指定した桁数に四捨五入（ROUND_HALF_UP）する関数を
+提供します。結果はDecimal(text).quantize(Decimal('0.000001'), rounding=ROUND_HALF_UP)を
+f"{value:.6f}"で書式化したものと完全に一致します。
+
+round_half_up_columnは座標の列全体を1つのバイト列として扱い、通常の10進数表記
+（符号・整数部・小数部のみ）の値を文字の切り出しと桁上がりの処理だけでまとめて丸めるため、
+1点ずつDecimalを作成するより高速です。指数表記・空白・NaN等の通常でない表記や、
+Decimalの精度（28桁）を超える値は1つずつDecimalで処理します。
+"""
+
+import logging
+from decimal import Decimal, ROUND_HALF_UP
+from functools import lru_cache
+from typing import List, Sequence
+
+import numpy as np
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# Decimalの既定の精度（丸めた結果の有効桁数がこれを超えるとquantizeがエラーになる）
+DECIMAL_PRECISION = 28
+
+# 列ごとの処理で使う文字コード
+_NEWLINE, _PLUS, _MINUS, _DOT = (ord(c) for c in '\n+-.')
+_ZERO, _FIVE, _NINE = (ord(c) for c in '059')
+
+# 文字コードごとの分類（符号, 数字・小数点・符号・改行以外）
+_SIGN_CHARACTERS = np.zeros(256, dtype=bool)
+_SIGN_CHARACTERS[[_PLUS, _MINUS]] = True
+_INVALID_CHARACTERS = np.ones(256, dtype=bool)
+_INVALID_CHARACTERS[[_NEWLINE, _PLUS, _MINUS, _DOT]] = False
+_INVALID_CHARACTERS[_ZERO:_NINE + 1] = False
+
+
+@lru_cache(maxsize=None)
+def _quantum(precision: int) -> Decimal:
+    """quantizeに渡す桁数の指定（Decimal('0.000001')等）"""
+    return Decimal('0.' + '0' * precision)
+
+
+def round_half_up(text: str, precision: int) -> str:
+    """10進数の文字列を小数点以下precision桁に四捨五入（1つの値）
+
+    1つの値の場合はC実装のDecimalが最も速いため、桁数の指定を使い回してDecimalで処理します。
+
+    Args:
+        text: 10進数の文字列
+        precision: 小数点以下の桁数
+
+    Returns:
+        str: 四捨五入した値の文字列（負のゼロの符号も保持）
+
+    Raises:
+        decimal.InvalidOperation: 数値として解釈できない場合、精度を超える場合
+    """
+    value = Decimal(text).quantize(_quantum(precision), rounding=ROUND_HALF_UP)
+    return f"{value:.{precision}f}"
+
+
+def _ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """[starts[i], starts[i] + lengths[i])の範囲を連結したインデックスの配列"""
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(int(lengths.sum()))
+
+
+def _round_each(values: List[str], precision: int, indices: Sequence[int],
+                results: List[str]) -> None:
+    """指定した位置の値をround_half_upで1つずつ丸め、resultsに格納"""
+    for index in indices:
+        results[index] = round_half_up(values[index], precision)
+
+
+def round_half_up_column(values: Sequence[str], precision: int) -> List[str]:
+    """10進数の文字列の列をまとめて小数点以下precision桁に四捨五入
+
+    列全体を1つのバイト列に連結し、符号・整数部・小数部の位置の検出、切り捨てる桁の判定、
+    桁上がりをNumPyで列ごとに処理します。先頭が0の整数部や整数部のない値（「.5」等）、
+    通常の10進数表記でない値はround_half_upで1つずつ処理するため、結果は常に
+    round_half_upと一致します。
+
+    Args:
+        values: 10進数の文字列の列
+        precision: 小数点以下の桁数
+
+    Returns:
+        List[str]: 四捨五入した値の文字列のリスト
+
+    Raises:
+        decimal.InvalidOperation: 数値として解釈できない値がある場合
+    """
+    values = list(values)
+    count = len(values)
+    results = [None] * count
+    if not count or precision < 0:
+        _round_each(values, precision, range(count), results)
+        return results
+    try:
+        data = np.frombuffer(('\n'.join(values) + '\n').encode('ascii'), dtype=np.uint8)
+    except (TypeError, UnicodeEncodeError):
+        _round_each(values, precision, range(count), results)
+        return results
+
+    ends = np.flatnonzero(data == _NEWLINE)
+    if len(ends) != count:
+        # 改行を含む値がある
+        _round_each(values, precision, range(count), results)
+        return results
+    starts = np.empty(count, dtype=np.int64)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+
+    # 符号（先頭以外の符号は通常でない表記）
+    first = data[starts]
+    negative = first == _MINUS
+    integer_start = starts + (negative | (first == _PLUS))
+    bad = np.zeros(count, dtype=bool)
+    sign_positions = np.flatnonzero(_SIGN_CHARACTERS[data])
+    sign_lines = np.searchsorted(ends, sign_positions)
+    bad[sign_lines[sign_positions != starts[sign_lines]]] = True
+
+    # 数字・小数点・符号以外の文字
+    invalid_positions = np.flatnonzero(_INVALID_CHARACTERS[data])
+    bad[np.searchsorted(ends, invalid_positions)] = True
+
+    # 小数点の位置（ない場合は末尾、複数ある値は通常でない表記）
+    dot_positions = np.flatnonzero(data == _DOT)
+    dot_lines = np.searchsorted(ends, dot_positions)
+    dot_position = ends.copy()
+    dot_position[dot_lines] = dot_positions
+    bad[dot_lines[np.bincount(dot_lines, minlength=count)[dot_lines] > 1]] = True
+
+    integer_length = dot_position - integer_start
+    fraction_length = np.maximum(ends - dot_position - 1, 0)
+    # 整数部がない値・先頭が0の2桁以上の整数部・精度を超える値
+    bad |= integer_length == 0
+    bad |= (data[integer_start] == _ZERO) & (integer_length > 1)
+    bad |= integer_length + precision >= DECIMAL_PRECISION
+
+    if bad.any():
+        # 通常でない表記は1つずつ処理し、それ以外をまとめて処理する
+        bad_indices = np.flatnonzero(bad).tolist()
+        good_indices = np.flatnonzero(~bad).tolist()
+        _round_each(values, precision, bad_indices, results)
+        if good_indices:
+            good = round_half_up_column([values[index] for index in good_indices], precision)
+            for index, value in zip(good_indices, good):
+                results[index] = value
+        return results
+
+    # 切り捨てる最初の桁が5以上なら切り上げる
+    truncated = fraction_length > precision
+    round_up = np.zeros(count, dtype=bool)
+    round_up[truncated] = data[dot_position[truncated] + 1 + precision] >= _FIVE
+    kept_fraction = np.minimum(fraction_length, precision)
+
+    # 切り上げる値は、残す最後の桁から9が続く間さかのぼり、1を加える桁を求める
+    # （整数部の先頭まで全て9の場合は整数部の前、桁が1つ増える）
+    lines = np.flatnonzero(round_up)
+    targets = dot_position[lines] + precision if precision else dot_position[lines] - 1
+    active = np.arange(len(lines))
+    while len(active):
+        positions = targets[active]
+        nine = (positions >= integer_start[lines[active]]) & (data[positions] == _NINE)
+        active = active[nine]
+        positions = positions[nine] - 1
+        positions -= data[positions] == _DOT
+        targets[active] = positions
+    carry = np.zeros(count, dtype=np.int64)
+    carry[lines] = targets < integer_start[lines]
+
+    # 出力（符号, 桁上がり, 整数部, 小数点, 小数部, 改行）の長さと位置
+    fraction_width = precision + 1 if precision else 0
+    lengths = integer_length + fraction_width + 1 + negative + carry
+    output_start = np.cumsum(lengths) - lengths
+    output = np.full(int(lengths.sum()), _ZERO, dtype=np.uint8)
+    output[output_start[negative]] = _MINUS
+    integer_output = output_start + negative + carry
+    # 整数部から残す小数部までは入力と同じ並び（小数点がない値は小数点を補う）
+    copy_lengths = integer_length + np.where(kept_fraction > 0, kept_fraction + 1, 0)
+    output[_ranges(integer_output, copy_lengths)] = data[_ranges(integer_start, copy_lengths)]
+    if precision:
+        output[integer_output + integer_length] = _DOT
+    line_end = output_start + lengths - 1
+    output[line_end] = _NEWLINE
+
+    if len(lines):
+        # 求めた桁に1を加え、それより後の9を0にする
+        shift = integer_output[lines] - integer_start[lines]
+        targets += shift
+        output[targets] += 1
+        tail = _ranges(targets + 1, line_end[lines] - targets - 1)
+        output[tail[output[tail] == _NINE]] = _ZERO
+
+    return output.tobytes().decode('ascii').split('\n')[:-1]
@@ -1,11 +1,25 @@
 """
 サービス固有モジュールパッケージ
 
-このパッケージは、各サービス（ヤマレコ、Strava、Runkeeper等）固有の処理を行うモジュールを提供します。
+このパッケージは、各サービス（ヤマレコ、Strava、Runkeeper等）固有の処理を行うモジュールと、
+各サービスの判定ルールをまとめて評価するレジストリ（registry）を提供します。
+新しいサービスは、クラス属性NAMEとDETECTION_RULESを定義して
+registry.register_serviceで登録します。
 """
 
+from .registry import (DetectionResult, DetectionRule, ServiceRegistry, creator_contains,
+                       registry, track_name_contains)
 from .yamareco import YamarecoService
 from .strava import StravaService
 from .runkeeper import RunkeeperService
 
-__all__ = ['YamarecoService', 'StravaService', 'RunkeeperService']
\ No newline at end of file
+# 登録順は同じ確信度の場合の優先順
+registry.register_service(RunkeeperService)
+registry.register_service(YamarecoService)
+registry.register_service(StravaService)
+# Garminは判定のみ（固有の変換処理はない）
+registry.register('garmin', [DetectionRule('creator', creator_contains('garmin'), 0.9)])
+
+__all__ = ['YamarecoService', 'StravaService', 'RunkeeperService',
+           'DetectionResult', 'DetectionRule', 'ServiceRegistry', 'creator_contains',
+           'registry', 'track_name_contains']
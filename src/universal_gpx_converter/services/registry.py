@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+サービス判定レジストリモジュール
+
+このモジュールは、各サービスが登録した判定ルールをまとめて評価し、GPXデータが
+どのサービスのものかを確信度付きで判定するServiceRegistryを提供します。
+ヘッダーの各項目（作成者、メタデータ、各トラックのヘッダー）は1回だけ走査し、
+その項目を対象とする全サービスのルールを同時に評価するため、サービスを追加しても
+走査の回数は増えません。
+
+一致したルールの重み（0〜1）は 1 - Π(1 - 重み) で確信度にまとめ、確信度が
+DETECTION_THRESHOLD以上で最も高いサービスを判定結果とします（同じ確信度の場合は
+先に登録したサービス）。
+"""
+
+import logging
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# サービスと判定する確信度の下限
+DETECTION_THRESHOLD = 0.5
+
+# 判定できない場合のサービス名
+UNKNOWN_SERVICE = 'unknown'
+
+# ルールの対象とするヘッダーの項目
+RULE_FIELDS = ('creator', 'metadata', 'track')
+
+
+class DetectionRule(NamedTuple):
+    """サービス判定のルール
+
+    fieldは評価するヘッダーの項目で、testにはその値が渡されます。
+        'creator': 作成者（小文字に変換した文字列）
+        'metadata': メタデータの辞書
+        'track': 各トラックのヘッダーの辞書（いずれかのトラックで一致すればよい）
+    """
+    field: str
+    test: Callable[[Any], bool]
+    weight: float
+
+
+class DetectionResult(NamedTuple):
+    """サービス判定の結果"""
+    service: str
+    confidence: float
+    scores: Dict[str, float]
+
+
+def creator_contains(keyword: str) -> Callable[[str], bool]:
+    """作成者にkeyword（小文字）を含むかどうかのテスト"""
+    return lambda creator: keyword in creator
+
+
+def track_name_contains(keyword: str) -> Callable[[Dict[str, Any]], bool]:
+    """トラック名にkeyword（小文字）を含むかどうかのテスト"""
+    return lambda track: keyword in (track.get('name') or '').lower()
+
+
+class ServiceRegistry:
+    """サービスと判定ルールを登録し、GPXデータのサービスを判定するクラス"""
+
+    def __init__(self, threshold: float = DETECTION_THRESHOLD):
+        """初期化
+
+        Args:
+            threshold: サービスと判定する確信度の下限
+        """
+        self.threshold = threshold
+        self._services: Dict[str, Optional[type]] = {}
+        self._rules: Dict[str, List[Tuple[str, DetectionRule]]] = {field: [] for field in RULE_FIELDS}
+
+    def register(self, name: str, rules: Iterable[DetectionRule],
+                 service_class: Optional[type] = None) -> None:
+        """サービスを登録
+
+        Args:
+            name: サービス名
+            rules: 判定ルール
+            service_class: サービスのクラス（変換を行わないサービスはNone）
+
+        Raises:
+            ValueError: ルールの項目が不正な場合
+        """
+        rules = list(rules)
+        for rule in rules:
+            if rule.field not in self._rules:
+                raise ValueError(f"判定ルールの項目 '{rule.field}' は使用できません（{', '.join(RULE_FIELDS)}）")
+
+        if name in self._services:
+            # 再登録の場合は以前のルールを置き換える
+            for field_rules in self._rules.values():
+                field_rules[:] = [(owner, rule) for owner, rule in field_rules if owner != name]
+        self._services[name] = service_class
+        for rule in rules:
+            self._rules[rule.field].append((name, rule))
+
+    def register_service(self, service_class: type) -> type:
+        """サービスのクラスを登録（クラス属性NAMEとDETECTION_RULESを使用）
+
+        クラスデコレーターとしても利用できます。
+
+        Args:
+            service_class: サービスのクラス
+
+        Returns:
+            type: service_class
+        """
+        self.register(service_class.NAME, service_class.DETECTION_RULES, service_class)
+        return service_class
+
+    @property
+    def names(self) -> List[str]:
+        """登録したサービス名（登録順）"""
+        return list(self._services)
+
+    def get(self, name: str) -> Optional[Any]:
+        """サービスのインスタンスを作成
+
+        Args:
+            name: サービス名
+
+        Returns:
+            Optional[Any]: サービスのインスタンス（未登録・クラスがない場合はNone）
+        """
+        service_class = self._services.get(name)
+        return service_class() if service_class is not None else None
+
+    def score(self, gpx_data: Dict[str, Any]) -> Dict[str, float]:
+        """全サービスの確信度を計算
+
+        Args:
+            gpx_data: GPXデータ（ヘッダー情報のみでもよい）
+
+        Returns:
+            Dict[str, float]: サービス名と確信度の辞書（登録順）
+        """
+        misses = {name: 1.0 for name in self._services}
+
+        def evaluate(rules: List[Tuple[str, DetectionRule]], value: Any) -> List[Tuple[str, DetectionRule]]:
+            # 一致しなかったルールを返す
+            remaining = []
+            for name, rule in rules:
+                try:
+                    matched = rule.test(value)
+                except Exception as e:
+                    logger.debug(f"サービス '{name}' の判定ルールでエラーが発生しました: {e}")
+                    matched = False
+                if matched:
+                    misses[name] *= 1.0 - rule.weight
+                else:
+                    remaining.append((name, rule))
+            return remaining
+
+        evaluate(self._rules['creator'], (gpx_data.get('creator') or '').lower())
+        evaluate(self._rules['metadata'], gpx_data.get('metadata') or {})
+        track_rules = self._rules['track']
+        for track in gpx_data.get('tracks', []):
+            if not track_rules:
+                break
+            # 各ルールは一度一致すれば以降のトラックでは評価しない
+            track_rules = evaluate(track_rules, track)
+
+        return {name: 1.0 - miss for name, miss in misses.items()}
+
+    def detect(self, gpx_data: Dict[str, Any]) -> DetectionResult:
+        """GPXデータのサービスを判定
+
+        Args:
+            gpx_data: GPXデータ（ヘッダー情報のみでもよい）
+
+        Returns:
+            DetectionResult: 最も確信度が高いサービスと確信度
+                （確信度がthreshold未満の場合のサービスは'unknown'）
+        """
+        scores = self.score(gpx_data)
+        service, confidence = UNKNOWN_SERVICE, 0.0
+        for name, value in scores.items():
+            if value > confidence:
+                service, confidence = name, value
+        if confidence < self.threshold:
+            service = UNKNOWN_SERVICE
+        return DetectionResult(service, confidence, scores)
+
+    def matches(self, gpx_data: Dict[str, Any], name: str) -> bool:
+        """GPXデータが指定したサービスの形式と判定できるかどうか
+
+        他のサービスの確信度の方が高い場合も、指定したサービスの確信度が
+        threshold以上であればTrueを返します。
+
+        Args:
+            gpx_data: GPXデータ
+            name: サービス名
+
+        Returns:
+            bool: 指定したサービスの形式かどうか
+        """
+        return self.score(gpx_data).get(name, 0.0) >= self.threshold
+
+
+# 既定のレジストリ（servicesパッケージで各サービスを登録）
+registry = ServiceRegistry()
@@ -12,12 +12,29 @@ from typing import Dict, List, Any, Optional
 from datetime import datetime
 import re
 
+from ..normalize import normalize_gpx_points, normalize_points, prepare_gpx_data
+from .registry import DetectionRule, creator_contains, registry, track_name_contains
+
 # ロギング設定
 logger = logging.getLogger(__name__)
 
 class StravaService:
     """Stravaサービスに関する処理を行うクラス"""
 
+    # トラックポイントの精度（小数点以下の桁数、Stravaは小数点以下7桁程度、標高は小数点以下1桁）
+    COORDINATE_DIGITS = 9
+    ELEVATION_DIGITS = 1
+
+    # サービス名と判定ルール（メタデータ・トラックのタイプは他のアプリのGPXにもあるため、
+    # 組み合わせても判定の閾値に届かず、作成者・トラック名の判定を補強するのみ）
+    NAME = 'strava'
+    DETECTION_RULES = (
+        DetectionRule('creator', creator_contains('strava'), 0.9),
+        DetectionRule('track', track_name_contains('strava'), 0.6),
+        DetectionRule('metadata', lambda metadata: len(metadata) > 0, 0.2),
+        DetectionRule('track', lambda track: bool(track.get('type')), 0.2)
+    )
+
     def __init__(self):
         """初期化"""
         pass
@@ -25,23 +42,15 @@ class StravaService:
     def detect(self, gpx_data: Dict[str, Any]) -> bool:
         """GPXデータがStrava形式かどうかを判定
 
+        登録した判定ルール（DETECTION_RULES）による確信度で判定します。
+
         Args:
             gpx_data: GPXデータ
 
         Returns:
             bool: Strava形式かどうか
         """
-        creator = gpx_data.get('creator', '').lower()
-        if 'strava' in creator:
-            return True
-        
-        # メタデータがあり、トラックにタイプが設定されている場合もStravaの可能性が高い
-        if gpx_data.get('metadata') and len(gpx_data.get('metadata', {})) > 0:
-            for track in gpx_data.get('tracks', []):
-                if track.get('type'):
-                    return True
-        
-        return False
+        return registry.matches(gpx_data, self.NAME)
 
     def extract_metadata(self, gpx_data: Dict[str, Any]) -> Dict[str, Any]:
         """Strava固有のメタデータを抽出
@@ -95,53 +104,27 @@ class StravaService:
         """トラックポイントを正規化
 
         Args:
-            points: トラックポイントのリスト
+            points: トラックポイントのリスト（TrackArrayも可）
 
         Returns:
             List[Dict[str, Any]]: 正規化したトラックポイントのリスト
+                （TrackArrayを渡した場合はTrackArray）
         """
-        normalized_points = []
-        
-        for point in points:
-            normalized_point = point.copy()
-            
-            # 緯度・経度の精度を調整（Stravaは小数点以下7桁程度）
-            if 'lat' in normalized_point:
-                try:
-                    lat = float(normalized_point['lat'])
-                    normalized_point['lat'] = f"{lat:.9f}"  # 小数点以下9桁に調整
-                except ValueError:
-                    pass
-            
-            if 'lon' in normalized_point:
-                try:
-                    lon = float(normalized_point['lon'])
-                    normalized_point['lon'] = f"{lon:.9f}"  # 小数点以下9桁に調整
-                except ValueError:
-                    pass
-            
-            # 標高の精度を調整（Stravaは小数点以下1桁）
-            if 'ele' in normalized_point and normalized_point['ele']:
-                try:
-                    ele = float(normalized_point['ele'])
-                    normalized_point['ele'] = f"{ele:.1f}"  # 小数点以下1桁に調整
-                except ValueError:
-                    pass
-            
-            normalized_points.append(normalized_point)
-        
-        return normalized_points
+        return normalize_points(points, self.COORDINATE_DIGITS, self.ELEVATION_DIGITS)
 
-    def convert_to_universal(self, gpx_data: Dict[str, Any]) -> Dict[str, Any]:
+    def convert_to_universal(self, gpx_data: Dict[str, Any], copy: bool = False) -> Dict[str, Any]:
         """Strava形式のGPXデータを統一フォーマットに変換
 
+        デフォルトではgpx_dataを直接書き換えて変換します（トラックポイントもコピーしない）。
+
         Args:
             gpx_data: Strava形式のGPXデータ
+            copy: Trueの場合はgpx_dataを変更せず、コピーを変換する
 
         Returns:
             Dict[str, Any]: 統一フォーマットのGPXデータ
         """
-        universal_data = gpx_data.copy()
+        universal_data = prepare_gpx_data(gpx_data, copy)
         
         # サービス情報を追加
         universal_data['service'] = 'strava'
@@ -156,13 +139,7 @@ class StravaService:
             strava_track_info = self.extract_track_info(gpx_data)
             if strava_track_info:
                 universal_data['tracks'][i].update(strava_track_info)
-            
-            # トラックポイントを正規化
-            if 'points' in track:
-                universal_data['tracks'][i]['points'] = self.normalize_trackpoints(track['points'])
         
-        # 全ポイントも正規化
-        if 'all_points' in universal_data:
-            universal_data['all_points'] = self.normalize_trackpoints(universal_data['all_points'])
+        normalize_gpx_points(universal_data, self.COORDINATE_DIGITS, self.ELEVATION_DIGITS, copy)
         
         return universal_data
\ No newline at end of file
@@ -11,12 +11,28 @@ import logging
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
+from ..normalize import normalize_gpx_points, normalize_points, prepare_gpx_data
+from .registry import DetectionRule, creator_contains, registry, track_name_contains
+
 # ロギング設定
 logger = logging.getLogger(__name__)
 
 class YamarecoService:
     """ヤマレコサービスに関する処理を行うクラス"""
 
+    # トラックポイントの精度（小数点以下の桁数、ヤマレコは小数点以下14桁と非常に精度が高く、標高は整数値）
+    COORDINATE_DIGITS = 9
+    ELEVATION_DIGITS = 1
+
+    # サービス名と判定ルール（トラック名が「track」で、トラック番号が設定されている場合もヤマレコの可能性が高い）
+    NAME = 'yamareco'
+    DETECTION_RULES = (
+        DetectionRule('creator', creator_contains('yamareco'), 0.9),
+        DetectionRule('track', track_name_contains('yamareco'), 0.6),
+        DetectionRule('track', lambda track: track.get('name') == 'track', 0.5),
+        DetectionRule('track', lambda track: track.get('name') == 'track' and bool(track.get('number')), 0.6)
+    )
+
     def __init__(self):
         """初期化"""
         pass
@@ -24,22 +40,15 @@ class YamarecoService:
     def detect(self, gpx_data: Dict[str, Any]) -> bool:
         """GPXデータがヤマレコ形式かどうかを判定
 
+        登録した判定ルール（DETECTION_RULES）による確信度で判定します。
+
         Args:
             gpx_data: GPXデータ
 
         Returns:
             bool: ヤマレコ形式かどうか
         """
-        creator = gpx_data.get('creator', '').lower()
-        if 'yamareco' in creator:
-            return True
-        
-        # トラック名が「track」で、トラック番号が設定されている場合もヤマレコの可能性が高い
-        for track in gpx_data.get('tracks', []):
-            if track.get('name') == 'track' and track.get('number'):
-                return True
-        
-        return False
+        return registry.matches(gpx_data, self.NAME)
 
     def extract_metadata(self, gpx_data: Dict[str, Any]) -> Dict[str, Any]:
         """ヤマレコ固有のメタデータを抽出
@@ -81,53 +90,27 @@ class YamarecoService:
         """トラックポイントを正規化
 
         Args:
-            points: トラックポイントのリスト
+            points: トラックポイントのリスト（TrackArrayも可）
 
         Returns:
             List[Dict[str, Any]]: 正規化したトラックポイントのリスト
+                （TrackArrayを渡した場合はTrackArray）
         """
-        normalized_points = []
-        
-        for point in points:
-            normalized_point = point.copy()
-            
-            # 緯度・経度の精度を調整（ヤマレコは小数点以下14桁と非常に精度が高い）
-            if 'lat' in normalized_point:
-                try:
-                    lat = float(normalized_point['lat'])
-                    normalized_point['lat'] = f"{lat:.9f}"  # 小数点以下9桁に調整
-                except ValueError:
-                    pass
-            
-            if 'lon' in normalized_point:
-                try:
-                    lon = float(normalized_point['lon'])
-                    normalized_point['lon'] = f"{lon:.9f}"  # 小数点以下9桁に調整
-                except ValueError:
-                    pass
-            
-            # 標高の精度を調整（ヤマレコは整数値）
-            if 'ele' in normalized_point and normalized_point['ele']:
-                try:
-                    ele = float(normalized_point['ele'])
-                    normalized_point['ele'] = f"{ele:.1f}"  # 小数点以下1桁に調整
-                except ValueError:
-                    pass
-            
-            normalized_points.append(normalized_point)
-        
-        return normalized_points
+        return normalize_points(points, self.COORDINATE_DIGITS, self.ELEVATION_DIGITS)
 
-    def convert_to_universal(self, gpx_data: Dict[str, Any]) -> Dict[str, Any]:
+    def convert_to_universal(self, gpx_data: Dict[str, Any], copy: bool = False) -> Dict[str, Any]:
         """ヤマレコ形式のGPXデータを統一フォーマットに変換
 
+        デフォルトではgpx_dataを直接書き換えて変換します（トラックポイントもコピーしない）。
+
         Args:
             gpx_data: ヤマレコ形式のGPXデータ
+            copy: Trueの場合はgpx_dataを変更せず、コピーを変換する
 
         Returns:
             Dict[str, Any]: 統一フォーマットのGPXデータ
         """
-        universal_data = gpx_data.copy()
+        universal_data = prepare_gpx_data(gpx_data, copy)
         
         # サービス情報を追加
         universal_data['service'] = 'yamareco'
@@ -142,13 +125,7 @@ class YamarecoService:
             yamareco_track_info = self.extract_track_info(gpx_data)
             if yamareco_track_info:
                 universal_data['tracks'][i].update(yamareco_track_info)
-            
-            # トラックポイントを正規化
-            if 'points' in track:
-                universal_data['tracks'][i]['points'] = self.normalize_trackpoints(track['points'])
         
-        # 全ポイントも正規化
-        if 'all_points' in universal_data:
-            universal_data['all_points'] = self.normalize_trackpoints(universal_data['all_points'])
+        normalize_gpx_points(universal_data, self.COORDINATE_DIGITS, self.ELEVATION_DIGITS, copy)
         
         return universal_data
\ No newline at end of file
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+トラック簡略化モジュール
+
+このモジュールは、Visvalingam–Whyatt法でトラックポイントを間引く機能を提供します。
+各点の重要度は、前後の点を結ぶ線分からのずれ（前後の点と作る三角形の高さ、メートル）とし、
+ずれが最も小さい点から順に、許容誤差（tolerance）未満の点がなくなるまで取り除きます。
+取り除いた点の前後の点のみ重要度を計算し直し、ヒープで次の点を選ぶため、
+計算量はO(n log n)です。
+
+残した点は元のトラックポイントをそのまま使うため、時間・標高・拡張データは変わりません。
+最初と最後の点、座標のない点は常に残します。
+"""
+
+import heapq
+import logging
+from typing import Dict, List, Any, Sequence, Tuple, Union
+
+import numpy as np
+
+from .stats import EARTH_RADIUS, _float_column
+from .track_array import TrackArray
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+
+def _project(lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """緯度・経度をトラックの平均緯度を基準とした平面座標（メートル）に変換"""
+    scale = np.radians(1.0) * EARTH_RADIUS
+    x = lon * (scale * np.cos(np.radians(lat.mean())))
+    y = lat * scale
+    return x, y
+
+
+def _deviations(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """各点の前後の点を結ぶ線分からのずれ（最初と最後の点はinf）"""
+    dx = x[2:] - x[:-2]
+    dy = y[2:] - y[:-2]
+    px = x[1:-1] - x[:-2]
+    py = y[1:-1] - y[:-2]
+    base = np.hypot(dx, dy)
+    # 前後の点が同じ位置の場合（折り返し）は前の点からの距離
+    with np.errstate(divide='ignore', invalid='ignore'):
+        height = np.where(base > 0, np.abs(dx * py - dy * px) / base, np.hypot(px, py))
+    return np.concatenate([[np.inf], height, [np.inf]])
+
+
+def _deviation(x: List[float], y: List[float], p: int, i: int, q: int) -> float:
+    """点iの点pと点qを結ぶ線分からのずれ"""
+    dx = x[q] - x[p]
+    dy = y[q] - y[p]
+    px = x[i] - x[p]
+    py = y[i] - y[p]
+    base = (dx * dx + dy * dy) ** 0.5
+    if base > 0:
+        return abs(dx * py - dy * px) / base
+    return (px * px + py * py) ** 0.5
+
+
+def simplify_mask(lat: np.ndarray, lon: np.ndarray, tolerance: float) -> np.ndarray:
+    """Visvalingam–Whyatt法で残す点を求める
+
+    取り除いた点の前後の点の重要度は、取り除いた点の重要度を下回らないようにします
+    （取り除く順序が重要度の順になるようにするため）。
+
+    Args:
+        lat: 緯度の配列（数値の文字列のリストも可）
+        lon: 経度の配列（数値の文字列のリストも可）
+        tolerance: 許容誤差（メートル、前後の点を結ぶ線分からのずれがこれ未満の点を取り除く）
+
+    Returns:
+        np.ndarray: 残す点がTrueの真偽値の配列
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    keep = np.ones(len(lat), dtype=bool)
+    valid = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+    if tolerance <= 0 or len(valid) < 3:
+        return keep
+
+    x, y = _project(lat[valid], lon[valid])
+    deviations = _deviations(x, y)
+    candidates = np.flatnonzero(deviations < tolerance)
+    if not len(candidates):
+        return keep
+
+    # 許容誤差未満の点のみをヒープに入れ、取り除いた点の前後をつなぎ直す
+    count = len(valid)
+    heap = list(zip(deviations[candidates].tolist(), candidates.tolist()))
+    heapq.heapify(heap)
+    heappop = heapq.heappop
+    heappush = heapq.heappush
+    current = deviations.tolist()
+    previous = list(range(-1, count - 1))
+    following = list(range(1, count + 1))
+    xs = x.tolist()
+    ys = y.tolist()
+    removed = bytearray(count)
+    last = count - 1
+
+    while heap:
+        deviation, i = heappop(heap)
+        if removed[i] or deviation != current[i]:
+            # 重要度を計算し直した点の古い項目
+            continue
+        removed[i] = 1
+        p = previous[i]
+        q = following[i]
+        following[p] = q
+        previous[q] = p
+        for j in (p, q):
+            if j == 0 or j == last:
+                continue
+            # _deviationと同じ計算（ループ内の関数呼び出しを避ける）
+            a = previous[j]
+            b = following[j]
+            ax = xs[a]
+            ay = ys[a]
+            dx = xs[b] - ax
+            dy = ys[b] - ay
+            px = xs[j] - ax
+            py = ys[j] - ay
+            base = (dx * dx + dy * dy) ** 0.5
+            value = abs(dx * py - dy * px) / base if base > 0 else (px * px + py * py) ** 0.5
+            if value < deviation:
+                value = deviation
+            current[j] = value
+            if value < tolerance:
+                heappush(heap, (value, j))
+
+    keep[valid[np.frombuffer(removed, dtype=bool)]] = False
+    return keep
+
+
+def simplify_points(points: Union[Sequence[Dict[str, Any]], TrackArray],
+                    tolerance: float) -> Union[List[Dict[str, Any]], TrackArray]:
+    """トラックポイントを間引く
+
+    Args:
+        points: トラックポイントの辞書のリスト（TrackArrayも可）
+        tolerance: 許容誤差（メートル）
+
+    Returns:
+        Union[List[Dict[str, Any]], TrackArray]: 残したトラックポイント
+            （TrackArrayの場合はTrackArray、それ以外は元の辞書のリスト）
+    """
+    if not len(points):
+        return points
+    if isinstance(points, TrackArray):
+        return points.take(np.flatnonzero(simplify_mask(points.lat, points.lon, tolerance)))
+
+    points = points if isinstance(points, list) else list(points)
+    keep = simplify_mask(_float_column([point.get('lat') for point in points]),
+                         _float_column([point.get('lon') for point in points]), tolerance)
+    return [point for point, kept in zip(points, keep.tolist()) if kept]
+
+
+def reduction_ratio(original: int, simplified: int) -> float:
+    """間引いた点の割合（0〜1）
+
+    Args:
+        original: 元の点数
+        simplified: 間引いた後の点数
+
+    Returns:
+        float: 間引いた点の割合
+    """
+    return 1.0 - simplified / original if original else 0.0
+
+
+def format_reduction(original: int, simplified: int) -> str:
+    """間引いた結果を表示用の文字列に整形
+
+    Args:
+        original: 元の点数
+        simplified: 間引いた後の点数
+
+    Returns:
+        str: 表示する文字列
+    """
+    return (f"トラックを簡略化しました: {original}ポイント → {simplified}ポイント"
+            f"（{reduction_ratio(original, simplified):.1%}削減）")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+入出力ソースモジュール
+
+このモジュールは、GPXの入力としてファイルのパス・bytes・memoryview・バイナリモードの
+ファイルオブジェクトを、出力としてファイルのパス・バイナリモードのファイルオブジェクトを
+同じように扱うための関数を提供します。bytesやmemoryviewは全体をコピーせずに
+少しずつ読み込むため、Webアプリのようにメモリ上にあるデータを一時ファイルなしで
+解析・変換できます。
+"""
+
+import io
+import os
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Iterator, Union
+
+# 入力として受け付ける型
+GPXSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+# 出力として受け付ける型
+GPXTarget = Union[str, os.PathLike, BinaryIO]
+
+
+class BufferReader(io.RawIOBase):
+    """bytes・memoryview等をコピーせずに読み込むファイルオブジェクト"""
+
+    def __init__(self, data: Union[bytes, bytearray, memoryview]):
+        """初期化
+
+        Args:
+            data: 読み込むバイト列
+        """
+        super().__init__()
+        self._view = memoryview(data).cast('B')
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        """バッファに読み込み、読み込んだバイト数を返す"""
+        size = min(len(buffer), len(self._view) - self._position)
+        buffer[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+
+
+def is_path(source: Any) -> bool:
+    """ファイルのパスかどうか"""
+    return isinstance(source, (str, os.PathLike))
+
+
+def is_buffer(source: Any) -> bool:
+    """メモリ上のバイト列（bytes・bytearray・memoryview）かどうか"""
+    return isinstance(source, (bytes, bytearray, memoryview))
+
+
+def source_name(source: Any) -> str:
+    """ログに表示する入出力の名前"""
+    if is_path(source):
+        return os.fspath(source)
+    if is_buffer(source):
+        return f"<{len(memoryview(source).cast('B'))}バイトのデータ>"
+    return str(getattr(source, 'name', '<ストリーム>'))
+
+
+@contextmanager
+def open_input(source: GPXSource) -> Iterator[BinaryIO]:
+    """入力をバイナリモードのファイルオブジェクトとして開く
+
+    Args:
+        source: ファイルのパス、bytes・bytearray・memoryview、またはバイナリモードのファイルオブジェクト
+
+    Yields:
+        BinaryIO: 読み込み用のファイルオブジェクト（渡されたファイルオブジェクトは閉じない）
+
+    Raises:
+        TypeError: 対応していない型の場合
+    """
+    if is_path(source):
+        with open(source, 'rb') as f:
+            yield f
+    elif is_buffer(source):
+        yield BufferReader(source)
+    elif hasattr(source, 'read'):
+        yield source
+    else:
+        raise TypeError(f"対応していない入力です: {type(source).__name__}")
+
+
+def read_input(source: GPXSource) -> Union[bytes, bytearray, memoryview]:
+    """入力全体をバイト列として取得（メモリ上のバイト列はそのまま返す）
+
+    Args:
+        source: ファイルのパス、bytes・bytearray・memoryview、またはバイナリモードのファイルオブジェクト
+
+    Returns:
+        Union[bytes, bytearray, memoryview]: 入力のバイト列
+    """
+    if is_buffer(source):
+        return source
+    with open_input(source) as f:
+        return f.read()
+
+
+@contextmanager
+def open_output(target: GPXTarget) -> Iterator[BinaryIO]:
+    """出力をバイナリモードのファイルオブジェクトとして開く
+
+    Args:
+        target: ファイルのパス、またはバイナリモードのファイルオブジェクト
+
+    Yields:
+        BinaryIO: 書き込み用のファイルオブジェクト（渡されたファイルオブジェクトは閉じない）
+
+    Raises:
+        TypeError: 対応していない型の場合
+    """
+    if is_path(target):
+        with open(target, 'wb') as f:
+            yield f
+    elif hasattr(target, 'write'):
+        yield target
+    else:
+        raise TypeError(f"対応していない出力です: {type(target).__name__}")
+
+
+def write_text(target: GPXTarget, text: str) -> None:
+    """テキストをUTF-8で出力
+
+    Args:
+        target: ファイルのパス、またはバイナリモードのファイルオブジェクト
+        text: 出力するテキスト
+    """
+    with open_output(target) as f:
+        f.write(text.encode('utf-8'))
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+トラック統計モジュール
+
+このモジュールは、トラックポイントの座標・標高・時間の列（TrackArray、または
+トラックポイント辞書のリストから作成した配列）から、距離（haversine）、累積距離、
+ヒステリシス付きの累積標高、移動時間、最高・平均速度、日付ごとの集計を
+NumPyでまとめて計算する機能を提供します。1点ずつのPythonのループは使わないため、
+数百万点のトラックも1秒未満で集計できます。
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .timestamps import NO_TIME, decode_timestamps
+from .track_array import TrackArray
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# 地球の平均半径（メートル）
+EARTH_RADIUS = 6371008.8
+
+# 累積標高で無視する標高の変化（メートル、この幅に収まる上下動は数えない）
+DEFAULT_ELEVATION_HYSTERESIS = 5.0
+
+# 移動中とみなす速度の下限（メートル/秒）
+DEFAULT_MOVING_SPEED = 0.5
+
+# 最高速度を求める際に速度を平均する時間（秒、GPSの誤差による瞬間的な速度を除く）
+DEFAULT_SPEED_WINDOW = 10
+
+_SECONDS_PER_DAY = 86400
+
+# 最高速度の計算で1秒ごとの点数の表を使う時間の範囲の上限（点数に対する倍率）
+_COUNT_TABLE_FACTOR = 8
+
+
+def _float_column(values: Sequence[Any]) -> np.ndarray:
+    """数値の文字列の列をfloat64配列に変換（変換できない値・NoneはNaN）"""
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        pass
+
+    def to_float(value: Any) -> float:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return np.nan
+
+    return np.fromiter(map(to_float, values), dtype=np.float64, count=len(values))
+
+
+def point_columns(points: Sequence[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """トラックポイントから緯度・経度・標高・時間の列を取得
+
+    Args:
+        points: トラックポイントの辞書のリスト（TrackArrayも可）
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+            緯度・経度・標高（float64、欠損はNaN）とUNIX時間（int64秒、欠損はNO_TIME）
+    """
+    if isinstance(points, TrackArray):
+        return points.lat, points.lon, points.ele.astype(np.float64), points.time
+
+    points = points if isinstance(points, list) else list(points)
+    lat = _float_column([point.get('lat') for point in points])
+    lon = _float_column([point.get('lon') for point in points])
+    ele = _float_column([point.get('ele') for point in points])
+    time = decode_timestamps([point.get('time') for point in points])
+    return lat, lon, ele, time
+
+
+def haversine(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """2点間の大円距離（メートル）を列ごとに計算
+
+    Args:
+        lat1, lon1: 始点の緯度・経度（度）
+        lat2, lon2: 終点の緯度・経度（度）
+
+    Returns:
+        np.ndarray: 距離の配列（座標が欠損している組はNaN）
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=np.float64)) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) * 0.5) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) * 0.5) ** 2
+    return 2.0 * EARTH_RADIUS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def segment_distances(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """隣り合う点の間の距離（メートル）を計算
+
+    Args:
+        lat: 緯度の列（度）
+        lon: 経度の列（度）
+
+    Returns:
+        np.ndarray: 長さlen(lat)-1の距離の配列（座標が欠損している区間は0）
+    """
+    if len(lat) < 2:
+        return np.zeros(0)
+    # cosは各点で1回だけ計算し、一時配列を作らないよう各演算は書き込み先を指定する
+    lat = np.radians(lat)
+    lon = np.radians(lon)
+    cos_lat = np.cos(lat)
+    a = np.diff(lat)
+    a *= 0.5
+    np.sin(a, out=a)
+    np.square(a, out=a)
+    b = np.diff(lon)
+    b *= 0.5
+    np.sin(b, out=b)
+    np.square(b, out=b)
+    b *= cos_lat[:-1]
+    b *= cos_lat[1:]
+    a += b
+    np.minimum(a, 1.0, out=a)
+    np.sqrt(a, out=a)
+    np.arcsin(a, out=a)
+    a *= 2.0 * EARTH_RADIUS
+    a[np.isnan(a)] = 0.0
+    return a
+
+
+def cumulative_distance(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """各点までの累積距離（メートル）を計算
+
+    Args:
+        lat: 緯度の列（度）
+        lon: 経度の列（度）
+
+    Returns:
+        np.ndarray: 長さlen(lat)の累積距離の配列（最初の点は0）
+    """
+    result = np.zeros(len(lat))
+    np.cumsum(segment_distances(lat, lon), out=result[1:])
+    return result
+
+
+def hysteresis_filter(values: np.ndarray, threshold: float,
+                      initial: Optional[float] = None) -> np.ndarray:
+    """幅thresholdの不感帯で標高の列を平滑化
+
+    出力は入力の±threshold/2の範囲を外れた場合にのみ追従するため、
+    thresholdより小さい上下動は出力に現れません。各点の処理は区間[x-h/2, x+h/2]への
+    クランプで、クランプの合成はクランプになることを利用し、列を約√n個のブロックに分けて
+    ブロック内の合成・ブロック間の伝搬・各点の値をそれぞれ配列演算でまとめて計算します。
+
+    Args:
+        values: 標高の列（欠損を含まないこと）
+        threshold: 不感帯の幅（0以下の場合は入力をそのまま返す）
+        initial: 直前の出力（続きの列を平滑化する場合、指定しない場合は最初の値から始める）
+
+    Returns:
+        np.ndarray: 平滑化した標高の列
+    """
+    values = np.asarray(values, dtype=np.float64)
+    count = len(values)
+    if count == 0 or threshold <= 0:
+        return values.copy()
+
+    half = threshold * 0.5
+    width = max(1, int(np.sqrt(count)))
+    rows = -(-count // width)
+    padding = rows * width - count
+    # ブロックごとに処理する位置が連続するよう、転置して（ブロック内の位置, ブロック）の配列にする
+    padded = np.concatenate([values, np.zeros(padding)]).reshape(rows, width).T.copy()
+    low = padded - half
+    high = padded + half
+    if padding:
+        # 末尾の詰め物は値を変えないクランプ[-inf, inf]
+        low[width - padding:, -1] = -np.inf
+        high[width - padding:, -1] = np.inf
+
+    # 各ブロックのクランプを1つのクランプに合成
+    block_low = low[0].copy()
+    block_high = high[0].copy()
+    for position in range(1, width):
+        np.maximum(block_low, low[position], out=block_low)
+        np.minimum(block_low, high[position], out=block_low)
+        np.maximum(block_high, low[position], out=block_high)
+        np.minimum(block_high, high[position], out=block_high)
+
+    # 各ブロックの開始時点の値を伝搬
+    starts = []
+    current = float(values[0]) if initial is None else float(initial)
+    for lower, upper in zip(block_low.tolist(), block_high.tolist()):
+        starts.append(current)
+        current = min(max(current, lower), upper)
+
+    # 各点の値（lowに上書きする）
+    current = np.array(starts)
+    for position in range(width):
+        np.maximum(current, low[position], out=current)
+        np.minimum(current, high[position], out=current)
+        low[position] = current
+    return low.T.ravel()[:count]
+
+
+def elevation_gain_loss(ele: np.ndarray,
+                        hysteresis: float = DEFAULT_ELEVATION_HYSTERESIS) -> Tuple[float, float]:
+    """累積標高（上昇・下降）を計算
+
+    Args:
+        ele: 標高の列（欠損はNaN、欠損した点は除いて計算）
+        hysteresis: 無視する標高の変化の幅（メートル）
+
+    Returns:
+        Tuple[float, float]: 累積上昇と累積下降（いずれも0以上のメートル）
+    """
+    ele = np.asarray(ele, dtype=np.float64)
+    changes = np.diff(hysteresis_filter(ele[~np.isnan(ele)], hysteresis))
+    return float(changes[changes > 0].sum()), float(-changes[changes < 0].sum())
+
+
+def _window_starts(time: np.ndarray, window: int) -> np.ndarray:
+    """各点からwindow秒以上前の最も近い点のインデックス（ない場合は-1、timeは昇順）"""
+    first = int(time[0])
+    span = int(time[-1]) - first
+    if span > _COUNT_TABLE_FACTOR * len(time):
+        return np.searchsorted(time, time - window, side='right') - 1
+
+    # 時間の範囲が点数に比べて短い場合は、1秒ごとの点数の累積和から二分探索せずに求める
+    counts = np.bincount(time - first, minlength=span + 1)
+    np.cumsum(counts, out=counts)
+    offsets = time - (first + window)
+    starts = np.full(len(time), -1, dtype=np.int64)
+    reachable = offsets >= 0
+    starts[reachable] = counts[offsets[reachable]] - 1
+    return starts
+
+
+def _max_window_speed(distance: np.ndarray, time: np.ndarray, window: float) -> float:
+    """window秒以上の間隔で求めた速度の最大値（distanceは累積距離、timeは昇順）"""
+    if len(time) < 2:
+        return 0.0
+    # 時間は整数秒のため、window秒以上前はceil(window)秒以上前と同じ
+    starts = _window_starts(time, max(1, int(np.ceil(window))))
+    valid = starts >= 0
+    if not valid.any():
+        # 全体がwindow秒に満たない場合は最初と最後の点で求める
+        elapsed = time[-1] - time[0]
+        return float((distance[-1] - distance[0]) / elapsed) if elapsed > 0 else 0.0
+    speeds = np.divide(distance - distance[starts], time - time[starts],
+                       out=np.zeros(len(time)), where=valid)
+    return float(speeds.max())
+
+
+def _to_datetime(seconds: int) -> datetime:
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+
+def compute_statistics(points: Sequence[Dict[str, Any]],
+                       hysteresis: float = DEFAULT_ELEVATION_HYSTERESIS,
+                       moving_speed: float = DEFAULT_MOVING_SPEED,
+                       speed_window: float = DEFAULT_SPEED_WINDOW) -> Dict[str, Any]:
+    """トラックポイントの統計を計算
+
+    距離は隣り合う点の間の大円距離の合計です。時間に関する値は時間が記録された点のみで
+    計算し、点の順序は時間順（GPXParserの'all_points'）であることを前提とします。
+    区間の速度がmoving_speed以上の区間の時間を移動時間とし、日付（UTC）ごとの集計では
+    各区間を終点の日付に含めます。
+
+    Args:
+        points: トラックポイントの辞書のリスト（TrackArrayも可）
+        hysteresis: 累積標高で無視する標高の変化の幅（メートル）
+        moving_speed: 移動中とみなす速度の下限（メートル/秒）
+        speed_window: 最高速度を求める際に速度を平均する時間（秒）
+
+    Returns:
+        Dict[str, Any]: 統計の辞書（距離はメートル、時間は秒、速度はメートル/秒）
+            'points': ポイント数
+            'distance': 距離
+            'elevation_gain', 'elevation_loss': 累積上昇・下降
+            'min_elevation', 'max_elevation': 最低・最高標高（標高がない場合はNone）
+            'start_time', 'end_time': 開始・終了日時（時間がない場合はNone）
+            'elapsed_time', 'moving_time': 経過時間・移動時間
+            'max_speed', 'average_speed': 最高速度・平均移動速度
+            'days': 日付ごとの集計（'date', 'points', 'distance', 'elevation_gain',
+                'elevation_loss', 'moving_time', 'start_time', 'end_time'）のリスト
+    """
+    lat, lon, ele, time = point_columns(points)
+    count = len(lat)
+    total_distance = np.zeros(count)
+    np.cumsum(segment_distances(lat, lon), out=total_distance[1:])
+
+    # 累積標高は標高のある点のみを平滑化した変化から求める
+    ele_index = np.flatnonzero(~np.isnan(ele))
+    elevations = ele if len(ele_index) == count else ele[ele_index]
+    ele_changes = np.diff(hysteresis_filter(elevations, hysteresis))
+    ele_gain = np.maximum(ele_changes, 0)
+    ele_loss = np.maximum(-ele_changes, 0)
+
+    stats = {
+        'points': count,
+        'distance': float(total_distance[-1]) if count else 0.0,
+        'elevation_gain': float(ele_gain.sum()),
+        'elevation_loss': float(ele_loss.sum()),
+        'min_elevation': float(elevations.min()) if len(elevations) else None,
+        'max_elevation': float(elevations.max()) if len(elevations) else None,
+        'start_time': None,
+        'end_time': None,
+        'elapsed_time': 0,
+        'moving_time': 0,
+        'max_speed': 0.0,
+        'average_speed': 0.0,
+        'days': []
+    }
+
+    timed = np.flatnonzero(time != NO_TIME)
+    if not len(timed):
+        return stats
+    all_timed = len(timed) == count
+    times = time if all_timed else time[timed]
+    first_time = int(times.min())
+    last_time = int(times.max())
+    stats['start_time'] = _to_datetime(first_time)
+    stats['end_time'] = _to_datetime(last_time)
+    stats['elapsed_time'] = last_time - first_time
+
+    # 時間が記録された点の間の区間（間の時間のない点の距離も含める）
+    timed_distance = total_distance if all_timed else total_distance[timed]
+    interval_distance = np.diff(timed_distance)
+    interval_time = np.diff(times)
+    forward = interval_time > 0
+    ordered = bool(forward.all()) or bool(np.all(interval_time >= 0))
+    # 速度がmoving_speed以上（距離がmoving_speed×時間以上）の区間を移動中とする
+    moving = interval_distance >= moving_speed * interval_time
+    moving &= forward
+    moving_seconds = np.where(moving, interval_time, 0)
+    stats['moving_time'] = int(moving_seconds.sum())
+    if stats['moving_time'] > 0:
+        stats['average_speed'] = float(interval_distance[moving].sum() / stats['moving_time'])
+    if ordered:
+        stats['max_speed'] = _max_window_speed(timed_distance, times, speed_window)
+    elif forward.any():
+        # 時間順でない場合は区間ごとの速度で求める
+        stats['max_speed'] = float((interval_distance[forward] / interval_time[forward]).max())
+
+    # 日付ごとの集計（区間・標高の変化は終点の日付に含め、終点に時間がない標高の変化は含めない）
+    day_numbers = times // _SECONDS_PER_DAY
+    if ordered:
+        # 時間順の場合は日付の切り替わりで区切り、区間ごとの値の累積和の差で合計する
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(day_numbers)) + 1])
+        ends = np.append(starts[1:], len(times))
+        days = day_numbers[starts]
+        counts = ends - starts
+        day_start = times[starts]
+        day_end = times[ends - 1]
+        interval_starts = np.maximum(starts - 1, 0)
+        interval_ends = ends - 1
+
+        def sum_by_day(values: np.ndarray) -> np.ndarray:
+            totals = np.zeros(len(values) + 1)
+            np.cumsum(values, out=totals[1:])
+            return totals[interval_ends] - totals[interval_starts]
+
+        day_index = None
+    else:
+        days, day_index, counts = np.unique(day_numbers, return_inverse=True, return_counts=True)
+        day_start = np.full(len(days), np.iinfo(np.int64).max)
+        day_end = np.full(len(days), np.iinfo(np.int64).min)
+        np.minimum.at(day_start, day_index, times)
+        np.maximum.at(day_end, day_index, times)
+
+        def sum_by_day(values: np.ndarray) -> np.ndarray:
+            return np.bincount(day_index[1:], weights=values, minlength=len(days))
+
+    day_distance = sum_by_day(interval_distance)
+    day_moving = sum_by_day(moving_seconds)
+
+    if all_timed and len(ele_index) == count:
+        # 標高の変化と区間が一致する
+        day_gain = sum_by_day(ele_gain)
+        day_loss = sum_by_day(ele_loss)
+    else:
+        if day_index is None:
+            day_index = np.repeat(np.arange(len(days)), counts)
+        point_day = np.full(count, -1, dtype=np.intp)
+        point_day[timed] = day_index
+        change_day = point_day[ele_index[1:]]
+        dated = change_day >= 0
+        day_gain = np.bincount(change_day[dated], weights=ele_gain[dated], minlength=len(days))
+        day_loss = np.bincount(change_day[dated], weights=ele_loss[dated], minlength=len(days))
+
+    dates = np.datetime_as_string(days.astype('datetime64[D]'), unit='D').tolist()
+    for i, date in enumerate(dates):
+        stats['days'].append({
+            'date': date,
+            'points': int(counts[i]),
+            'distance': float(day_distance[i]),
+            'elevation_gain': float(day_gain[i]),
+            'elevation_loss': float(day_loss[i]),
+            'moving_time': int(day_moving[i]),
+            'start_time': _to_datetime(int(day_start[i])),
+            'end_time': _to_datetime(int(day_end[i]))
+        })
+
+    return stats
+
+
+def format_duration(seconds: int) -> str:
+    """秒数を「H時間 M分」の形式に整形"""
+    hours, remainder = divmod(int(seconds), 3600)
+    return f"{hours}時間 {remainder // 60}分"
+
+
+def format_statistics(stats: Dict[str, Any]) -> List[str]:
+    """統計を表示用の行に整形
+
+    Args:
+        stats: compute_statisticsまたはStatisticsCollector.resultの統計
+
+    Returns:
+        List[str]: 表示する行のリスト
+    """
+    lines = [
+        "  距離・標高・速度:",
+        f"    距離: {stats['distance'] / 1000:.2f} km",
+        f"    累積標高: 上昇 {stats['elevation_gain']:.0f} m / 下降 {stats['elevation_loss']:.0f} m"
+    ]
+    if stats['min_elevation'] is not None:
+        lines.append(f"    標高: 最低 {stats['min_elevation']:.1f} m / 最高 {stats['max_elevation']:.1f} m")
+
+    if stats['start_time'] is None:
+        return lines
+
+    start_time = stats['start_time']
+    end_time = stats['end_time']
+    lines.extend([
+        f"    移動時間: {format_duration(stats['moving_time'])}（経過時間: {format_duration(stats['elapsed_time'])}）",
+        f"    最高速度: {stats['max_speed'] * 3.6:.1f} km/h",
+        f"    平均移動速度: {stats['average_speed'] * 3.6:.1f} km/h",
+        "  日付分析:",
+        f"    開始日時: {start_time.strftime('%Y-%m-%d %H:%M:%S')}",
+        f"    終了日時: {end_time.strftime('%Y-%m-%d %H:%M:%S')}",
+        f"    期間: {(end_time.date() - start_time.date()).days}日",
+        f"    ユニークな日付: {len(stats['days'])}",
+        "    日付ごとの集計:"
+    ])
+    for day in stats['days']:
+        # ストリーミング集計では区間のない日の距離等は含まれない
+        lines.append(f"      {day['date']}: {day.get('points', 0)}ポイント、{day.get('distance', 0.0) / 1000:.2f} km、"
+                     f"上昇 {day.get('elevation_gain', 0.0):.0f} m / 下降 {day.get('elevation_loss', 0.0):.0f} m、"
+                     f"移動時間 {format_duration(day.get('moving_time', 0))}")
+    return lines
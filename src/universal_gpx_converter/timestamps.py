@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+タイムスタンプ変換モジュール
+
+このモジュールは、GPXの時間文字列（ISO 8601形式）をまとめて変換する機能を提供します。
+ヤマレコ・Runkeeper・Stravaが出力する固定長の「YYYY-MM-DDTHH:MM:SSZ」形式は
+NumPyで列ごとに一括変換し、小数秒やタイムゾーンオフセットを含むその他の形式は
+1件ずつ正確に変換します。
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Sequence
+
+import numpy as np
+
+# 時間が欠けていることを表す値（datetime64のNaTと同じビット表現）
+NO_TIME = np.iinfo(np.int64).min
+
+# 単位ごとの1秒あたりの値
+UNIT_SCALE = {
+    's': 1,
+    'ms': 1000,
+    'us': 1000000
+}
+
+# 固定長形式「YYYY-MM-DDTHH:MM:SSZ」の文字数と、区切り文字・数字の位置
+_FIXED_LENGTH = 20
+_SEPARATOR_POSITIONS = [4, 7, 10, 13, 16, 19]
+_SEPARATOR_BYTES = np.frombuffer(b'--T::Z', dtype=np.uint8)
+_DIGIT_POSITIONS = [0, 1, 2, 3, 5, 6, 8, 9, 11, 12, 14, 15, 17, 18]
+
+# 各月の日数（平年）
+_DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int64)
+
+# 固定長形式以外の時間文字列
+_ISO_PATTERN = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})'
+    r'(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:[.,](\d+))?)?)?'
+    r'(Z|[+-]\d{2}(?::?\d{2})?)?$',
+    re.ASCII
+)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _days_from_civil(year: np.ndarray, month: np.ndarray, day: np.ndarray) -> np.ndarray:
+    """グレゴリオ暦の日付を1970-01-01からの日数に変換（列ごと）"""
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+def _parse_iso(text: str) -> datetime:
+    """固定長形式以外のISO 8601形式の時間文字列を解析
+
+    Args:
+        text: 時間文字列
+
+    Returns:
+        datetime: 解析結果（オフセットがない場合はタイムゾーンなし）
+
+    Raises:
+        ValueError: 解析できない場合
+    """
+    match = _ISO_PATTERN.match(text.strip())
+    if not match:
+        raise ValueError(f"ISO 8601形式の時間ではありません: {text!r}")
+
+    year, month, day, hour, minute, second, fraction, offset = match.groups()
+
+    # 小数秒はマイクロ秒（6桁）に切り詰める
+    microsecond = int((fraction or '0')[:6].ljust(6, '0'))
+
+    tzinfo = None
+    if offset == 'Z':
+        tzinfo = timezone.utc
+    elif offset:
+        sign = -1 if offset[0] == '-' else 1
+        digits = offset[1:].replace(':', '')
+        minutes = int(digits[:2]) * 60 + int(digits[2:4] or 0)
+        tzinfo = timezone(sign * timedelta(minutes=minutes))
+
+    return datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0),
+                    int(second or 0), microsecond, tzinfo=tzinfo)
+
+
+def parse_datetime(text: str) -> datetime:
+    """GPXの時間文字列をdatetimeに変換
+
+    datetime.fromisoformat(text.replace('Z', '+00:00'))と同じ結果を返し、
+    Pythonのバージョンによってfromisoformatが扱えない小数秒の桁数なども解析します。
+
+    Args:
+        text: 時間文字列
+
+    Returns:
+        datetime: 解析結果（オフセットがない場合はタイムゾーンなし）
+
+    Raises:
+        ValueError: 解析できない場合
+    """
+    try:
+        return datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        return _parse_iso(text)
+
+
+def _decode_one(text: str, scale: int) -> int:
+    """時間文字列を1件だけUNIX時間に変換（タイムゾーンなしはUTCとみなす）"""
+    try:
+        dt = _parse_iso(text)
+    except ValueError:
+        return NO_TIME
+
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    microseconds = (dt - _EPOCH) // timedelta(microseconds=1)
+    return microseconds // (UNIT_SCALE['us'] // scale)
+
+
+def decode_timestamps(values: Sequence[Optional[str]], unit: str = 's') -> np.ndarray:
+    """GPXの時間文字列の列をUNIX時間のint64配列にまとめて変換
+
+    固定長の「YYYY-MM-DDTHH:MM:SSZ」形式は文字列を連結したバイト列を
+    NumPyの2次元配列として一括で検証・変換し、それ以外の形式
+    （小数秒、タイムゾーンオフセット等）は1件ずつ変換します。
+    タイムゾーンのない時間はUTCとみなします。
+
+    Args:
+        values: 時間文字列の列（Noneは欠損）
+        unit: 返す値の単位（'s'、'ms'、'us'）
+
+    Returns:
+        np.ndarray: UNIX時間のint64配列（欠損・解析できない値はNO_TIME）
+    """
+    if unit not in UNIT_SCALE:
+        raise ValueError(f"未対応の単位です: {unit}")
+    scale = UNIT_SCALE[unit]
+
+    texts = ['' if value is None else value for value in values]
+    count = len(texts)
+    result = np.full(count, NO_TIME, dtype=np.int64)
+    if not count:
+        return result
+
+    lengths = np.fromiter(map(len, texts), dtype=np.intp, count=count)
+    fixed = np.flatnonzero(lengths == _FIXED_LENGTH)
+    others = np.flatnonzero((lengths != _FIXED_LENGTH) & (lengths > 0))
+
+    if len(fixed):
+        if len(fixed) == count:
+            joined = ''.join(texts)
+        else:
+            joined = ''.join([texts[i] for i in fixed.tolist()])
+
+        # ASCII以外の文字は1文字1バイトの'?'に置き換わるため行の長さは変わらない
+        raw = np.frombuffer(joined.encode('ascii', 'replace'), dtype=np.uint8)
+        raw = raw.reshape(-1, _FIXED_LENGTH)
+
+        # uint8のまま引き算すると'0'未満の文字は大きな値に折り返すため、9以下かだけを見ればよい
+        digits = raw - np.uint8(ord('0'))
+        valid = (raw[:, _SEPARATOR_POSITIONS] == _SEPARATOR_BYTES).all(axis=1)
+        valid &= (digits[:, _DIGIT_POSITIONS] <= 9).all(axis=1)
+
+        def field(start: int, end: int) -> np.ndarray:
+            value = digits[:, start].astype(np.int64)
+            for position in range(start + 1, end):
+                value = value * 10 + digits[:, position]
+            return value
+
+        year = field(0, 4)
+        month = field(5, 7)
+        day = field(8, 10)
+        hour = field(11, 13)
+        minute = field(14, 16)
+        second = field(17, 19)
+
+        leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+        month_days = _DAYS_IN_MONTH[np.clip(month, 1, 12) - 1] + (leap & (month == 2))
+        valid &= (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= month_days)
+        valid &= (hour < 24) & (minute < 60) & (second < 60)
+
+        seconds = (_days_from_civil(year, month, day) * 86400 +
+                   hour * 3600 + minute * 60 + second)
+        result[fixed[valid]] = seconds[valid] * scale
+
+        # 固定長でも形式が異なるもの（オフセット付き等）は1件ずつ変換
+        others = np.concatenate([others, fixed[~valid]])
+
+    for i in others.tolist():
+        result[i] = _decode_one(texts[i], scale)
+
+    return result
+
+
+def decode_datetime64(values: Sequence[Optional[str]], unit: str = 's') -> np.ndarray:
+    """GPXの時間文字列の列をdatetime64配列にまとめて変換
+
+    Args:
+        values: 時間文字列の列（Noneは欠損）
+        unit: datetime64の単位（'s'、'ms'、'us'）
+
+    Returns:
+        np.ndarray: datetime64配列（欠損・解析できない値はNaT）
+    """
+    return decode_timestamps(values, unit).view(f'datetime64[{unit}]')
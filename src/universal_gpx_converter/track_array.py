@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+トラックポイント列指向コンテナモジュール
+
+このモジュールは、トラックポイントを辞書のリストではなく列ごとの連続した配列として
+保持するTrackArrayを提供します。1点あたり数百バイトかかる辞書表現に比べて
+メモリ使用量が小さく、列単位の一括処理が可能です。
+"""
+
+import logging
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Iterator, Sequence, Tuple
+
+import numpy as np
+
+from .timestamps import NO_TIME, decode_timestamps
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# センサー列として保持する拡張データ
+SENSOR_FIELDS = ('hr', 'cad', 'temp', 'atemp')
+
+# 辞書表現へ変換する際にまとめて整形する点数
+_CHUNK_SIZE = 4096
+
+
+def _format_shortest(values: List[float]) -> List[Optional[str]]:
+    """浮動小数点数のリストを元の値に戻せる最短の10進数の文字列に整形（欠損はNone）
+
+    整数値は小数点なしで整形します。GPXの数値（xsd:decimal）は指数表記を使えないため、
+    reprが指数表記になる値（非常に大きい値・小さい値）は位置表記で整形します。
+    """
+    strings = [None if value != value else repr(value) for value in values]
+    for i, text in enumerate(strings):
+        if text is None:
+            continue
+        if 'e' in text:
+            strings[i] = np.format_float_positional(values[i], trim='-')
+        elif text.endswith('.0'):
+            strings[i] = text[:-2]
+    return strings
+
+
+def _format_fixed(values: List[float], digits: int) -> List[Optional[str]]:
+    """浮動小数点数のリストを小数点以下digits桁の文字列に整形（欠損はNone）"""
+    if not values:
+        return []
+    strings = ((f"%.{digits}f\n" * len(values)) % tuple(values)).split('\n')[:-1]
+    return [None if value != value else text for value, text in zip(values, strings)]
+
+
+def _to_float(text: Optional[str]) -> float:
+    """文字列を浮動小数点数に変換（変換できない場合はNaN）"""
+    if text is None:
+        return np.nan
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+
+class TrackArray:
+    """トラックポイントを列ごとの連続した配列で保持するクラス
+
+    lat/lon/eleはfloat64（標高の欠損はNaN）、timeはUNIX時間（秒）のint64
+    （欠損はNO_TIME）で保持します。心拍数などのセンサー値はfloat32の任意列として
+    sensorsに保持します。
+
+    時間は秒単位のUTCとして保持するため、元の文字列の小数秒とタイムゾーンの
+    オフセットは保持せず、辞書表現ではUTCの「YYYY-MM-DDTHH:MM:SSZ」形式になります。
+
+    整数インデックスやイテレーションでは従来のトラックポイント辞書を返すため、
+    辞書のリストを前提としたコードからも読み取り専用でそのまま利用できます。
+    precision（座標・標高の小数点以下の桁数）を指定した場合、辞書表現の座標・標高は
+    その桁数で整形します（各サービスの正規化で指定）。
+    """
+
+    __slots__ = ('lat', 'lon', 'ele', 'time', 'sensors', 'precision')
+
+    def __init__(self, lat: Sequence[float], lon: Sequence[float],
+                 ele: Optional[Sequence[float]] = None,
+                 time: Optional[Sequence[int]] = None,
+                 sensors: Optional[Dict[str, Sequence[float]]] = None,
+                 precision: Optional[Tuple[int, int]] = None):
+        """初期化
+
+        Args:
+            lat: 緯度の列
+            lon: 経度の列
+            ele: 標高の列（指定しない場合は全て欠損）
+            time: UNIX時間（秒）の列（指定しない場合は全て欠損）
+            sensors: センサー名と値の列の辞書
+            precision: 辞書表現で整形する座標・標高の小数点以下の桁数
+                （指定しない場合は元の値に戻せる最短の10進数）
+        """
+        self.precision = precision
+        self.lat = np.ascontiguousarray(lat, dtype=np.float64)
+        self.lon = np.ascontiguousarray(lon, dtype=np.float64)
+        size = len(self.lat)
+
+        if ele is None:
+            self.ele = np.full(size, np.nan, dtype=np.float64)
+        else:
+            self.ele = np.ascontiguousarray(ele, dtype=np.float64)
+
+        if time is None:
+            self.time = np.full(size, NO_TIME, dtype=np.int64)
+        else:
+            self.time = np.ascontiguousarray(time, dtype=np.int64)
+
+        self.sensors = {
+            name: np.ascontiguousarray(values, dtype=np.float32)
+            for name, values in (sensors or {}).items()
+        }
+
+        for name, column in [('lon', self.lon), ('ele', self.ele), ('time', self.time)] + \
+                list(self.sensors.items()):
+            if len(column) != size:
+                raise ValueError(f"列 '{name}' の長さ({len(column)})が緯度の列({size})と一致しません")
+
+    @classmethod
+    def empty(cls) -> 'TrackArray':
+        """空のTrackArrayを作成"""
+        return cls(np.empty(0), np.empty(0))
+
+    @classmethod
+    def from_points(cls, points: Sequence[Dict[str, Any]]) -> 'TrackArray':
+        """トラックポイント辞書のリストからTrackArrayを作成
+
+        Args:
+            points: トラックポイントの辞書のリスト
+
+        Returns:
+            TrackArray: 作成したTrackArray
+        """
+        if isinstance(points, TrackArray):
+            return points
+
+        builder = TrackArrayBuilder()
+        for point in points:
+            builder.append(point.get('lat'), point.get('lon'), point.get('ele'),
+                           point.get('time'), point.get('extensions'))
+        return builder.build()
+
+    @classmethod
+    def concatenate(cls, arrays: Sequence['TrackArray']) -> 'TrackArray':
+        """複数のTrackArrayを連結
+
+        Args:
+            arrays: 連結するTrackArrayのリスト
+
+        Returns:
+            TrackArray: 連結したTrackArray
+        """
+        arrays = [a for a in arrays if len(a)]
+        if not arrays:
+            return cls.empty()
+        if len(arrays) == 1:
+            return arrays[0]
+
+        # いずれかのトラックにあるセンサー列は、ない区間を欠損として連結
+        sensor_names = []
+        for a in arrays:
+            for name in a.sensors:
+                if name not in sensor_names:
+                    sensor_names.append(name)
+        sensors = {
+            name: np.concatenate([
+                a.sensors[name] if name in a.sensors else np.full(len(a), np.nan, dtype=np.float32)
+                for a in arrays
+            ])
+            for name in sensor_names
+        }
+
+        precisions = {a.precision for a in arrays}
+        return cls(np.concatenate([a.lat for a in arrays]),
+                   np.concatenate([a.lon for a in arrays]),
+                   np.concatenate([a.ele for a in arrays]),
+                   np.concatenate([a.time for a in arrays]),
+                   sensors,
+                   precisions.pop() if len(precisions) == 1 else None)
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def __repr__(self) -> str:
+        return f"TrackArray(points={len(self)}, sensors={list(self.sensors)})"
+
+    def __getitem__(self, index):
+        """整数インデックスではトラックポイント辞書を、スライスではTrackArrayを返す"""
+        if isinstance(index, slice):
+            return self._select(index)
+        return self.point(index)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """トラックポイント辞書を順に返す（互換用）"""
+        for start in range(0, len(self), _CHUNK_SIZE):
+            yield from self._select(slice(start, start + _CHUNK_SIZE)).to_points()
+
+    @property
+    def nbytes(self) -> int:
+        """列が使用しているバイト数"""
+        return (self.lat.nbytes + self.lon.nbytes + self.ele.nbytes + self.time.nbytes +
+                sum(column.nbytes for column in self.sensors.values()))
+
+    def has_time(self) -> np.ndarray:
+        """時間が記録されている点のマスク"""
+        return self.time != NO_TIME
+
+    def datetimes(self) -> np.ndarray:
+        """時間の列をdatetime64[s]として返す（欠損はNaT）"""
+        return self.time.view('datetime64[s]')
+
+    def take(self, indices: Sequence[int]) -> 'TrackArray':
+        """指定したインデックスの点を抽出
+
+        Args:
+            indices: 抽出する点のインデックス
+
+        Returns:
+            TrackArray: 抽出したTrackArray
+        """
+        indices = np.asarray(indices)
+        return TrackArray(self.lat[indices], self.lon[indices], self.ele[indices],
+                          self.time[indices],
+                          {name: column[indices] for name, column in self.sensors.items()},
+                          self.precision)
+
+    def _select(self, index: slice) -> 'TrackArray':
+        """スライスで点を抽出（各列はビューを共有）"""
+        return TrackArray(self.lat[index], self.lon[index], self.ele[index], self.time[index],
+                          {name: column[index] for name, column in self.sensors.items()},
+                          self.precision)
+
+    def time_strings(self) -> List[Optional[str]]:
+        """時間の列をGPX形式（UTCの「YYYY-MM-DDTHH:MM:SSZ」）の文字列のリストとして返す（欠損はNone）"""
+        strings = np.datetime_as_string(self.datetimes(), unit='s')
+        return [None if text == 'NaT' else text + 'Z' for text in strings.tolist()]
+
+    def point(self, index: int) -> Dict[str, Any]:
+        """1点分のトラックポイント辞書を作成
+
+        Args:
+            index: 点のインデックス
+
+        Returns:
+            Dict[str, Any]: トラックポイントの辞書
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('TrackArrayのインデックスが範囲外です')
+        return self._select(slice(index, index + 1)).to_points()[0]
+
+    def to_points(self) -> List[Dict[str, Any]]:
+        """従来のトラックポイント辞書のリストに変換
+
+        座標・標高はprecisionの桁数（指定しない場合は元の値に戻せる最短の10進数、
+        指数表記なし）で、センサー値は元の値に戻せる最短の10進数で、
+        時間はUTCの「YYYY-MM-DDTHH:MM:SSZ」形式で文字列化します
+        （元の文字列の末尾の0・小数秒・タイムゾーンのオフセットは保持しません）。
+
+        Returns:
+            List[Dict[str, Any]]: トラックポイントの辞書のリスト
+        """
+        if self.precision is None:
+            lats = _format_shortest(self.lat.tolist())
+            lons = _format_shortest(self.lon.tolist())
+            eles = _format_shortest(self.ele.tolist())
+        else:
+            coordinate_digits, elevation_digits = self.precision
+            lats = _format_fixed(self.lat.tolist(), coordinate_digits)
+            lons = _format_fixed(self.lon.tolist(), coordinate_digits)
+            eles = _format_fixed(self.ele.tolist(), elevation_digits)
+        times = self.time_strings()
+        epochs = self.time.tolist()
+        sensors = {
+            # float32の値はfloat32として最短の10進数で整形する
+            name: [None if value != value else np.format_float_positional(value, trim='-') for value in column]
+            for name, column in self.sensors.items()
+        }
+
+        points = []
+        for i in range(len(lats)):
+            point = {
+                'lat': lats[i],
+                'lon': lons[i],
+                'ele': eles[i],
+                'time': times[i],
+                'extensions': {}
+            }
+            for name, values in sensors.items():
+                if values[i] is not None:
+                    point['extensions'][name] = values[i]
+            if times[i] is not None:
+                point['datetime'] = datetime.fromtimestamp(epochs[i], tz=timezone.utc)
+            points.append(point)
+
+        return points
+
+    def with_precision(self, coordinate_digits: int, elevation_digits: int,
+                       in_place: bool = False) -> 'TrackArray':
+        """辞書表現で座標と標高を指定した桁数に整形するTrackArrayを作成
+
+        値は変更しないため、辞書表現は各値にf"{value:.{digits}f}"を適用した結果
+        （辞書形式のトラックポイントの正規化と同じ）になります。
+
+        Args:
+            coordinate_digits: 緯度・経度の小数点以下の桁数
+            elevation_digits: 標高の小数点以下の桁数
+            in_place: Trueの場合は自身の桁数を変更する
+
+        Returns:
+            TrackArray: 桁数を指定したTrackArray（列は自身と共有、in_place=Trueの場合は自身）
+        """
+        if in_place:
+            self.precision = (coordinate_digits, elevation_digits)
+            return self
+        return TrackArray(self.lat, self.lon, self.ele, self.time, self.sensors,
+                          (coordinate_digits, elevation_digits))
+
+    def round(self, coordinate_digits: int, elevation_digits: int,
+              in_place: bool = False) -> 'TrackArray':
+        """座標と標高を指定した桁数に丸めたTrackArrayを作成
+
+        Args:
+            coordinate_digits: 緯度・経度の小数点以下の桁数
+            elevation_digits: 標高の小数点以下の桁数
+            in_place: Trueの場合は新しい配列を作らずに各列を書き換える
+                （この配列のビューにも反映される。書き換えできない列がある場合は作成する）
+
+        Returns:
+            TrackArray: 丸めたTrackArray（in_place=Trueで書き換えた場合は自身）
+        """
+        columns = (self.lat, self.lon, self.ele)
+        if in_place and all(column.flags.writeable for column in columns):
+            np.round(self.lat, coordinate_digits, out=self.lat)
+            np.round(self.lon, coordinate_digits, out=self.lon)
+            np.round(self.ele, elevation_digits, out=self.ele)
+            return self
+        return TrackArray(np.round(self.lat, coordinate_digits),
+                          np.round(self.lon, coordinate_digits),
+                          np.round(self.ele, elevation_digits),
+                          self.time,
+                          self.sensors,
+                          self.precision)
+
+
+class TrackArrayBuilder:
+    """トラックポイントを1点ずつ追加してTrackArrayを構築するクラス
+
+    追加中は標準ライブラリのarrayに値を蓄積し、build()でコピーせずに
+    NumPy配列へ変換します。
+    """
+
+    def __init__(self):
+        """初期化"""
+        self._lat = array('d')
+        self._lon = array('d')
+        self._ele = array('d')
+        self._times = []
+        self._sensors = {}
+
+    def __len__(self) -> int:
+        return len(self._lat)
+
+    def append(self, lat: Optional[str], lon: Optional[str], ele: Optional[str] = None,
+               time: Optional[str] = None, extensions: Optional[Dict[str, str]] = None) -> None:
+        """トラックポイントを追加
+
+        Args:
+            lat: 緯度の文字列
+            lon: 経度の文字列
+            ele: 標高の文字列
+            time: 時間の文字列
+            extensions: 拡張データの辞書（SENSOR_FIELDSのみ保持）
+        """
+        index = len(self._lat)
+        self._lat.append(_to_float(lat))
+        self._lon.append(_to_float(lon))
+        self._ele.append(_to_float(ele))
+        self._times.append(time)
+
+        if extensions:
+            for name in SENSOR_FIELDS:
+                value = extensions.get(name)
+                if value is None:
+                    continue
+                column = self._sensors.get(name)
+                if column is None:
+                    # 途中から現れたセンサー列は、それまでの点を欠損で埋める
+                    column = self._sensors[name] = array('f', [np.nan]) * index
+                column.append(_to_float(value))
+
+        # 今回値のなかったセンサー列を欠損で埋める
+        for column in self._sensors.values():
+            if len(column) <= index:
+                column.append(np.nan)
+
+    @property
+    def first_time(self) -> Optional[str]:
+        """最初に記録された時間の文字列"""
+        for text in self._times:
+            if text:
+                return text
+        return None
+
+    def build(self) -> TrackArray:
+        """TrackArrayを作成
+
+        Returns:
+            TrackArray: 作成したTrackArray
+        """
+        return TrackArray(np.frombuffer(self._lat, dtype=np.float64),
+                          np.frombuffer(self._lon, dtype=np.float64),
+                          np.frombuffer(self._ele, dtype=np.float64),
+                          decode_timestamps(self._times),
+                          {name: np.frombuffer(column, dtype=np.float32)
+                           for name, column in self._sensors.items()})
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+GPXストリーミング出力モジュール
+
+このモジュールは、要素の木を作らずにXMLを出力ストリームへ逐次書き込むGPXWriterを
+提供します。出力はxml.dom.minidomのtoprettyxml(indent="  ")と同じ形式
+（テキストのみを持つ要素は1行、子要素を持つ要素は子要素を1段ずつ字下げ、
+空の要素は<tag/>）で、一定量（WRITE_BUFFER_SIZE）ごとにストリームへ書き込むため、
+メモリ使用量はトラックポイント数によらず一定です。
+"""
+
+import logging
+from typing import BinaryIO, Dict, List, Optional
+
+# ロギング設定
+logger = logging.getLogger(__name__)
+
+# XML宣言
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>'
+
+# デフォルトの字下げ
+DEFAULT_INDENT = '  '
+
+# 出力ストリームへまとめて書き込むまでに溜める文字数
+WRITE_BUFFER_SIZE = 64 * 1024
+
+
+def escape(text: str) -> str:
+    """テキスト・属性値をエスケープ（minidomと同じく&, <, ", >を置換）"""
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '"' in text:
+        text = text.replace('"', '&quot;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    return text
+
+
+def _format_attributes(attributes: Optional[Dict[str, str]]) -> str:
+    """属性を「 name="value"」の形式に整形"""
+    if not attributes:
+        return ''
+    return ''.join(f' {name}="{escape(value)}"' for name, value in attributes.items())
+
+
+class GPXWriter:
+    """GPX（XML）を出力ストリームへ逐次書き込むクラス
+
+    要素名は接頭辞付きの名前（'trkpt'、'gpxtpx:hr'等）で指定します。
+    start()で開始した要素は、子要素もテキストも書き込まずにend()した場合は
+    空要素（<tag/>）として出力します。
+    """
+
+    def __init__(self, stream: BinaryIO, indent: Optional[str] = DEFAULT_INDENT):
+        """初期化
+
+        Args:
+            stream: 書き込み先のバイナリモードのファイルオブジェクト
+            indent: 1段あたりの字下げ（Noneの場合は改行・字下げなしで出力）
+        """
+        self._stream = stream
+        self._indent = indent or ''
+        self._newline = '\n' if indent is not None else ''
+        self._stack: List[str] = []
+        self._pending = False
+        self._buffer: List[str] = []
+        self._buffered = 0
+        self._point_templates: Dict[int, tuple] = {}
+
+    def _write(self, text: str) -> None:
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= WRITE_BUFFER_SIZE:
+            self.flush()
+
+    def _close_pending(self) -> None:
+        """開始タグを閉じる（子要素を書き込む前に呼ぶ）"""
+        if self._pending:
+            self._write('>' + self._newline)
+            self._pending = False
+
+    def _prefix(self) -> str:
+        return self._indent * len(self._stack)
+
+    def declaration(self) -> None:
+        """XML宣言を書き込む"""
+        self._write(XML_DECLARATION + '\n')
+
+    def start(self, tag: str, attributes: Optional[Dict[str, str]] = None) -> None:
+        """要素を開始
+
+        Args:
+            tag: 要素名
+            attributes: 属性の辞書（書き込む順）
+        """
+        self._close_pending()
+        self._write(f'{self._prefix()}<{tag}{_format_attributes(attributes)}')
+        self._stack.append(tag)
+        self._pending = True
+
+    def end(self) -> None:
+        """最後に開始した要素を終了"""
+        tag = self._stack.pop()
+        if self._pending:
+            self._write('/>' + self._newline)
+            self._pending = False
+        else:
+            self._write(f'{self._prefix()}</{tag}>{self._newline}')
+
+    def element(self, tag: str, text: Optional[str] = None,
+                attributes: Optional[Dict[str, str]] = None) -> None:
+        """テキストのみを持つ要素（テキストが空の場合は空要素）を書き込む
+
+        Args:
+            tag: 要素名
+            text: テキスト
+            attributes: 属性の辞書（書き込む順）
+        """
+        self._close_pending()
+        if text:
+            self._write(f'{self._prefix()}<{tag}{_format_attributes(attributes)}>'
+                        f'{escape(text)}</{tag}>{self._newline}')
+        else:
+            self._write(f'{self._prefix()}<{tag}{_format_attributes(attributes)}/>{self._newline}')
+
+    def trackpoint(self, lat: str, lon: str, ele: Optional[str] = None,
+                   time: Optional[str] = None) -> None:
+        """拡張データのないトラックポイントを書き込む
+
+        start('trkpt', ...)・element('ele', ...)・element('time', ...)・end()と
+        同じ出力を、字下げの深さごとに作成した書式で1回の書き込みにまとめます。
+
+        Args:
+            lat: 緯度
+            lon: 経度
+            ele: 標高（空の場合は出力しない）
+            time: 時間（空の場合は出力しない）
+        """
+        self._close_pending()
+        depth = len(self._stack)
+        templates = self._point_templates.get(depth)
+        if templates is None:
+            outer = self._indent * depth
+            inner = outer + self._indent
+            nl = self._newline
+            templates = (
+                f'{outer}<trkpt lat="{{}}" lon="{{}}">{nl}',
+                f'{inner}<ele>{{}}</ele>{nl}',
+                f'{inner}<time>{{}}</time>{nl}',
+                f'{outer}</trkpt>{nl}',
+                f'{outer}<trkpt lat="{{}}" lon="{{}}"/>{nl}'
+            )
+            self._point_templates[depth] = templates
+
+        if not ele and not time:
+            self._write(templates[4].format(escape(lat), escape(lon)))
+            return
+
+        parts = [templates[0].format(escape(lat), escape(lon))]
+        if ele:
+            parts.append(templates[1].format(escape(ele)))
+        if time:
+            parts.append(templates[2].format(escape(time)))
+        parts.append(templates[3])
+        self._write(''.join(parts))
+
+    def flush(self) -> None:
+        """溜めている出力をストリームへ書き込む"""
+        if self._buffer:
+            self._stream.write(''.join(self._buffer).encode('utf-8'))
+            self._buffer = []
+            self._buffered = 0
+
+    def close(self) -> None:
+        """開いている要素を全て終了し、出力をストリームへ書き込む（ストリームは閉じない）"""
+        while self._stack:
+            self.end()
+        self.flush()
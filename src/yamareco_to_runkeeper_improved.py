@@ -14,14 +14,39 @@
 - メタデータセクションの追加
 - XMLフォーマットの構造化オプション
 - 拡張されたコマンドラインオプション
+- 入力を1回だけ走査するストリーミング変換（--streaming）
+- トラックポイントの間引き（--simplify）
+- 一定の時間間隔への再サンプリング（--resample）
 """
 
 import argparse
 import xml.etree.ElementTree as ET
 import os
 import re
+import sys
 import datetime
-from decimal import Decimal, ROUND_HALF_UP
+from functools import partial
+
+if __package__:
+    from .universal_gpx_converter.batch import (batch_output_path, duplicate_outputs, expand_inputs,
+                                                format_duplicates, format_summary, is_batch_input,
+                                                run_batch)
+    from .universal_gpx_converter.resample import format_resample, resample_tracks
+    from .universal_gpx_converter.rounding import round_half_up, round_half_up_column
+    from .universal_gpx_converter.simplify import format_reduction, simplify_mask
+    from .universal_gpx_converter.sources import (is_buffer, is_path, open_input, open_output,
+                                                  source_name, write_text)
+else:
+    # スクリプトとして実行された場合はsrcディレクトリからインポート
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from universal_gpx_converter.batch import (batch_output_path, duplicate_outputs, expand_inputs,
+                                               format_duplicates, format_summary, is_batch_input,
+                                               run_batch)
+    from universal_gpx_converter.resample import format_resample, resample_tracks
+    from universal_gpx_converter.rounding import round_half_up, round_half_up_column
+    from universal_gpx_converter.simplify import format_reduction, simplify_mask
+    from universal_gpx_converter.sources import (is_buffer, is_path, open_input, open_output,
+                                                 source_name, write_text)
 
 # 名前空間の定義
 NAMESPACES = {
@@ -30,6 +55,31 @@ NAMESPACES = {
     'gpxtpx': 'http://www.garmin.com/xmlschemas/TrackPointExtension/v1'
 }
 
+# 修飾名（{名前空間}要素名）は要素ごとに組み立てず、事前に作成しておく
+GPX_TAGS = {
+    name: '{' + NAMESPACES['gpx'] + '}' + name
+    for name in ('trk', 'trkseg', 'trkpt', 'ele', 'time')
+}
+
+# 時間文字列の日付部分（YYYY-MM-DD）
+DATE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})')
+
+# XML宣言
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+
+# 出力のルート要素の属性（ET.tostringが出力する名前空間宣言を含む）
+GPX_ROOT_ATTRIBUTES = (
+    f' xmlns="{NAMESPACES["gpx"]}" xmlns:xsi="{NAMESPACES["xsi"]}" version="1.1"'
+    ' creator="TrailSync - Runkeeper Converter"'
+    ' xsi:schemaLocation="http://www.topografix.com/GPX/1/1 http://www.topografix.com/GPX/1/1/gpx.xsd"'
+)
+
+# ストリーミング変換で座標をまとめて丸め、出力先へ書き込むトラックポイント数
+STREAM_BATCH_SIZE = 4096
+
+# 変換中に進捗を報告するトラックポイントの間隔（最後のトラックポイントは常に報告）
+PROGRESS_INTERVAL = 1024
+
 # アクティビティタイプの定義
 ACTIVITY_TYPES = ['hiking', 'running', 'cycling', 'walking', 'swimming', 'other']
 
@@ -41,9 +91,12 @@ def register_namespaces():
     ET.register_namespace('', NAMESPACES['gpx'])
 
 def parse_gpx(file_path):
-    """GPXファイルを解析してElementTreeオブジェクトを返す"""
+    """GPXファイル（パス・バイト列・ファイルオブジェクト）を解析してElementTreeオブジェクトを返す（解析済みの場合はそのまま返す）"""
+    if isinstance(file_path, ET.ElementTree):
+        return file_path
     try:
-        tree = ET.parse(file_path)
+        with open_input(file_path) as f:
+            tree = ET.parse(f)
         return tree
     except Exception as e:
         print(f"GPXファイルの解析中にエラーが発生しました: {e}")
@@ -52,16 +105,27 @@ def parse_gpx(file_path):
 def format_coordinate(coord_str, precision=6):
     """座標値を指定された精度に調整する"""
     try:
-        # 文字列を10進数に変換
-        decimal_value = Decimal(coord_str)
-        # 指定された精度に丸める
-        formatted_value = decimal_value.quantize(Decimal('0.' + '0' * precision), rounding=ROUND_HALF_UP)
-        # 文字列に戻す
-        return f"{formatted_value:.{precision}f}"
+        # 10進数として四捨五入し、文字列に戻す
+        return round_half_up(coord_str, precision)
     except Exception as e:
         print(f"座標値の変換中にエラーが発生しました: {e}")
         return coord_str
 
+def format_coordinates(trackpoints, precision=6):
+    """トラックポイントの緯度・経度の列をまとめて指定された精度に調整する"""
+    lats = [trkpt.get('lat') for trkpt in trackpoints]
+    lons = [trkpt.get('lon') for trkpt in trackpoints]
+    try:
+        return round_half_up_column(lats, precision), round_half_up_column(lons, precision)
+    except Exception:
+        # 変換できない値がある場合は1点ずつ調整する
+        lats = []
+        lons = []
+        for trkpt in trackpoints:
+            lats.append(format_coordinate(trkpt.get('lat'), precision))
+            lons.append(format_coordinate(trkpt.get('lon'), precision))
+        return lats, lons
+
 def adjust_elevation(ele_str, adjustment=5.2):
     """標高値を小数点付きの値に変換する"""
     try:
@@ -74,22 +138,101 @@ def adjust_elevation(ele_str, adjustment=5.2):
         print(f"標高値の変換中にエラーが発生しました: {e}")
         return ele_str
 
+def iter_trackpoints(root):
+    """トラックポイント要素を文書順に返す（trk/trkseg/trkptの直下の子要素のみを走査）"""
+    for trk in root.iterfind(GPX_TAGS['trk']):
+        for trkseg in trk.iterfind(GPX_TAGS['trkseg']):
+            yield from trkseg.iterfind(GPX_TAGS['trkpt'])
+
+def find_ele_and_time(trkpt):
+    """トラックポイントの標高要素と時間要素を子要素の1回の走査で取得する"""
+    ele_elem = None
+    time_elem = None
+    for child in trkpt:
+        if child.tag == GPX_TAGS['ele']:
+            ele_elem = child
+        elif child.tag == GPX_TAGS['time']:
+            time_elem = child
+    return ele_elem, time_elem
+
+def resample_trackpoints(root, interval):
+    """トラックごとに一定の時間間隔に再サンプリングしたトラックポイント要素のリストを返す（トラックの境界をまたいで補間しない）"""
+    tracks = []
+    for trk in root.iterfind(GPX_TAGS['trk']):
+        points = []
+        for trkseg in trk.iterfind(GPX_TAGS['trkseg']):
+            for trkpt in trkseg.iterfind(GPX_TAGS['trkpt']):
+                ele, time_elem = find_ele_and_time(trkpt)
+                points.append({
+                    'lat': trkpt.get('lat'),
+                    'lon': trkpt.get('lon'),
+                    'ele': ele.text if ele is not None else None,
+                    'time': time_elem.text if time_elem is not None else None
+                })
+        tracks.append(points)
+    
+    resampled = []
+    for point in resample_tracks(tracks, interval):
+        trkpt = ET.Element(GPX_TAGS['trkpt'], {'lat': point['lat'], 'lon': point['lon']})
+        if point['ele'] is not None:
+            ET.SubElement(trkpt, GPX_TAGS['ele']).text = point['ele']
+        ET.SubElement(trkpt, GPX_TAGS['time']).text = point['time']
+        resampled.append(trkpt)
+    return resampled
+
 def extract_activity_dates(tree):
     """GPXファイルから活動日を抽出する"""
     dates = set()
     root = tree.getroot()
+    time_tag = GPX_TAGS['time']
     
     # 名前空間を考慮してトラックポイントを検索
-    for trkpt in root.findall('.//gpx:trkpt', NAMESPACES):
-        time_elem = trkpt.find('./gpx:time', NAMESPACES)
+    for trkpt in iter_trackpoints(root):
+        time_elem = trkpt.find(time_tag)
         if time_elem is not None and time_elem.text:
             # 日付部分（YYYY-MM-DD）を抽出
-            date_match = re.match(r'(\d{4}-\d{2}-\d{2})', time_elem.text)
+            date_match = DATE_PATTERN.match(time_elem.text)
             if date_match:
                 dates.add(date_match.group(1))
     
     return sorted(list(dates))
 
+def extract_activity_date(trkpt):
+    """トラックポイントの時間から活動日（YYYY-MM-DD）を取得する（ない場合はNone）"""
+    time_elem = trkpt.find(GPX_TAGS['time'])
+    if time_elem is not None and time_elem.text:
+        date_match = DATE_PATTERN.match(time_elem.text)
+        if date_match:
+            return date_match.group(1)
+    return None
+
+def iterparse_trackpoints(file_path, errors):
+    """iter_trackpointsと同じトラックポイント要素を、ファイルを読み込みながら文書順に返す
+    
+    返したトラックポイントとルート直下の読み終えた要素は木から取り除くため、
+    メモリ使用量はファイルの大きさによらず一定です。解析中にエラーが発生した場合は
+    errorsにエラーを追加して終了します。
+    """
+    trkpt_path = (GPX_TAGS['trk'], GPX_TAGS['trkseg'], GPX_TAGS['trkpt'])
+    path = []
+    tags = []
+    try:
+        with open_input(file_path) as f:
+            for event, elem in ET.iterparse(f, events=('start', 'end')):
+                if event == 'start':
+                    path.append(elem)
+                    tags.append(elem.tag)
+                    continue
+                path.pop()
+                tags.pop()
+                if len(path) == 3 and elem.tag == trkpt_path[2] and tuple(tags[1:]) == trkpt_path[:2]:
+                    yield elem
+                    path[2].remove(elem)
+                elif len(path) == 1:
+                    path[0].remove(elem)
+    except Exception as e:
+        errors.append(e)
+
 def format_xml(element, level=0):
     """XMLを整形する（インデントを追加）"""
     i = "\n" + level * " "
@@ -106,15 +249,225 @@ def format_xml(element, level=0):
         if level and (not element.tail or not element.tail.strip()):
             element.tail = i
 
+def fix_cdata(text):
+    """CDATAの置換（convert_file_in_memoryが出力全体に行う置換）を1つの値に適用する"""
+    if '&lt;!--![CDATA[' in text or ']]--&gt;' in text:
+        text = text.replace('&lt;!--![CDATA[', '<![CDATA[')
+        text = text.replace(']]--&gt;', ']]>')
+    return text
+
+def escape_text(text):
+    """テキストをET.tostringと同じ規則でエスケープする"""
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    return fix_cdata(text)
+
+def escape_attribute(text):
+    """属性値をET.tostringと同じ規則でエスケープする"""
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    if '"' in text:
+        text = text.replace('"', '&quot;')
+    if '\r' in text:
+        text = text.replace('\r', '&#13;')
+    if '\n' in text:
+        text = text.replace('\n', '&#10;')
+    if '\t' in text:
+        text = text.replace('\t', '&#09;')
+    return fix_cdata(text)
+
+def xml_indent(options, level):
+    """format_xmlが要素の後に付ける改行と字下げ（整形しない場合は空文字列）"""
+    return "\n" + level * " " if options.format_xml else ""
+
+def xml_element(tag, text, tail):
+    """子要素のない要素をET.tostringと同じ形式の文字列にする（テキストが空の場合は<tag />）"""
+    if text:
+        return f"<{tag}>{escape_text(text)}</{tag}>{tail}"
+    return f"<{tag} />{tail}"
+
+def default_track_name(activity_type, first_activity_date, first_time):
+    """活動日と最初の時刻からトラック名（例: Hiking 01/05/23 8:30 am）を作成する"""
+    # 日付をYYYY-MM-DDからDD/MM/YY形式に変換
+    date_parts = first_activity_date.split('-')
+    formatted_date = f"{date_parts[2]}/{date_parts[1]}/{date_parts[0][2:]}"
+    
+    # 時刻を取得
+    time_match = re.search(r'T(\d{2}):(\d{2}):\d{2}Z', first_time)
+    time_str = ""
+    if time_match:
+        hour = int(time_match.group(1))
+        minute = time_match.group(2)
+        am_pm = "am" if hour < 12 else "pm"
+        hour = hour % 12
+        if hour == 0:
+            hour = 12
+        time_str = f"{hour}:{minute} {am_pm}"
+    
+    return f"{activity_type.capitalize()} {formatted_date} {time_str}"
+
+def format_header(first_time, track_name, options):
+    """ルート要素からtrksegの開始タグまでをconvert_file_in_memoryと同じ形式の文字列にする"""
+    indent = [xml_indent(options, level) for level in range(0, 10, 2)]
+    parts = [f"<gpx{GPX_ROOT_ATTRIBUTES}>{indent[1]}"]
+    
+    if options.add_metadata:
+        parts.append(f"<metadata>{indent[2]}")
+        parts.append(xml_element('time', first_time, indent[2]))
+        if options.track_name:
+            parts.append(xml_element('name', options.track_name, indent[2]))
+        if options.keep_source:
+            parts.append(f"<extensions>{indent[3]}<source_info>{indent[4]}")
+            parts.append(xml_element('original_service', "Yamareco", indent[4]))
+            parts.append(xml_element('conversion_date', datetime.datetime.now().isoformat(), indent[4]))
+            parts.append(f"</source_info>{indent[3]}</extensions>{indent[2]}")
+        parts.append(f"</metadata>{indent[1]}")
+    
+    parts.append(f"<trk>{indent[2]}")
+    if options.activity_type:
+        parts.append(xml_element('type', options.activity_type, indent[2]))
+    parts.append(f"<name>{indent[3]}<!--{fix_cdata(f'![CDATA[{track_name}]]')}-->{indent[3]}</name>{indent[2]}")
+    parts.append(xml_element('time', first_time, indent[2]))
+    parts.append(f"<trkseg>{indent[3]}")
+    return ''.join(parts)
+
+def format_footer(options):
+    """trksegの終了タグ以降をconvert_file_in_memoryと同じ形式の文字列にする"""
+    return (f"</trkseg>{xml_indent(options, 4)}</trk>{xml_indent(options, 2)}"
+            f"</gpx>{xml_indent(options, 0)}")
+
+def format_trackpoints(trackpoints, options):
+    """トラックポイントを変換し、convert_file_in_memoryと同じ形式の文字列にする"""
+    lats, lons = format_coordinates(trackpoints, options.coordinate_precision)
+    tail = xml_indent(options, 6)
+    child_tail = xml_indent(options, 8)
+    parts = []
+    
+    for trkpt, lat, lon in zip(trackpoints, lats, lons):
+        start = f'<trkpt lat="{escape_attribute(lat)}" lon="{escape_attribute(lon)}"'
+        ele, time_elem = find_ele_and_time(trkpt)
+        if ele is None and time_elem is None:
+            parts.append(f'{start} />{tail}')
+            continue
+        
+        parts.append(f'{start}>{child_tail}')
+        if ele is not None:
+            parts.append(xml_element('ele', adjust_elevation(ele.text, options.elevation_adjustment), child_tail))
+        if time_elem is not None:
+            parts.append(xml_element('time', time_elem.text, child_tail))
+        parts.append(f'</trkpt>{tail}')
+    
+    return ''.join(parts)
+
+def is_rewindable(source):
+    """先頭から読み直せる（書き直せる）入出力かどうか"""
+    return is_path(source) or is_buffer(source) or (hasattr(source, 'seekable') and source.seekable())
+
 def convert_yamareco_to_runkeeper(input_file, output_file, options):
     """ヤマレコのGPXファイルをランキーパー形式に変換する"""
+    return convert_file(input_file, output_file, options) is not None
+
+def convert_file(input_file, output_file, options):
+    """ヤマレコのGPXファイルをランキーパー形式に変換し、トラックポイント数を返す（失敗時はNone）"""
+    if getattr(options, 'streaming', False) and is_rewindable(input_file) and is_rewindable(output_file):
+        # 簡略化・再サンプリングはトラック全体から点を決めるため、ファイル全体を読み込んで変換する
+        if not getattr(options, 'simplify', None) and not getattr(options, 'resample', None):
+            return convert_file_streaming(input_file, output_file, options)
+    return convert_file_in_memory(input_file, output_file, options)
+
+def convert_file_streaming(input_file, output_file, options):
+    """入力を1回だけ走査しながら変換結果を逐次書き込む（出力はconvert_file_in_memoryと同じ）
+    
+    トラックポイントをiterparseで読み込みながら出力し、活動日も同時に収集します。
+    ヘッダー（メタデータ・トラック名）は日付を持つ最初のトラックポイントまでを先読みして作成し、
+    後のトラックポイントにトラック名に使った日付より前の活動日があった場合（時刻順でないファイル）は、
+    出力を破棄してconvert_file_in_memoryで変換し直します。
+    """
+    errors = []
+    trackpoints = iterparse_trackpoints(input_file, errors)
+    input_position = None if is_path(input_file) or is_buffer(input_file) else input_file.tell()
+    
+    # 日付を持つ最初のトラックポイントまで先読み
+    lookahead = []
+    first_activity_date = None
+    for trkpt in trackpoints:
+        lookahead.append(trkpt)
+        first_activity_date = extract_activity_date(trkpt)
+        if first_activity_date:
+            break
+    
+    if errors:
+        print(f"GPXファイルの解析中にエラーが発生しました: {errors[0]}")
+        return None
+    if not first_activity_date:
+        print("GPXファイルから活動日を抽出できませんでした。")
+        return None
+    
+    # 最初のトラックポイントから時刻を取得
+    first_time = lookahead[0].find(GPX_TAGS['time']).text
+    track_name = options.track_name or default_track_name(options.activity_type, first_activity_date, first_time)
+    
+    count = 0
+    earliest_date = first_activity_date
+    try:
+        with open_output(output_file) as f:
+            output_position = None if is_path(output_file) else f.tell()
+            f.write((XML_DECLARATION + format_header(first_time, track_name, options)).encode('utf-8'))
+            batch = lookahead
+            for trkpt in trackpoints:
+                activity_date = extract_activity_date(trkpt)
+                if activity_date and activity_date < earliest_date:
+                    earliest_date = activity_date
+                batch.append(trkpt)
+                if len(batch) >= STREAM_BATCH_SIZE:
+                    f.write(format_trackpoints(batch, options).encode('utf-8'))
+                    count += len(batch)
+                    batch = []
+            
+            if errors or (earliest_date != first_activity_date and not options.track_name):
+                # 書き込んだ出力を破棄
+                if output_position is not None:
+                    f.seek(output_position)
+                    f.truncate()
+            else:
+                f.write((format_trackpoints(batch, options) + format_footer(options)).encode('utf-8'))
+                count += len(batch)
+    except Exception as e:
+        print(f"ファイルの保存中にエラーが発生しました: {e}")
+        return None
+    
+    if errors:
+        if is_path(output_file):
+            os.remove(output_file)
+        print(f"GPXファイルの解析中にエラーが発生しました: {errors[0]}")
+        return None
+    
+    if earliest_date != first_activity_date and not options.track_name:
+        # トラック名の日付が変わるため、ファイル全体を読み込んで変換し直す
+        if input_position is not None:
+            input_file.seek(input_position)
+        return convert_file_in_memory(input_file, output_file, options)
+    
+    print(f"変換が完了しました。出力ファイル: {source_name(output_file)}")
+    return count
+
+def convert_file_in_memory(input_file, output_file, options):
+    """ファイル全体を読み込んで変換し、トラックポイント数を返す（失敗時はNone）"""
     # 名前空間を登録
     register_namespaces()
     
     # GPXファイルを解析
     tree = parse_gpx(input_file)
     if tree is None:
-        return False
+        return None
     
     root = tree.getroot()
     
@@ -122,7 +475,7 @@ def convert_yamareco_to_runkeeper(input_file, output_file, options):
     activity_dates = extract_activity_dates(tree)
     if not activity_dates:
         print("GPXファイルから活動日を抽出できませんでした。")
-        return False
+        return None
     
     # 最初の活動日を取得
     first_activity_date = activity_dates[0]
@@ -135,8 +488,8 @@ def convert_yamareco_to_runkeeper(input_file, output_file, options):
                  'http://www.topografix.com/GPX/1/1 http://www.topografix.com/GPX/1/1/gpx.xsd')
     
     # 最初のトラックポイントから時刻を取得
-    first_trkpt = root.find('.//gpx:trkpt', NAMESPACES)
-    first_time = first_trkpt.find('./gpx:time', NAMESPACES).text if first_trkpt is not None else ""
+    first_trkpt = next(iter_trackpoints(root), None)
+    first_time = first_trkpt.find(GPX_TAGS['time']).text if first_trkpt is not None else ""
     
     # メタデータセクションを追加（Stravaスタイル）
     if options.add_metadata:
@@ -172,23 +525,7 @@ def convert_yamareco_to_runkeeper(input_file, output_file, options):
     if options.track_name:
         track_name = options.track_name
     else:
-        # 日付をYYYY-MM-DDからDD/MM/YY形式に変換
-        date_parts = first_activity_date.split('-')
-        formatted_date = f"{date_parts[2]}/{date_parts[1]}/{date_parts[0][2:]}"
-        
-        # 時刻を取得
-        time_match = re.search(r'T(\d{2}):(\d{2}):\d{2}Z', first_time)
-        time_str = ""
-        if time_match:
-            hour = int(time_match.group(1))
-            minute = time_match.group(2)
-            am_pm = "am" if hour < 12 else "pm"
-            hour = hour % 12
-            if hour == 0:
-                hour = 12
-            time_str = f"{hour}:{minute} {am_pm}"
-        
-        track_name = f"{options.activity_type.capitalize()} {formatted_date} {time_str}"
+        track_name = default_track_name(options.activity_type, first_activity_date, first_time)
     
     # CDATA形式で名前を設定
     name.text = None
@@ -202,29 +539,55 @@ def convert_yamareco_to_runkeeper(input_file, output_file, options):
     # トラックセグメントを作成
     trkseg = ET.SubElement(trk, '{' + NAMESPACES['gpx'] + '}trkseg')
     
+    # 座標は列ごとにまとめて調整
+    trackpoints = list(iter_trackpoints(root))
+    
+    # 一定の時間間隔への再サンプリング（夜間等の中断をまたいで補間しない）
+    if getattr(options, 'resample', None) and trackpoints:
+        original = len(trackpoints)
+        trackpoints = resample_trackpoints(root, options.resample)
+        print(format_resample(original, len(trackpoints), options.resample))
+    
+    # トラックの簡略化（残したトラックポイントの時間はそのまま）
+    if getattr(options, 'simplify', None) and trackpoints:
+        keep = simplify_mask([trkpt.get('lat') for trkpt in trackpoints],
+                             [trkpt.get('lon') for trkpt in trackpoints], options.simplify)
+        original = len(trackpoints)
+        trackpoints = [trkpt for trkpt, kept in zip(trackpoints, keep.tolist()) if kept]
+        print(format_reduction(original, len(trackpoints)))
+    
+    lats, lons = format_coordinates(trackpoints, options.coordinate_precision)
+    
+    # 進捗の報告先（処理したトラックポイント数と全体の数を受け取る）
+    progress = getattr(options, 'progress', None)
+    
     # 元のトラックポイントを処理
-    for trkpt in root.findall('.//gpx:trkpt', NAMESPACES):
+    for index, (trkpt, lat, lon) in enumerate(zip(trackpoints, lats, lons)):
+        if progress is not None and index % PROGRESS_INTERVAL == 0:
+            progress(index, len(trackpoints))
+        
         # 新しいトラックポイントを作成
-        new_trkpt = ET.SubElement(trkseg, '{' + NAMESPACES['gpx'] + '}trkpt')
+        new_trkpt = ET.SubElement(trkseg, GPX_TAGS['trkpt'])
         
-        # 座標を調整して設定
-        lat = format_coordinate(trkpt.get('lat'), options.coordinate_precision)
-        lon = format_coordinate(trkpt.get('lon'), options.coordinate_precision)
+        # 座標を設定
         new_trkpt.set('lat', lat)
         new_trkpt.set('lon', lon)
         
+        ele, time_elem = find_ele_and_time(trkpt)
+        
         # 標高を調整
-        ele = trkpt.find('./gpx:ele', NAMESPACES)
         if ele is not None:
-            new_ele = ET.SubElement(new_trkpt, '{' + NAMESPACES['gpx'] + '}ele')
+            new_ele = ET.SubElement(new_trkpt, GPX_TAGS['ele'])
             new_ele.text = adjust_elevation(ele.text, options.elevation_adjustment)
         
         # 時間を設定
-        time_elem = trkpt.find('./gpx:time', NAMESPACES)
         if time_elem is not None:
-            new_time = ET.SubElement(new_trkpt, '{' + NAMESPACES['gpx'] + '}time')
+            new_time = ET.SubElement(new_trkpt, GPX_TAGS['time'])
             new_time.text = time_elem.text
     
+    if progress is not None:
+        progress(len(trackpoints), len(trackpoints))
+    
     # XMLを整形する
     if options.format_xml:
         format_xml(new_root)
@@ -233,7 +596,7 @@ def convert_yamareco_to_runkeeper(input_file, output_file, options):
     xml_str = ET.tostring(new_root, encoding='utf-8').decode('utf-8')
     
     # XML宣言を追加
-    xml_str = '<?xml version="1.0" encoding="UTF-8"?>\n' + xml_str
+    xml_str = XML_DECLARATION + xml_str
     
     # CDATAセクションを正しく修正（ElementTreeはCDATAを適切に処理できない）
     xml_str = xml_str.replace('&lt;!--![CDATA[', '<![CDATA[')
@@ -241,19 +604,21 @@ def convert_yamareco_to_runkeeper(input_file, output_file, options):
     
     # 出力ファイルに保存
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(xml_str)
-        print(f"変換が完了しました。出力ファイル: {output_file}")
-        return True
+        write_text(output_file, xml_str)
+        print(f"変換が完了しました。出力ファイル: {source_name(output_file)}")
+        return len(trkseg)
     except Exception as e:
         print(f"ファイルの保存中にエラーが発生しました: {e}")
-        return False
+        return None
 
 # app.pyで使用するための関数エイリアス
 def convert_gpx(input_file, output_file, **options):
     """
     app.pyで使用するための関数エイリアス
     convert_yamareco_to_runkeeperのラッパー関数
+    
+    progressに関数を指定すると、ファイル全体を読み込んで変換する場合に、PROGRESS_INTERVAL個の
+    トラックポイントごとと最後に処理済みの数と全体の数を渡して呼び出す（例外を送出すると変換を中断する）
     """
     # オプションをargparseの名前空間オブジェクトに変換
     class Options:
@@ -278,13 +643,53 @@ def convert_gpx(input_file, output_file, **options):
         args.keep_source = True
     if not hasattr(args, 'track_name'):
         args.track_name = None
+    if not hasattr(args, 'streaming'):
+        args.streaming = False
+    if not hasattr(args, 'simplify'):
+        args.simplify = None
+    if not hasattr(args, 'resample'):
+        args.resample = None
+    if not hasattr(args, 'progress'):
+        args.progress = None
     
     return convert_yamareco_to_runkeeper(input_file, output_file, args)
 
+def batch_convert(args):
+    """ファイル・ディレクトリ・グロブパターンで指定された複数のGPXファイルを一括変換する"""
+    suffix = '_runkeeper'
+    files = expand_inputs(args.input_file, exclude_dir=args.output_dir,
+                          exclude_suffix=None if args.output_dir else suffix)
+    if not files:
+        print("エラー: 変換するGPXファイルがありません。")
+        return 1
+    
+    if args.output:
+        print("警告: 一括変換では-o/--outputは使用しません（--output-dirを指定してください）。")
+    
+    jobs = [(input_file, batch_output_path(input_file, relative_path, args.output_dir, suffix))
+            for input_file, relative_path in files]
+    
+    duplicates = duplicate_outputs(jobs)
+    if duplicates:
+        lines = format_duplicates(duplicates)
+        print(f"エラー: {lines[0]}")
+        for line in lines[1:]:
+            print(line)
+        return 1
+    
+    print(f"{len(jobs)}個のGPXファイルを一括変換しています...")
+    summary = run_batch(jobs, partial(convert_file, options=args), args.workers)
+    
+    for line in format_summary(summary):
+        print(line)
+    
+    return 1 if summary['failures'] else 0
+
 def main():
     """メイン関数"""
     parser = argparse.ArgumentParser(description='ヤマレコのGPXファイルをランキーパー形式に変換します。')
-    parser.add_argument('input_file', help='入力ヤマレコGPXファイルのパス')
+    parser.add_argument('input_file', nargs='+',
+                        help='入力ヤマレコGPXファイルのパス（複数のファイル・ディレクトリ・グロブパターンを指定すると一括変換）')
     parser.add_argument('-o', '--output', help='出力ファイルのパス（指定しない場合は入力ファイル名に_runkeeper.gpxを追加）')
     parser.add_argument('--activity-type', choices=ACTIVITY_TYPES, default='hiking', 
                         help='アクティビティタイプ（デフォルト: hiking）')
@@ -302,9 +707,23 @@ def main():
                         help='元のサービス情報を保持する')
     parser.add_argument('--no-source', action='store_false', dest='keep_source', 
                         help='元のサービス情報を保持しない')
+    parser.add_argument('--streaming', action='store_true',
+                        help='入力を1回だけ走査しながら逐次変換する（大きなファイル向け、出力は通常の変換と同じ）')
+    parser.add_argument('--simplify', type=float, metavar='METERS',
+                        help='トラックを簡略化する許容誤差（メートル、指定した場合のみVisvalingam–Whyatt法で間引く、--streamingより優先）')
+    parser.add_argument('--resample', type=int, metavar='SECONDS',
+                        help='トラックポイントを一定の間隔（秒）に再サンプリングする（簡略化より先に行う、--streamingより優先）')
+    parser.add_argument('--output-dir', help='一括変換の出力ディレクトリ（入力のディレクトリ構成を再現、指定しない場合は入力ファイルと同じ場所）')
+    parser.add_argument('--workers', type=int, help='一括変換のワーカープロセス数（デフォルト: CPU数）')
     
     args = parser.parse_args()
     
+    # 一括変換
+    if args.output_dir or is_batch_input(args.input_file):
+        return batch_convert(args)
+    
+    args.input_file = args.input_file[0]
+    
     # 入力ファイルの存在確認
     if not os.path.exists(args.input_file):
         print(f"エラー: 入力ファイル '{args.input_file}' が見つかりません。")
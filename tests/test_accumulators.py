@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ストリーミング統計のテスト
+"""
+
+import sys
+import unittest
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.universal_gpx_converter.accumulators import (BoundingBox, PointCount, StatisticsCollector,
+                                                      collect_statistics)
+from src.universal_gpx_converter.parser import GPXParser
+from src.universal_gpx_converter.stats import compute_statistics
+
+
+class TestAccumulators(unittest.TestCase):
+    """ストリーミング統計のテストクラス"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.file_path = str(Path(__file__).parent / "test_data" / "yamareco.gpx")
+
+    def test_matches_compute_statistics(self):
+        """解析と同時の集計が解析後の集計と一致するかのテスト"""
+        expected = compute_statistics(GPXParser().parse_file(self.file_path)['all_points'])
+
+        # 小さなまとまりに分けても、まとまりをまたぐ区間を含めて一致する
+        collector = StatisticsCollector(batch_size=7)
+        GPXParser().parse_file(self.file_path, statistics=collector)
+        for stats in (collector.result(), collect_statistics(self.file_path)):
+            self.assertEqual(stats['points'], expected['points'])
+            for key in ('distance', 'elevation_gain', 'elevation_loss', 'max_speed', 'average_speed'):
+                self.assertAlmostEqual(stats[key], expected[key], places=6)
+            for key in ('start_time', 'end_time', 'elapsed_time', 'moving_time'):
+                self.assertEqual(stats[key], expected[key])
+            self.assertEqual([(day['date'], day['points'], day['moving_time']) for day in stats['days']],
+                             [(day['date'], day['points'], day['moving_time']) for day in expected['days']])
+
+    def test_custom_accumulators(self):
+        """集計項目を選んで集計できるかのテスト"""
+        collector = StatisticsCollector([PointCount(), BoundingBox()])
+        gpx_data = GPXParser().parse_file(self.file_path, streaming=True, statistics=collector)
+        # ストリーミングモードでは読み進めた分だけ集計される
+        self.assertEqual(collector.result()['points'], 1)
+        count = sum(1 for _ in gpx_data['all_points'])
+
+        stats = collector.result()
+        self.assertEqual(stats['points'], count)
+        self.assertLess(stats['bounds']['min_lat'], stats['bounds']['max_lat'])
+        self.assertEqual(stats['days'], [])
+
+    def test_parsed_tree(self):
+        """解析済みのElementTreeからXMLを解析し直さずに集計できるかのテスト"""
+        expected = StatisticsCollector()
+        GPXParser().parse_file(self.file_path, columnar=True, statistics=expected)
+
+        collector = StatisticsCollector()
+        tree = ET.parse(self.file_path)
+        gpx_data = GPXParser().parse_file(tree, columnar=True, statistics=collector)
+        self.assertEqual(len(gpx_data['all_points']), expected.result()['points'])
+        self.assertEqual(collector.result(), expected.result())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+変換結果の保存のテスト
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.trailsync.artifacts import ArtifactStore
+from src.yamareco_to_runkeeper_improved import convert_gpx
+
+
+class TestArtifacts(unittest.TestCase):
+    """変換結果の保存のテストクラス"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = Path(__file__).parent / "test_data" / "yamareco.gpx"
+
+    def tearDown(self):
+        """テスト後の後処理"""
+        self.temp_dir.cleanup()
+
+    def test_create_and_get(self):
+        """変換結果を直接保存してIDで参照できるかのテスト"""
+        store = ArtifactStore(self.temp_dir.name)
+        content = self.file_path.read_bytes()
+        with redirect_stdout(io.StringIO()):
+            artifact = store.create("山行_runkeeper.gpx", lambda output: convert_gpx(content, output))
+
+        self.assertEqual(store.get(artifact.id), artifact)
+        self.assertEqual(artifact.filename, "山行_runkeeper.gpx")
+        self.assertEqual(artifact.size, os.path.getsize(artifact.path))
+        self.assertTrue(Path(artifact.path).read_bytes().startswith(b'<?xml'))
+
+        # 不正なID・存在しないID
+        self.assertIsNone(store.get('../' + artifact.id))
+        self.assertIsNone(store.get('A' * 22))
+
+        # 変換に失敗した場合は保存しない
+        self.assertIsNone(store.create("failed.gpx", lambda output: False))
+        self.assertEqual(sorted(os.listdir(self.temp_dir.name)),
+                         sorted([artifact.id + '.gpx', artifact.id + '.json']))
+
+    def test_evict(self):
+        """保持する時間と合計サイズの上限のテスト"""
+        store = ArtifactStore(self.temp_dir.name)
+        artifacts = [store.create(f"{i}.gpx", lambda output: output.write(b'x' * 100)) for i in range(3)]
+        for i, artifact in enumerate(artifacts):
+            os.utime(artifact.path, (time.time() - 10 + i, time.time() - 10 + i))
+
+        store.max_bytes = 250
+        store.evict()
+        self.assertEqual([store.get(artifact.id) is not None for artifact in artifacts], [False, True, True])
+
+        store.max_age = 5
+        self.assertIsNone(store.get(artifacts[1].id))
+        store.evict()
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
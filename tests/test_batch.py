@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+一括変換のテスト
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from functools import partial
+from pathlib import Path
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.universal_gpx_converter.batch import (batch_output_path, duplicate_outputs, expand_inputs, is_batch_input,
+                                              run_batch)
+from src.universal_gpx_converter.main import convert_file
+
+
+class TestBatch(unittest.TestCase):
+    """一括変換のテストクラス"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.test_dir = Path(__file__).parent / "test_data"
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_dir = Path(self.temp_dir) / "input"
+        (self.input_dir / "2025" / "02").mkdir(parents=True)
+        shutil.copy(self.test_dir / "yamareco.gpx", self.input_dir / "yamareco.gpx")
+        shutil.copy(self.test_dir / "strava.gpx", self.input_dir / "2025" / "02" / "strava.gpx")
+        (self.input_dir / "2025" / "notes.txt").write_text("not gpx")
+        (self.input_dir / "2025" / "broken.gpx").write_text("not xml")
+
+    def tearDown(self):
+        """テスト後の後片付け"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_expand_inputs(self):
+        """ディレクトリ・グロブパターンの展開と出力先のテスト"""
+        input_dir = str(self.input_dir)
+        output_dir = os.path.join(input_dir, "converted")
+        expected = [
+            (os.path.join(input_dir, "2025", "02", "strava.gpx"), os.path.join("2025", "02", "strava.gpx")),
+            (os.path.join(input_dir, "2025", "broken.gpx"), os.path.join("2025", "broken.gpx")),
+            (os.path.join(input_dir, "yamareco.gpx"), "yamareco.gpx")
+        ]
+
+        self.assertEqual(expand_inputs([input_dir]), expected)
+        self.assertEqual(expand_inputs([os.path.join(input_dir, "**", "*.gpx"), input_dir]), expected)
+        self.assertEqual(expand_inputs([os.path.join(input_dir, "2025", "*", "*.gpx")]),
+                         [(expected[0][0], os.path.join("02", "strava.gpx"))])
+
+        # 出力ディレクトリと前回の出力ファイルは収集しない
+        os.makedirs(output_dir)
+        shutil.copy(expected[2][0], os.path.join(output_dir, "yamareco.gpx"))
+        shutil.copy(expected[2][0], os.path.join(input_dir, "yamareco_converted.gpx"))
+        self.assertEqual(expand_inputs([input_dir], exclude_dir=output_dir, exclude_suffix='_converted'), expected)
+
+        self.assertTrue(is_batch_input([input_dir]))
+        self.assertTrue(is_batch_input([os.path.join(input_dir, "*.gpx")]))
+        self.assertFalse(is_batch_input([expected[2][0]]))
+        self.assertEqual(batch_output_path(expected[0][0], expected[0][1], output_dir, '_converted'),
+                         os.path.join(output_dir, "2025", "02", "strava.gpx"))
+        self.assertEqual(batch_output_path(expected[2][0], expected[2][1], None, '_converted'),
+                         os.path.join(input_dir, "yamareco_converted.gpx"))
+
+    def test_run_batch(self):
+        """並列変換と集計のテスト"""
+        output_dir = os.path.join(self.temp_dir, "output")
+        jobs = [(input_file, batch_output_path(input_file, relative_path, output_dir, '_converted'))
+                for input_file, relative_path in expand_inputs([str(self.input_dir)])]
+
+        for workers in [1, 2]:
+            summary = run_batch(jobs, partial(convert_file, activity_type='hiking'), workers)
+
+            self.assertEqual(summary['files'], 3)
+            self.assertEqual(summary['converted'], 2)
+            self.assertEqual(summary['points'], 2509 * 2)
+            self.assertEqual([input_file for input_file, _ in summary['failures']], [jobs[1][0]])
+            self.assertTrue(os.path.exists(os.path.join(output_dir, "2025", "02", "strava.gpx")))
+            self.assertTrue(os.path.exists(os.path.join(output_dir, "yamareco.gpx")))
+
+        # 複数の入力ディレクトリの同じ相対パスのファイルは同じ出力ファイルになるため変換しない
+        other_dir = os.path.join(self.temp_dir, "other")
+        os.makedirs(other_dir)
+        shutil.copy(self.test_dir / "yamareco.gpx", os.path.join(other_dir, "yamareco.gpx"))
+        jobs = [(input_file, batch_output_path(input_file, relative_path, output_dir, '_converted'))
+                for input_file, relative_path in expand_inputs([str(self.input_dir), other_dir])]
+        self.assertEqual(duplicate_outputs(jobs), {
+            os.path.join(output_dir, "yamareco.gpx"): [
+                os.path.join(str(self.input_dir), "yamareco.gpx"), os.path.join(other_dir, "yamareco.gpx")
+            ]
+        })
+        with self.assertRaises(ValueError):
+            run_batch(jobs, partial(convert_file, activity_type='hiking'))
+
+
+if __name__ == '__main__':
+    unittest.main()
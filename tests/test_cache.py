@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+解析結果キャッシュのテスト
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.universal_gpx_converter.accumulators import StatisticsCollector
+from src.universal_gpx_converter.cache import ParseCache
+from src.universal_gpx_converter.parser import GPXParser
+
+
+class TestParseCache(unittest.TestCase):
+    """ParseCacheのテストクラス"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.test_dir = Path(__file__).parent / "test_data"
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = ParseCache(self.cache_dir)
+
+    def tearDown(self):
+        """テスト後の後片付け"""
+        shutil.rmtree(self.cache_dir)
+
+    def test_cached_result(self):
+        """キャッシュから読み込んだ結果が解析結果と一致するかのテスト"""
+        parser = GPXParser(cache=self.cache)
+
+        for name in ["yamareco.gpx", "strava.gpx", "runkeeper.gpx"]:
+            file_path = str(self.test_dir / name)
+            expected = GPXParser().parse_file(file_path)
+
+            self.assertEqual(parser.parse_file(file_path), expected)
+            with mock.patch.object(GPXParser, '_parse_tree') as parse_tree:
+                cached = parser.parse_file(file_path)
+                parse_tree.assert_not_called()
+
+            self.assertEqual(cached, expected)
+            # 全ポイントは各トラックのポイントと同じ辞書
+            track_points = {id(point) for track in cached['tracks'] for point in track['points']}
+            self.assertTrue(all(id(point) in track_points for point in cached['all_points']))
+
+    def test_cached_columnar_result(self):
+        """TrackArray形式の解析結果のキャッシュのテスト"""
+        file_path = str(self.test_dir / "yamareco.gpx")
+        expected = GPXParser().parse_file(file_path, columnar=True)
+        parser = GPXParser(cache=self.cache)
+        parser.parse_file(file_path, columnar=True)
+        cached = parser.parse_file(file_path, columnar=True)
+
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        self.assertEqual(cached['metadata'], expected['metadata'])
+        for actual, points in [(cached['all_points'], expected['all_points'])] + \
+                [(a['points'], b['points']) for a, b in zip(cached['tracks'], expected['tracks'])]:
+            np.testing.assert_array_equal(actual.lat, points.lat)
+            np.testing.assert_array_equal(actual.ele, points.ele)
+            np.testing.assert_array_equal(actual.time, points.time)
+
+        # 辞書形式とは別のキーで保存する
+        self.assertEqual(parser.parse_file(file_path), GPXParser().parse_file(file_path))
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_statistics(self):
+        """キャッシュの有無によらず補完前のポイントから統計を集計するかのテスト"""
+        # 時間がなく、2点目は標高もない（補完すると時間の範囲・日数が変わる）
+        file_path = os.path.join(self.cache_dir, "missing.gpx")
+        with open(file_path, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                    '<gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1" creator="test"><trk><trkseg>'
+                    '<trkpt lat="35.0" lon="139.0"><ele>100</ele></trkpt>'
+                    '<trkpt lat="35.001" lon="139.0"></trkpt>'
+                    '<trkpt lat="35.002" lon="139.0"><ele>150</ele></trkpt>'
+                    '</trkseg></trk></gpx>')
+
+        for columnar in (False, True):
+            expected = StatisticsCollector()
+            parsed = GPXParser().parse_file(file_path, columnar=columnar, statistics=expected)
+            parser = GPXParser(cache=self.cache)
+            for _ in range(2):
+                collector = StatisticsCollector()
+                result = parser.parse_file(file_path, columnar=columnar, statistics=collector)
+                self.assertEqual(collector.result(), expected.result())
+                self.assertEqual(collector.result()['days'], [])
+                # 返す解析結果は補完済み
+                self.assertEqual(result['all_points'][1]['ele'], parsed['all_points'][1]['ele'])
+                self.assertIsNotNone(result['all_points'][1]['time'])
+
+    def test_key_and_eviction(self):
+        """キーとサイズの上限による削除のテスト"""
+        content = (self.test_dir / "strava.gpx").read_bytes()
+        key = self.cache.key(content)
+        self.assertEqual(self.cache.key(memoryview(content)), key)
+        self.assertNotEqual(self.cache.key(content, columnar=True), key)
+        with mock.patch('src.universal_gpx_converter.cache.PARSER_VERSION', 'next'):
+            self.assertNotEqual(self.cache.key(content), key)
+
+        parser = GPXParser(cache=self.cache)
+        files = [str(self.test_dir / name) for name in ["yamareco.gpx", "strava.gpx", "runkeeper.gpx"]]
+        for index, file_path in enumerate(files):
+            parser.parse_file(file_path)
+            path = os.path.join(self.cache_dir, self.cache.key(Path(file_path).read_bytes()) + '.npz')
+            os.utime(path, (index, index))
+
+        # 最初のファイルを参照すると、最後に使われていないのは2番目のファイル
+        parser.parse_file(files[0])
+        sizes = sorted(entry.stat().st_size for entry in os.scandir(self.cache_dir))
+        self.cache.max_bytes = sum(sizes) - 1
+        self.cache.evict()
+
+        remaining = set(os.listdir(self.cache_dir))
+        self.assertEqual(len(remaining), 2)
+        self.assertNotIn(self.cache.key(Path(files[1]).read_bytes()) + '.npz', remaining)
+
+        self.cache.clear()
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
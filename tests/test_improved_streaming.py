@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+改良版スクリプトのストリーミング変換のテスト
+"""
+
+import io
+import re
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.yamareco_to_runkeeper_improved import convert_gpx
+
+
+def _convert(source, **options):
+    """変換結果を変換日時を除いて返す"""
+    output = io.BytesIO()
+    with redirect_stdout(io.StringIO()):
+        result = convert_gpx(source, output, **options)
+    return result, re.sub(rb'<conversion_date>[^<]*</conversion_date>', b'', output.getvalue())
+
+
+class TestImprovedStreaming(unittest.TestCase):
+    """ストリーミング変換のテストクラス"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.file_path = Path(__file__).parent / "test_data" / "yamareco.gpx"
+
+    def test_same_output(self):
+        """ストリーミング変換の出力が通常の変換と一致するかのテスト"""
+        option_sets = [
+            {},
+            {'format_xml': False},
+            {'add_metadata': False, 'activity_type': 'walking'},
+            {'keep_source': False, 'track_name': 'A & B <test>', 'coordinate_precision': 3}
+        ]
+        for options in option_sets:
+            expected = _convert(str(self.file_path), **options)
+            self.assertTrue(expected[0])
+            self.assertEqual(_convert(str(self.file_path), streaming=True, **options), expected)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_file = Path(temp_dir) / "streaming.gpx"
+            with redirect_stdout(io.StringIO()):
+                self.assertTrue(convert_gpx(str(self.file_path), str(output_file), streaming=True))
+            self.assertEqual(re.sub(rb'<conversion_date>[^<]*</conversion_date>', b'', output_file.read_bytes()),
+                             _convert(str(self.file_path))[1])
+
+    def test_unordered_and_invalid_input(self):
+        """時刻順でないファイル（変換し直す）・壊れたファイルのテスト"""
+        gpx = ('<?xml version="1.0"?><gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1">'
+               '<trk><trkseg>{}</trkseg></trk></gpx>')
+        points = ''.join(f'<trkpt lat="35.0" lon="139.0"><time>{time}</time></trkpt>'
+                         for time in ('2023-05-02T10:00:00Z', '2023-05-01T09:00:00Z'))
+        unordered = gpx.format(points).encode('utf-8')
+        expected = _convert(unordered)
+        self.assertIn(b'01/05/23 10:00 am', expected[1])
+        self.assertEqual(_convert(unordered, streaming=True), expected)
+
+        self.assertEqual(_convert(unordered[:-20], streaming=True), (False, b''))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+バックグラウンドジョブのテスト
+"""
+
+import io
+import sys
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.trailsync.jobs import CANCELLED, FAILED, SUCCEEDED, Job, JobQueue, ProgressReader
+from src.yamareco_to_runkeeper_improved import PROGRESS_INTERVAL, convert_gpx, parse_gpx
+
+
+class TestJobs(unittest.TestCase):
+    """バックグラウンドジョブのテストクラス"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = Path(__file__).parent / "test_data" / "yamareco.gpx"
+        self.queue = JobQueue(workers=1)
+
+    def tearDown(self):
+        """テスト後の後処理"""
+        self.queue.shutdown()
+        self.temp_dir.cleanup()
+
+    def test_progress(self):
+        """読み込んだバイト数を進捗として報告し、結果が同じになるかのテスト"""
+        content = self.file_path.read_bytes()
+        expected = Path(self.temp_dir.name) / "expected.gpx"
+        output = Path(self.temp_dir.name) / "output.gpx"
+        with redirect_stdout(io.StringIO()):
+            convert_gpx(content, str(expected), streaming=True, keep_source=False)
+
+        progress = []
+
+        def task(job):
+            reader = ProgressReader(content, job)
+            original = job.report
+            job.report = lambda done, total, message=None: (original(done, total, message),
+                                                           progress.append(job.progress))
+            with redirect_stdout(io.StringIO()), open(output, 'wb') as f:
+                return convert_gpx(reader, f, streaming=True, keep_source=False)
+
+        job = self.queue.submit(task, name="yamareco.gpx")
+        self.assertTrue(job.wait(60))
+        self.assertEqual(job.state, SUCCEEDED)
+        self.assertEqual(job.progress, 1.0)
+        self.assertGreater(len(progress), 2)
+        self.assertEqual(progress, sorted(progress))
+        self.assertEqual(output.read_bytes(), expected.read_bytes())
+        self.assertIs(self.queue.get(job.id), job)
+
+        # 段階ごとに全体の進捗の範囲を割り当て、段階が変わっても進捗は戻らない
+        job = Job('stages')
+        job.stage(0.0, 0.4, "解析中")
+        job.report(1, 2)
+        self.assertAlmostEqual(job.progress, 0.2)
+        job.stage(0.0, 0.4)
+        self.assertAlmostEqual(job.progress, 0.2)
+        job.stage(0.6, 1.0, "変換中")
+        job.report(1, 4)
+        self.assertAlmostEqual(job.progress, 0.7)
+        self.assertEqual(job.message, "変換中")
+
+        # 失敗したジョブはエラーを保持する
+        job = self.queue.submit(lambda job: 1 / 0)
+        self.assertTrue(job.wait(60))
+        self.assertEqual(job.state, FAILED)
+        self.assertIn('division', job.error)
+
+        # 保持する時間を過ぎた終了したジョブは削除する
+        self.queue.retention = -1
+        self.queue._prune()
+        self.assertIsNone(self.queue.get(job.id))
+
+    def test_cancel(self):
+        """実行中・待機中のジョブのキャンセルのテスト"""
+        started = threading.Event()
+        release = threading.Event()
+
+        def task(job):
+            started.set()
+            release.wait(10)
+            job.report(1, 2)
+            return 'done'
+
+        running = self.queue.submit(task)
+        queued = self.queue.submit(task)
+        started.wait(10)
+
+        # ワーカーが1つのため2つ目は待機中のままキャンセルされる
+        self.assertTrue(self.queue.cancel(queued.id))
+        self.assertEqual(queued.state, CANCELLED)
+        self.assertTrue(self.queue.cancel(running.id))
+        release.set()
+        self.assertTrue(running.wait(10))
+        self.assertEqual(running.state, CANCELLED)
+        self.assertIsNone(running.result)
+        self.assertFalse(self.queue.cancel(running.id))
+
+        # 変換中は一定数のトラックポイントごとに進捗を報告し、キャンセルされた時点で中断する
+        tree = parse_gpx(str(self.file_path))
+        reported = []
+
+        def convert(job):
+            def progress(done, total):
+                if done >= total // 2:
+                    self.queue.cancel(job.id)
+                reported.append(done)
+                job.report(done, total)
+
+            with redirect_stdout(io.StringIO()):
+                return convert_gpx(tree, io.BytesIO(), progress=progress)
+
+        job = self.queue.submit(convert)
+        self.assertTrue(job.wait(60))
+        self.assertEqual(job.state, CANCELLED)
+        self.assertEqual(reported, [0, PROGRESS_INTERVAL, 2 * PROGRESS_INTERVAL])
+        self.assertAlmostEqual(job.progress, PROGRESS_INTERVAL / 2509)
+
+
+if __name__ == '__main__':
+    unittest.main()
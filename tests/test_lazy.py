@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+遅延読み込みGPX文書のテスト
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.universal_gpx_converter.lazy import LazyGPXDocument
+from src.universal_gpx_converter.parser import GPXParser
+from src.universal_gpx_converter.services import YamarecoService
+
+
+class TestLazyGPXDocument(unittest.TestCase):
+    """LazyGPXDocumentのテストクラス"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.parser = GPXParser()
+        self.test_dir = Path(__file__).parent / "test_data"
+
+    def _track_headers(self, tracks):
+        return [{k: track[k] for k in track if k != 'points'} for track in tracks]
+
+    def test_header_without_points(self):
+        """トラックポイントを読み込まずにヘッダーを参照できるかのテスト"""
+        for name in ["yamareco.gpx", "strava.gpx", "runkeeper.gpx"]:
+            file_path = str(self.test_dir / name)
+            expected = self.parser.parse_file(file_path)
+            document = self.parser.parse_file(file_path, lazy=True)
+
+            self.assertIsInstance(document, LazyGPXDocument)
+            self.assertEqual(document['creator'], expected['creator'])
+            self.assertEqual(document['metadata'], expected['metadata'])
+            self.assertEqual(document['waypoints'], expected['waypoints'])
+            self.assertEqual(self._track_headers(document['tracks']),
+                             self._track_headers(expected['tracks']))
+            self.assertEqual(self.parser.detect_service(document), self.parser.detect_service(expected))
+            self.assertEqual(document.point_count, len(expected['all_points']))
+            self.assertEqual(document.start_time, expected['all_points'][0]['time'])
+            self.assertEqual(document.end_time, expected['all_points'][-1]['time'])
+            self.assertIn('all_points', document)
+            self.assertFalse(document.loaded)
+
+    def test_points_on_access(self):
+        """トラックポイントが参照時に読み込まれるかのテスト"""
+        file_path = self.test_dir / "yamareco.gpx"
+        expected = self.parser.parse_file(str(file_path))
+        document = self.parser.parse_file(file_path.read_bytes(), lazy=True)
+
+        self.assertEqual(document['tracks'][1]['points'], expected['tracks'][1]['points'])
+        self.assertTrue(document.loaded)
+        self.assertEqual(document['all_points'], expected['all_points'])
+
+    def test_service_conversion(self):
+        """サービスの変換に遅延読み込みの文書を渡せるかのテスト"""
+        file_path = str(self.test_dir / "yamareco.gpx")
+        expected = YamarecoService().convert_to_universal(self.parser.parse_file(file_path))
+        universal_data = YamarecoService().convert_to_universal(self.parser.parse_file(file_path, lazy=True))
+
+        self.assertEqual(universal_data['all_points'], expected['all_points'])
+
+    def test_invalid_source(self):
+        """GPXでない入力のテスト"""
+        self.assertIsNone(self.parser.parse_file(b'<html></html>', lazy=True))
+        self.assertIsNone(self.parser.parse_file(b'', lazy=True))
+        self.assertIsNone(self.parser.parse_file(str(self.test_dir / "missing.gpx"), lazy=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
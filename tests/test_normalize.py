@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+トラックポイント正規化のテスト
+"""
+
+import io
+import re
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.universal_gpx_converter.converter import GPXConverter
+from src.universal_gpx_converter.normalize import format_decimals, normalize_points
+from src.universal_gpx_converter.parser import GPXParser
+from src.universal_gpx_converter.services import RunkeeperService, StravaService, YamarecoService
+from src.universal_gpx_converter.services.registry import registry
+
+
+class TestNormalize(unittest.TestCase):
+    """正規化のテストクラス"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.test_dir = Path(__file__).parent / "test_data"
+
+    def test_format_decimals(self):
+        """1点ずつf-stringで整形した場合と同じ結果になるかのテスト"""
+        values = ['34.93293983489275', '-0.0000000004', '135.5', '1e3', ' 2.25 ', 'nan']
+        self.assertEqual(format_decimals(values, 9), [f"{float(value):.9f}" for value in values])
+        self.assertEqual(format_decimals(['1.25', 'abc', ''], 1), ['1.2', 'abc', ''])
+
+        points = [{'lat': '35.1', 'lon': '139.2', 'ele': None}, {'lat': '35.2', 'lon': '139.3', 'ele': '10'}]
+        normalized = normalize_points(points, 3, 1)
+        self.assertEqual(normalized, [{'lat': '35.100', 'lon': '139.200', 'ele': None},
+                                      {'lat': '35.200', 'lon': '139.300', 'ele': '10.0'}])
+        self.assertEqual(points[1]['ele'], '10')
+
+    def test_shared_between_views(self):
+        """各トラックと全ポイントで正規化した結果を共有するかのテスト"""
+        file_path = str(self.test_dir / "yamareco.gpx")
+        for service in (YamarecoService(), StravaService(), RunkeeperService()):
+            gpx_data = GPXParser().parse_file(file_path)
+            original = gpx_data['all_points'][0]['lat']
+            universal_data = service.convert_to_universal(gpx_data)
+
+            track_points = [point for track in universal_data['tracks'] for point in track['points']]
+            self.assertEqual(len(track_points), len(universal_data['all_points']))
+            self.assertTrue(all(a is b for a, b in zip(track_points, universal_data['all_points'])))
+            self.assertEqual(universal_data['all_points'][0]['lat'], f"{float(original):.9f}")
+
+        columnar = YamarecoService().convert_to_universal(GPXParser().parse_file(file_path, columnar=True))
+        self.assertTrue(np.shares_memory(columnar['tracks'][0]['points'].lat, columnar['all_points'].lat))
+        self.assertEqual(columnar['all_points'][0]['lat'], '34.932939835')
+
+    def test_in_place_and_copy(self):
+        """デフォルトでは入力を書き換え、copy=Trueでは入力を変更しないかのテスト"""
+        file_path = str(self.test_dir / "strava.gpx")
+        gpx_data = GPXParser().parse_file(file_path)
+        first_point = gpx_data['all_points'][0]
+        universal_data = StravaService().convert_to_universal(gpx_data)
+        self.assertIs(universal_data, gpx_data)
+        self.assertIs(universal_data['all_points'][0], first_point)
+        self.assertEqual(first_point['lat'], f"{float(first_point['lat']):.9f}")
+
+        gpx_data = GPXParser().parse_file(file_path)
+        metadata = dict(gpx_data['metadata'])
+        lat = gpx_data['all_points'][0]['lat']
+        universal_data = StravaService().convert_to_universal(gpx_data, copy=True)
+        self.assertNotIn('service', gpx_data)
+        self.assertEqual(gpx_data['metadata'], metadata)
+        self.assertEqual(gpx_data['all_points'][0]['lat'], lat)
+        self.assertEqual(universal_data['service'], 'strava')
+
+        columnar = GPXParser().parse_file(file_path, columnar=True)
+        lats = columnar['all_points'].lat.copy()
+        StravaService().convert_to_universal(columnar, copy=True)
+        np.testing.assert_array_equal(columnar['all_points'].lat, lats)
+        universal_data = StravaService().convert_to_universal(columnar)
+        self.assertIs(universal_data['all_points'].lat, columnar['all_points'].lat)
+        self.assertEqual(columnar['all_points'].precision, (9, 1))
+        self.assertEqual(columnar['all_points'][0]['lat'], f"{lats[0]:.9f}")
+
+    def test_columnar_output(self):
+        """TrackArray形式と辞書形式で変換結果が同じになるかのテスト"""
+        for file_path in sorted(self.test_dir.glob("*.gpx")):
+            outputs = []
+            for columnar in (False, True):
+                gpx_data = GPXParser().parse_file(str(file_path), columnar=columnar)
+                service = registry.get(registry.detect(gpx_data).service) or YamarecoService()
+                output = io.BytesIO()
+                self.assertTrue(GPXConverter().convert_to_universal_format(service.convert_to_universal(gpx_data),
+                                                                           output))
+                # 変換日時を除いて比較
+                outputs.append(re.sub(rb'<conversion_date>[^<]*', b'', output.getvalue()))
+            self.assertEqual(outputs[1], outputs[0], file_path.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
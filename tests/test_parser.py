@@ -6,14 +6,17 @@ GPXパーサーのテスト
 """
 
 import os
+import shutil
 import sys
+import tempfile
+import tracemalloc
 import unittest
 from datetime import datetime
 from pathlib import Path
 
 # テスト対象のモジュールをインポート
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from src.universal_gpx_converter.parser import GPXParser
+from src.universal_gpx_converter.parser import GPXParser, merge_points_by_time
 
 class TestGPXParser(unittest.TestCase):
     """GPXパーサーのテストクラス"""
@@ -24,15 +27,19 @@ class TestGPXParser(unittest.TestCase):
         
         # テスト用のGPXファイルパス
         self.test_dir = Path(__file__).parent / "test_data"
-        self.test_dir.mkdir(exist_ok=True)
         
-        # テスト用のGPXファイルが存在しない場合は作成
-        self.runkeeper_gpx = self.test_dir / "runkeeper_test.gpx"
-        self.yamareco_gpx = self.test_dir / "yamareco_test.gpx"
-        self.strava_gpx = self.test_dir / "strava_test.gpx"
+        # テスト用のGPXファイルは一時ディレクトリに作成
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.runkeeper_gpx = self.temp_dir / "runkeeper_test.gpx"
+        self.yamareco_gpx = self.temp_dir / "yamareco_test.gpx"
+        self.strava_gpx = self.temp_dir / "strava_test.gpx"
         
         self._create_test_files()
 
+    def tearDown(self):
+        """テスト後の後片付け"""
+        shutil.rmtree(self.temp_dir)
+
     def _create_test_files(self):
         """テスト用のGPXファイルを作成"""
         # Runkeeper形式のGPXファイル
@@ -148,5 +155,93 @@ class TestGPXParser(unittest.TestCase):
         self.assertEqual(self.parser.detect_service(yamareco_data), 'yamareco')
         self.assertEqual(self.parser.detect_service(strava_data), 'strava')
 
+    def test_parse_streaming_matches_tree(self):
+        """ストリーミングモードの結果が通常モードと一致するかのテスト"""
+        yamareco_gpx = self.test_dir / "yamareco.gpx"
+        expected = self.parser.parse_file(str(yamareco_gpx))
+        gpx_data = self.parser.parse_file(str(yamareco_gpx), streaming=True)
+        
+        self.assertIsNotNone(gpx_data)
+        self.assertEqual(gpx_data['creator'], expected['creator'])
+        self.assertEqual(gpx_data['metadata'], expected['metadata'])
+        self.assertEqual(gpx_data['waypoints'], expected['waypoints'])
+        
+        # ヘッダーは最初のトラックまで確定している
+        self.assertEqual(len(gpx_data['tracks']), 1)
+        
+        points = list(gpx_data['all_points'])
+        self.assertEqual(points, expected['all_points'])
+        self.assertEqual(
+            [{k: v for k, v in t.items() if k != 'points'} for t in gpx_data['tracks']],
+            [{k: v for k, v in t.items() if k != 'points'} for t in expected['tracks']]
+        )
+
+    def test_parse_streaming_constant_memory(self):
+        """ストリーミングモードのメモリ使用量が点数に比例しないかのテスト"""
+        trkpts = ''.join(
+            f'<trkpt lat="34.{i:08d}" lon="135.{i:08d}"><ele>{i % 500}</ele>'
+            f'<time>2025-01-30T{i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z</time></trkpt>\n'
+            for i in range(5000)
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            large_gpx = os.path.join(temp_dir, "large.gpx")
+            with open(large_gpx, "w", encoding="utf-8") as f:
+                f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                        '<gpx xmlns="http://www.topografix.com/GPX/1/1" creator="test">'
+                        f'<trk><name>track</name><trkseg>{trkpts}</trkseg></trk></gpx>')
+            
+            peaks = {}
+            for streaming in (False, True):
+                tracemalloc.start()
+                gpx_data = self.parser.parse_file(large_gpx, streaming=streaming)
+                count = sum(1 for _ in gpx_data['all_points'])
+                peaks[streaming] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                self.assertEqual(count, 5000)
+        
+        self.assertLess(peaks[True] * 10, peaks[False])
+
+    def test_merge_points_by_time(self):
+        """トラックごとのポイントの併合が安定ソートと一致するかのテスト"""
+        def point(minute, label):
+            return {'label': label, 'datetime': datetime(2025, 1, 30, 23, minute)}
+        
+        cases = [
+            # 時間順に並んだトラック（連結のみ）
+            [[point(0, 'a0'), point(1, 'a1')], [point(1, 'b1'), point(2, 'b2')]],
+            # 時間帯が重なるトラック
+            [[point(0, 'a0'), point(3, 'a3')], [point(1, 'b1'), point(3, 'b3')], []],
+            # トラック内が時間順でない、時間のない点を含む
+            [[point(2, 'a2'), point(0, 'a0')], [{'label': 'none'}, point(0, 'b0')]],
+        ]
+        for tracks in cases:
+            expected = sorted([p for points in tracks for p in points],
+                              key=lambda x: x.get('datetime', datetime.min))
+            merged = merge_points_by_time(tracks)
+            self.assertEqual([p['label'] for p in merged], [p['label'] for p in expected])
+
+    def test_parse_direct_children_only(self):
+        """直下の子要素のみを参照するかのテスト"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            gpx_file = os.path.join(temp_dir, "nested.gpx")
+            with open(gpx_file, "w", encoding="utf-8") as f:
+                f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                        '<gpx xmlns="http://www.topografix.com/GPX/1/1" '
+                        'xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v1" creator="test">'
+                        '<metadata><author><name>author</name></author></metadata>'
+                        '<trk><name>track</name><trkseg>'
+                        '<trkpt lat="34.9" lon="135.7"><ele>30</ele><time>2025-01-30T23:32:36Z</time>'
+                        '<extensions><gpxtpx:TrackPointExtension><gpxtpx:hr>120</gpxtpx:hr>'
+                        '</gpxtpx:TrackPointExtension></extensions></trkpt>'
+                        '</trkseg></trk></gpx>')
+            
+            for columnar in (False, True):
+                gpx_data = self.parser.parse_file(gpx_file, columnar=columnar)
+                self.assertEqual(gpx_data['metadata'], {'author': 'author', 'time': '2025-01-30T23:32:36Z'})
+                point = gpx_data['all_points'][0]
+                self.assertEqual(point['ele'], '30')
+                self.assertEqual(point['time'], '2025-01-30T23:32:36Z')
+                self.assertEqual(point['extensions']['hr'], '120')
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
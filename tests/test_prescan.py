@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+GPXヘッダー事前走査のテスト
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.universal_gpx_converter.parser import GPXParser
+from src.universal_gpx_converter.prescan import prescan_header
+from src.universal_gpx_converter.services import RunkeeperService, StravaService, YamarecoService
+
+
+class TestPrescan(unittest.TestCase):
+    """prescan_headerのテストクラス"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.parser = GPXParser()
+        self.test_dir = Path(__file__).parent / "test_data"
+
+    def test_matches_full_parse(self):
+        """事前走査の結果が全体の解析と一致するかのテスト"""
+        services = {
+            'yamareco': YamarecoService(),
+            'strava': StravaService(),
+            'runkeeper': RunkeeperService()
+        }
+
+        for name, service in services.items():
+            file_path = self.test_dir / f"{name}.gpx"
+            expected = self.parser.parse_file(str(file_path))
+            header = prescan_header(str(file_path))
+
+            self.assertEqual(header['service'], name)
+            self.assertTrue(header['complete'])
+            self.assertLess(header['bytes_read'], file_path.stat().st_size)
+            self.assertEqual(header['creator'], expected['creator'])
+            self.assertEqual(header['metadata'], expected['metadata'])
+            self.assertEqual(header['tracks'][0]['name'], expected['tracks'][0]['name'])
+            self.assertEqual(header['tracks'][0]['time'], expected['tracks'][0]['time'])
+            self.assertTrue(service.detect(header))
+            self.assertEqual(self.parser.detect_service_file(str(file_path)), name)
+
+    def test_sources_and_limits(self):
+        """バイト列の入力と読み込み上限のテスト"""
+        waypoints = ''.join(f'<wpt lat="34.9" lon="135.{i}"><name>wpt{i}</name></wpt>' for i in range(200))
+        content = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+                   '<gpx xmlns="http://www.topografix.com/GPX/1/1" creator="StravaGPX">'
+                   f'{waypoints}<trk><name>run</name><trkseg>'
+                   '<trkpt lat="34.9" lon="135.7"><time>2025-01-30T23:32:36Z</time></trkpt>'
+                   '</trkseg></trk></gpx>').encode('utf-8')
+
+        header = prescan_header(content)
+        self.assertTrue(header['complete'])
+        self.assertEqual(header['service'], 'strava')
+        self.assertEqual(header['tracks'][0]['time'], '2025-01-30T23:32:36Z')
+
+        # 上限までにトラックポイントに到達しない場合も作成者までは判定できる
+        header = prescan_header(content, max_bytes=1024, chunk_size=256)
+        self.assertFalse(header['complete'])
+        self.assertEqual(header['bytes_read'], 1024)
+        self.assertEqual(header['service'], 'strava')
+
+        self.assertIsNone(prescan_header(b'not xml'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+変換結果のプレビューのテスト
+"""
+
+import io
+import sys
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.trailsync.preview import PreviewIndex, preview_index
+from src.yamareco_to_runkeeper_improved import convert_gpx
+
+
+class TestPreview(unittest.TestCase):
+    """変換結果のプレビューのテストクラス"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = Path(__file__).parent / "test_data" / "yamareco.gpx"
+
+    def tearDown(self):
+        """テスト後の後処理"""
+        self.temp_dir.cleanup()
+
+    def test_pages(self):
+        """ページごとに指定した範囲のトラックポイントのみを返すかのテスト"""
+        for format_xml in (True, False):
+            output_file = Path(self.temp_dir.name) / f"converted_{format_xml}.gpx"
+            with redirect_stdout(io.StringIO()):
+                self.assertTrue(convert_gpx(str(self.file_path), str(output_file), format_xml=format_xml))
+            content = output_file.read_text(encoding='utf-8')
+            trkpts = ET.fromstring(content.encode('utf-8')).iter('{http://www.topografix.com/GPX/1/1}trkpt')
+            times = [trkpt.find('{http://www.topografix.com/GPX/1/1}time').text for trkpt in trkpts]
+
+            index = preview_index(str(output_file))
+            self.assertIs(preview_index(str(output_file)), index)
+            self.assertEqual(index.count, len(times))
+
+            # 全ページのトラックポイントをつなげると元のファイルに戻る
+            pages = [index.page(page, 300) for page in range(index.page(0, 300).pages)]
+            self.assertEqual(index.header() + ''.join(index.trackpoints(page.start, page.end) for page in pages)
+                             + index.footer(), content)
+            self.assertEqual(pages[1].text.count('<trkpt'), 300)
+            self.assertIn('<!-- 300ポイント省略 -->', pages[1].text)
+            self.assertTrue(pages[-1].text.endswith(content[-50:]))
+            self.assertEqual(index.page(1000, 300).page, pages[-1].page)
+
+            # 時間による移動
+            position = index.find_time(datetime(2025, 2, 1))
+            self.assertLess(times[position - 1], '2025-02-01T00:00:00Z')
+            self.assertGreaterEqual(times[position], '2025-02-01T00:00:00Z')
+            self.assertEqual(index.find_time(datetime(2030, 1, 1)), index.count)
+
+    def test_empty(self):
+        """トラックポイントのないファイルのテスト"""
+        output_file = Path(self.temp_dir.name) / "empty.gpx"
+        output_file.write_text('<gpx><trk><trkseg></trkseg></trk></gpx>', encoding='utf-8')
+        page = PreviewIndex(str(output_file)).page(0)
+        self.assertEqual((page.count, page.pages), (0, 1))
+        self.assertEqual(page.text, '<gpx><trk><trkseg></trkseg></trk></gpx>')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+サービス判定レジストリのテスト
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.universal_gpx_converter.parser import GPXParser
+from src.universal_gpx_converter.services import (DetectionRule, ServiceRegistry, StravaService,
+                                                  creator_contains, registry, track_name_contains)
+
+
+class TestRegistry(unittest.TestCase):
+    """サービス判定レジストリのテストクラス"""
+
+    def test_detect(self):
+        """既定のレジストリで確信度付きで判定できるかのテスト"""
+        test_dir = Path(__file__).parent / "test_data"
+        for name in ('yamareco', 'strava', 'runkeeper'):
+            gpx_data = GPXParser().parse_file(str(test_dir / f"{name}.gpx"))
+            result = registry.detect(gpx_data)
+            self.assertEqual(result.service, name)
+            self.assertGreaterEqual(result.confidence, 0.9)
+            self.assertIsNotNone(registry.get(name))
+
+        # 作成者が一致する場合はトラックの判定ルールより優先
+        gpx_data = {'creator': 'StravaGPX', 'tracks': [{'name': 'Runkeeper run'}]}
+        self.assertEqual(registry.detect(gpx_data).service, 'strava')
+        # メタデータとトラックのタイプのみ（他のアプリのGPX）はサービスを判定しない
+        self.assertEqual(registry.detect({'creator': '', 'metadata': {}, 'tracks': [{'type': 'run'}]}).service,
+                         'unknown')
+        gpx_data = {'creator': 'OsmAnd+ 4.6', 'metadata': {'name': '山行', 'time': '2025-01-01T00:00:00Z'},
+                    'tracks': [{'name': '2025-01-01 山行', 'type': 'hiking'}]}
+        self.assertEqual(GPXParser().detect_service(gpx_data), 'unknown')
+        self.assertFalse(StravaService().detect(gpx_data))
+        # 単独では確信度が足りないルールも組み合わせで判定
+        gpx_data = {'creator': '', 'metadata': {'time': '2025-01-01T00:00:00Z'},
+                    'tracks': [{'name': 'Strava ride', 'type': 'cycling'}]}
+        result = registry.detect(gpx_data)
+        self.assertEqual(result.service, 'strava')
+        self.assertAlmostEqual(result.confidence, 1 - 0.4 * 0.8 * 0.8)
+        self.assertTrue(StravaService().detect(gpx_data))
+        self.assertEqual(registry.get('garmin'), None)
+
+    def test_register(self):
+        """新しいサービスのルールが1回の走査で評価されるかのテスト"""
+        calls = []
+
+        def name_rule(track):
+            calls.append(track['name'])
+            return track['name'] == 'ride'
+
+        custom = ServiceRegistry()
+        custom.register('alpha', [DetectionRule('creator', creator_contains('alpha'), 0.9)])
+        custom.register('beta', [DetectionRule('track', name_rule, 0.7),
+                                 DetectionRule('track', track_name_contains('beta'), 0.6)])
+
+        result = custom.detect({'creator': 'x', 'tracks': [{'name': 'ride'}, {'name': 'beta ride'}]})
+        self.assertEqual(result.service, 'beta')
+        self.assertAlmostEqual(result.confidence, 1 - 0.3 * 0.4)
+        self.assertEqual(result.scores['alpha'], 0.0)
+        # 一致したルールは以降のトラックでは評価しない
+        self.assertEqual(calls, ['ride'])
+
+        with self.assertRaises(ValueError):
+            custom.register('gamma', [DetectionRule('waypoint', bool, 0.5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+トラック再サンプリングのテスト
+"""
+
+import io
+import re
+import sys
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import numpy as np
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.universal_gpx_converter.converter import GPXConverter
+from src.universal_gpx_converter.parser import GPXParser
+from src.universal_gpx_converter.resample import resample_points, resample_track, resample_tracks
+from src.universal_gpx_converter.services.yamareco import YamarecoService
+from src.universal_gpx_converter.timestamps import NO_TIME
+from src.universal_gpx_converter.track_array import TrackArray
+from src.yamareco_to_runkeeper_improved import convert_gpx
+
+
+class TestResample(unittest.TestCase):
+    """トラック再サンプリングのテストクラス"""
+
+    def test_resample_track(self):
+        """時間の格子への補間と中断をまたがない区間分けのテスト"""
+        start = 1738281600
+        # 2点目は時間なし、4点目と5点目の間に夜間の中断（10時間）
+        track = TrackArray([35.0, 35.5, 35.001, 35.002, 35.1, 35.2],
+                           [139.0, 139.0, 139.0, 139.0, 139.1, 139.1],
+                           [100, 100, np.nan, 112, 500, 520],
+                           [start, NO_TIME, start + 10, start + 22, start + 36022, start + 36030],
+                           {'hr': [100, 120, 140, 160, 60, 80]})
+        resampled = resample_track(track, 5)
+
+        self.assertEqual((resampled.time - start).tolist(),
+                         [0, 5, 10, 15, 20, 22, 36022, 36027, 36030])
+        np.testing.assert_allclose(resampled.lat[:3], [35.0, 35.0005, 35.001])
+        # 欠損した標高は前後の値で補間
+        np.testing.assert_allclose(resampled.ele[:6], [100, 102.727, 105.455, 108.182, 110.909, 112], atol=1e-3)
+        np.testing.assert_allclose(resampled.sensors['hr'][-3:], [60, 72.5, 80])
+        # 中断をまたぐ点は作らない
+        self.assertEqual(np.diff(resampled.time).max(), 36000)
+
+        # 標高のない区間は中断の前の区間の値で補間せず、一部のみにある区間はその区間の値のみを使う
+        track.ele[4:] = np.nan
+        track.sensors['hr'][4] = np.nan
+        partial = resample_track(track, 5)
+        self.assertTrue(np.isnan(partial.ele[6:]).all())
+        np.testing.assert_allclose(partial.ele[:6], resampled.ele[:6])
+        np.testing.assert_allclose(partial.sensors['hr'][-3:], [80, 80, 80])
+
+        points = resample_points(track.to_points(), 5)
+        self.assertEqual([point['time'] for point in points], resampled.time_strings())
+        self.assertEqual(len(resample_track(TrackArray.empty())), 0)
+        with self.assertRaises(ValueError):
+            resample_track(track, 0)
+
+    def test_converters(self):
+        """変換時の再サンプリングのテスト"""
+        file_path = str(Path(__file__).parent / "test_data" / "yamareco.gpx")
+        tracks = [track['points'] for track in GPXParser().parse_file(file_path, columnar=True)['tracks']]
+        expected = resample_tracks(tracks, 30)
+        # 3つ目と4つ目のトラックの間（中断は10分未満）は補間しない
+        gap = (tracks[2].time[-1], tracks[3].time[0])
+        self.assertFalse(np.any((expected.time > gap[0]) & (expected.time < gap[1])))
+        self.assertEqual(len(resample_points(TrackArray.concatenate(tracks), 30)), len(expected) + 1)
+
+        # 補間した点もサービスの桁数で整形する
+        output = io.BytesIO()
+        gpx_data = YamarecoService().convert_to_universal(GPXParser().parse_file(file_path))
+        self.assertTrue(GPXConverter().convert_to_universal_format(gpx_data, output, resample_interval=30))
+        self.assertEqual(output.getvalue().count(b'<trkpt'), len(expected))
+        self.assertEqual(len(re.findall(rb'lat="\d+\.\d{9}" lon="\d+\.\d{9}"', output.getvalue())), len(expected))
+        self.assertEqual(re.findall(rb'<ele>([^<]*)', output.getvalue()),
+                         re.findall(rb'<ele>(\d+\.\d)<', output.getvalue()))
+
+        output = io.BytesIO()
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(convert_gpx(file_path, output, resample=30))
+        self.assertEqual(output.getvalue().count(b'<trkpt'), len(expected))
+        self.assertIn(expected.time_strings()[-1].encode(), output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+変換結果キャッシュのテスト
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.trailsync.results import ResultCache, file_hash, normalize_options
+from src.yamareco_to_runkeeper_improved import convert_gpx
+
+
+class TestResultCache(unittest.TestCase):
+    """変換結果キャッシュのテストクラス"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+        self.file_path = Path(__file__).parent / "test_data" / "yamareco.gpx"
+
+    def tearDown(self):
+        """テスト後の後処理"""
+        self.temp_dir.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_load_and_store(self):
+        """同じ内容・同じオプションの変換結果を変換せずに取得できるかのテスト"""
+        cache = ResultCache(self.cache_dir)
+        content_hash = file_hash(str(self.file_path))
+        options = {'activity_type': 'running', 'coordinate_precision': 5}
+        key = cache.key(content_hash, options)
+
+        # 正規化したオプションが同じ場合は同じキー
+        self.assertEqual(normalize_options({})['elevation_adjustment'], 5.2)
+        self.assertEqual(cache.key(content_hash, dict(options, elevation_adjustment=5.2, track_name='')), key)
+        self.assertNotEqual(cache.key(content_hash, dict(options, format_xml=False)), key)
+        self.assertNotEqual(cache.key('0' * 64, options), key)
+
+        self.assertIsNone(cache.load(key, io.BytesIO()))
+        converted = io.BytesIO()
+        with redirect_stdout(io.StringIO()):
+            self.assertTrue(convert_gpx(str(self.file_path), converted, **options))
+        self.assertTrue(cache.store(key, self.write("converted.gpx", converted.getvalue()),
+                                    {'statistics': ["ポイント数: 2,509"]}))
+
+        for tier in ('memory', 'disk'):
+            output = io.BytesIO()
+            self.assertEqual(cache.load(key, output), {'statistics': ["ポイント数: 2,509"]})
+            self.assertEqual(output.getvalue(), converted.getvalue())
+            # メモリのキャッシュを持たない別のインスタンスはディレクトリから読み込む
+            cache = ResultCache(self.cache_dir) if tier == 'memory' else cache
+        self.assertEqual(cache.statistics()['disk_hits'], 1)
+
+    def test_lookup(self):
+        """変換結果を検索し、ヒットした場合のみ書き込めるかのテスト"""
+        cache = ResultCache(self.cache_dir, max_memory_bytes=0)
+        key = cache.key('0' * 64, {})
+        self.assertIsNone(cache.lookup(key))
+        self.assertEqual(cache.statistics()['misses'], 1)
+
+        self.assertTrue(cache.store(key, self.write("converted.gpx", b"<gpx/>"), {'statistics': None}))
+        result = cache.lookup(key)
+        self.assertEqual(result.path, os.path.join(self.cache_dir, key + '.gpx'))
+        self.assertEqual(result.metadata, {'statistics': None})
+        self.assertIsNone(result.data)
+        output = io.BytesIO()
+        self.assertTrue(cache.write(result, output))
+        self.assertEqual(output.getvalue(), b"<gpx/>")
+        self.assertEqual(cache.statistics()['disk_hits'], 1)
+
+        # 検索後にディレクトリから削除された場合は書き込まない
+        os.remove(result.path)
+        self.assertFalse(cache.write(result, io.BytesIO()))
+
+    def test_evict(self):
+        """メモリ・ディレクトリの合計サイズの上限と最後に使われた順の削除のテスト"""
+        cache = ResultCache(self.cache_dir, max_bytes=250, max_memory_bytes=150)
+        keys = [cache.key(str(i) * 64, {}) for i in range(3)]
+        for i, key in enumerate(keys[:2]):
+            self.assertTrue(cache.store(key, self.write(f"{i}.gpx", bytes([48 + i]) * 100)))
+            os.utime(os.path.join(self.cache_dir, key + '.gpx'), (time.time() - 10 + i, time.time() - 10 + i))
+
+        # 最初の変換結果はメモリから削除済みのためディレクトリから読み込み、最後に使われた時刻を更新
+        self.assertIsNotNone(cache.load(keys[0], io.BytesIO()))
+        # 3件目の保存でディレクトリの上限を超え、最後に使われた時刻が古い2件目を削除
+        self.assertTrue(cache.store(keys[2], self.write("2.gpx", b'2' * 100)))
+        self.assertIsNone(ResultCache(self.cache_dir).load(keys[1], io.BytesIO()))
+
+        output = io.BytesIO()
+        self.assertIsNotNone(cache.load(keys[2], output))
+        self.assertEqual(output.getvalue(), b'2' * 100)
+        self.assertEqual(cache.statistics(), {
+            'hits': 2, 'memory_hits': 1, 'disk_hits': 1, 'misses': 0,
+            'memory_entries': 1, 'memory_bytes': 100
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+固定小数点による丸めのテスト
+"""
+
+import random
+import sys
+import unittest
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from pathlib import Path
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.universal_gpx_converter.rounding import round_half_up, round_half_up_column
+
+# 比較する精度（小数点以下の桁数）
+PRECISIONS = range(4, 9)
+
+# 桁上がり・負のゼロ・通常でない表記など、間違えやすい値
+EDGE_CASES = [
+    '0', '-0', '+0.5', '0.00000049', '-0.00000005', '-0.0000000001', '9', '9.99999995',
+    '-99.999999995', '999.9999999', '0.99999999', '1.', '.5', '-.00000005', '007.123456789',
+    '35.6812345', '139.7671234549999', '-180.00000000000001', '1e-5', '1.5E2', ' 1.5', '1_0.25',
+    'NaN', '9' * 19 + '.99999999', '9' * 18 + '.5', '٣.٥'
+]
+
+
+def _reference(text, precision):
+    """元の実装（Decimalのquantize）による結果"""
+    value = Decimal(text).quantize(Decimal('0.' + '0' * precision), rounding=ROUND_HALF_UP)
+    return f"{value:.{precision}f}"
+
+
+def _random_decimal(rng):
+    """ランダムな10進数の文字列（9が続く値・桁数の少ない値を多めに含む）"""
+    digits = '0123456789' if rng.random() < 0.7 else '99995'
+    integer = ''.join(rng.choice(digits) for _ in range(rng.randint(1, 3)))
+    fraction = ''.join(rng.choice(digits) for _ in range(rng.randint(0, 15)))
+    sign = rng.choice(['', '', '-', '+'])
+    return f"{sign}{integer}.{fraction}" if fraction or rng.random() < 0.5 else sign + integer
+
+
+class TestRounding(unittest.TestCase):
+    """四捨五入のテストクラス"""
+
+    def test_matches_decimal(self):
+        """ランダムな値・間違えやすい値でDecimalと同じ結果になるかのテスト"""
+        rng = random.Random(20240501)
+        for _ in range(50):
+            values = [_random_decimal(rng) for _ in range(rng.randint(1, 200))]
+            values += [f"{rng.uniform(-180, 180):.{rng.randint(0, 14)}f}" for _ in range(50)]
+            values += rng.sample(EDGE_CASES, 8)
+            rng.shuffle(values)
+            for precision in PRECISIONS:
+                expected = [_reference(value, precision) for value in values]
+                self.assertEqual(round_half_up_column(values, precision), expected)
+                self.assertEqual([round_half_up(value, precision) for value in values], expected)
+
+    def test_invalid_values(self):
+        """数値として解釈できない値はDecimalと同じ例外になるかのテスト"""
+        for value in ['abc', '', '-', '1.2.3', '1-2', 'Infinity']:
+            with self.assertRaises(InvalidOperation):
+                round_half_up_column(['1.5', value], 6)
+        self.assertEqual(round_half_up_column([], 6), [])
+        self.assertEqual(round_half_up_column(['-0.0000004', '12.5'], 0), ['-0', '13'])
+
+
+if __name__ == '__main__':
+    unittest.main()
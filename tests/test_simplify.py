@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+トラック簡略化のテスト
+"""
+
+import io
+import sys
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+import numpy as np
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.universal_gpx_converter.converter import GPXConverter
+from src.universal_gpx_converter.parser import GPXParser
+from src.universal_gpx_converter.simplify import _deviation, _project, simplify_mask, simplify_points
+from src.yamareco_to_runkeeper_improved import convert_gpx
+
+
+def _simplify_naive(lat, lon, tolerance):
+    """1点ずつ全体から最小の点を探すVisvalingam–Whyatt法（比較用）"""
+    x, y = (values.tolist() for values in _project(lat, lon))
+    order = list(range(len(lat)))
+    deviations = {order[k]: _deviation(x, y, order[k - 1], order[k], order[k + 1]) for k in range(1, len(order) - 1)}
+    keep = np.ones(len(lat), dtype=bool)
+    while deviations:
+        i = min(deviations, key=lambda k: (deviations[k], k))
+        deviation = deviations.pop(i)
+        if deviation >= tolerance:
+            break
+        keep[i] = False
+        position = order.index(i)
+        order.pop(position)
+        for k in (position - 1, position):
+            if 0 < k < len(order) - 1:
+                deviations[order[k]] = max(_deviation(x, y, order[k - 1], order[k], order[k + 1]), deviation)
+    return keep
+
+
+class TestSimplify(unittest.TestCase):
+    """トラック簡略化のテストクラス"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.file_path = Path(__file__).parent / "test_data" / "yamareco.gpx"
+
+    def test_simplify_mask(self):
+        """ヒープによる簡略化が1点ずつの簡略化と一致するかのテスト"""
+        # 直線上の点は両端のみ残る
+        lat = 35.0 + np.arange(10) * 0.001
+        self.assertEqual(simplify_mask(lat, np.full(10, 139.0), 1.0).tolist(), [True] + [False] * 8 + [True])
+        self.assertTrue(simplify_mask(lat, np.full(10, 139.0), 0).all())
+
+        rng = np.random.default_rng(0)
+        for _ in range(50):
+            count = int(rng.integers(3, 60))
+            lat = 35.0 + np.cumsum(rng.normal(0, 1e-4, count))
+            lon = 139.0 + np.cumsum(rng.normal(0, 1e-4, count))
+            tolerance = float(rng.uniform(0, 20))
+            np.testing.assert_array_equal(simplify_mask(lat, lon, tolerance), _simplify_naive(lat, lon, tolerance))
+
+    def test_converters(self):
+        """変換時の簡略化で点数が減り、残した点の時間が保たれるかのテスト"""
+        gpx_data = GPXParser().parse_file(str(self.file_path))
+        simplified = simplify_points(gpx_data['all_points'], 5.0)
+        self.assertLess(len(simplified), len(gpx_data['all_points']))
+        self.assertIs(simplified[0], gpx_data['all_points'][0])
+        self.assertIs(simplified[-1], gpx_data['all_points'][-1])
+        columnar = simplify_points(GPXParser().parse_file(str(self.file_path), columnar=True)['all_points'], 5.0)
+        self.assertEqual([point['time'] for point in columnar], [point['time'] for point in simplified])
+
+        output = io.BytesIO()
+        self.assertTrue(GPXConverter().convert_to_universal_format(gpx_data, output, simplify_tolerance=5.0))
+        self.assertEqual(output.getvalue().count(b'<trkpt'), len(simplified))
+        self.assertEqual(len(gpx_data['all_points']), 2509)
+
+        output = io.BytesIO()
+        with redirect_stdout(io.StringIO()) as stdout:
+            self.assertTrue(convert_gpx(str(self.file_path), output, simplify=5.0, streaming=True))
+        self.assertIn("削減", stdout.getvalue())
+        self.assertEqual(output.getvalue().count(b'<time>'), len(simplified) + 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+メモリ上のGPXデータの入出力のテスト
+"""
+
+import io
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.universal_gpx_converter.converter import GPXConverter
+from src.universal_gpx_converter.parser import GPXParser
+from src.universal_gpx_converter.sources import BufferReader, source_name
+from src.yamareco_to_runkeeper_improved import convert_gpx
+
+
+class TestSources(unittest.TestCase):
+    """パス以外の入出力のテストクラス"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.parser = GPXParser()
+        self.file_path = Path(__file__).parent / "test_data" / "yamareco.gpx"
+        self.content = self.file_path.read_bytes()
+
+    def test_parse_from_memory(self):
+        """bytes・memoryview・ファイルオブジェクトからの解析のテスト"""
+        expected = self.parser.parse_file(str(self.file_path))
+        sources = [self.content, bytearray(self.content), memoryview(self.content)]
+
+        for source in sources:
+            self.assertEqual(self.parser.parse_file(source), expected)
+            self.assertEqual(list(self.parser.parse_file(source, streaming=True)['all_points']),
+                             list(self.parser.parse_file(str(self.file_path), streaming=True)['all_points']))
+            self.assertEqual(self.parser.parse_file(source, lazy=True)['all_points'],
+                             expected['all_points'])
+
+        self.assertEqual(self.parser.parse_file(io.BytesIO(self.content)), expected)
+        self.assertEqual(self.parser.parse_file(io.BytesIO(self.content), lazy=True)['all_points'],
+                         expected['all_points'])
+        self.assertEqual(self.parser.detect_service_file(memoryview(self.content)), 'yamareco')
+        self.assertIsNone(self.parser.parse_file(b'not xml'))
+
+    def test_buffer_reader(self):
+        """BufferReaderが分割して読み込めるかのテスト"""
+        reader = BufferReader(memoryview(self.content))
+        chunks = iter(lambda: reader.read(1000), b'')
+        self.assertEqual(b''.join(chunks), self.content)
+        self.assertEqual(source_name(memoryview(b'abc')), '<3バイトのデータ>')
+
+    def _strip_conversion_date(self, data):
+        """変換日時の行を除いた行のリスト"""
+        return [line for line in data.splitlines() if b'conversion_date' not in line]
+
+    def test_convert_to_stream(self):
+        """ファイルを介さずに変換した結果がファイルへの出力と一致するかのテスト（変換日時を除く）"""
+        gpx_data = self.parser.parse_file(self.content)
+        output = io.BytesIO()
+        self.assertTrue(GPXConverter().convert_to_universal_format(gpx_data, output))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_file = Path(temp_dir) / "universal.gpx"
+            GPXConverter().convert_to_universal_format(gpx_data, str(output_file))
+            self.assertEqual(self._strip_conversion_date(output.getvalue()),
+                             self._strip_conversion_date(output_file.read_bytes()))
+
+            improved_file = Path(temp_dir) / "improved.gpx"
+            improved = io.BytesIO()
+            self.assertTrue(convert_gpx(str(self.file_path), str(improved_file)))
+            self.assertTrue(convert_gpx(memoryview(self.content), improved))
+            self.assertEqual(self._strip_conversion_date(improved.getvalue()),
+                             self._strip_conversion_date(improved_file.read_bytes()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+トラック統計のテスト
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.universal_gpx_converter.parser import GPXParser
+from src.universal_gpx_converter.stats import (compute_statistics, cumulative_distance, elevation_gain_loss,
+                                               haversine, hysteresis_filter)
+from src.universal_gpx_converter.track_array import TrackArray
+
+
+class TestStats(unittest.TestCase):
+    """トラック統計のテストクラス"""
+
+    def test_distance_and_elevation(self):
+        """距離と累積標高のテスト"""
+        # 経線上の緯度1度は約111.2km
+        self.assertAlmostEqual(float(haversine(35.0, 139.0, 36.0, 139.0)) / 1000, 111.195, places=2)
+        np.testing.assert_allclose(cumulative_distance(np.array([35.0, 36.0, 37.0]), np.array([139.0] * 3)),
+                                   [0.0, 111195.08, 222390.16], rtol=1e-6)
+
+        # 1点ずつの不感帯と一致する
+        rng = np.random.default_rng(0)
+        for count in (1, 2, 7, 100, 1001):
+            values = np.cumsum(rng.normal(0, 3, count))
+            expected = [values[0]]
+            for value in values[1:]:
+                expected.append(min(max(expected[-1], value - 2.5), value + 2.5))
+            np.testing.assert_array_equal(hysteresis_filter(values, 5.0), expected)
+
+        # 幅より小さい上下動は数えない
+        self.assertEqual(elevation_gain_loss(np.array([100, 102, 100, 102, 100, np.nan, 120, 110])),
+                         (17.5, 5.0))
+
+    def test_compute_statistics(self):
+        """日付ごとの集計と辞書形式・列形式の一致のテスト"""
+        start = 1738281600 - 60  # 2025-01-30T23:59:00Z
+        track = TrackArray(35.0 + np.arange(7) * 0.001, np.full(7, 139.0),
+                           [10, 20, 30, 30, 20, 20, 20],
+                           [start, start + 30, start + 60, start + 90, start + 3690, start + 3720, start + 3750])
+        stats = compute_statistics(track, hysteresis=0)
+
+        self.assertEqual(stats['points'], 7)
+        self.assertAlmostEqual(stats['distance'], 6 * 111.195, delta=0.1)
+        self.assertEqual((stats['elevation_gain'], stats['elevation_loss']), (20.0, 10.0))
+        self.assertEqual(stats['elapsed_time'], 3750)
+        # 1時間の休憩の区間は移動時間に含めない
+        self.assertEqual(stats['moving_time'], 150)
+        self.assertAlmostEqual(stats['max_speed'], 111.195 / 30, places=2)
+        self.assertEqual([day['date'] for day in stats['days']], ['2025-01-30', '2025-01-31'])
+        self.assertEqual([day['points'] for day in stats['days']], [2, 5])
+        self.assertEqual([day['elevation_gain'] for day in stats['days']], [10.0, 10.0])
+        self.assertAlmostEqual(sum(day['distance'] for day in stats['days']), stats['distance'])
+
+        file_path = str(Path(__file__).parent / "test_data" / "yamareco.gpx")
+        expected = compute_statistics(GPXParser().parse_file(file_path, columnar=True)['all_points'])
+        stats = compute_statistics(GPXParser().parse_file(file_path)['all_points'])
+        self.assertEqual(stats['points'], expected['points'])
+        self.assertAlmostEqual(stats['distance'], expected['distance'], places=3)
+        self.assertAlmostEqual(stats['elevation_gain'], expected['elevation_gain'], places=3)
+        self.assertEqual(stats['moving_time'], expected['moving_time'])
+        self.assertEqual([day['points'] for day in stats['days']], [day['points'] for day in expected['days']])
+
+
+if __name__ == '__main__':
+    unittest.main()
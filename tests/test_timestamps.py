@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+タイムスタンプ一括変換のテスト
+"""
+
+import random
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.universal_gpx_converter.timestamps import (
+    NO_TIME, decode_datetime64, decode_timestamps, parse_datetime
+)
+
+
+class TestTimestamps(unittest.TestCase):
+    """タイムスタンプ変換のテストクラス"""
+
+    def test_fixed_layout_matches_fromisoformat(self):
+        """固定長形式の一括変換がfromisoformatと一致するかのテスト"""
+        rng = random.Random(0)
+        base = datetime(1900, 1, 1, tzinfo=timezone.utc)
+        values = [base + timedelta(seconds=rng.randrange(0, 200 * 365 * 86400)) for _ in range(5000)]
+        texts = [dt.strftime('%Y-%m-%dT%H:%M:%SZ') for dt in values]
+
+        expected = [int(dt.timestamp()) for dt in values]
+        self.assertEqual(decode_timestamps(texts).tolist(), expected)
+        self.assertEqual(decode_timestamps(texts, unit='ms').tolist(), [t * 1000 for t in expected])
+
+    def test_fallback_formats(self):
+        """小数秒やオフセットを含む形式のテスト"""
+        texts = [
+            '2025-01-30T23:32:36Z',
+            '2025-01-30T23:32:36.5Z',
+            '2025-01-30T23:32:36.123456789Z',
+            '2025-01-31T08:32:36+09:00',
+            '2025-01-30T18:32:36-0500',
+            '2025-01-30T23:32:36',
+            '2025-01-30 23:32:36Z',
+        ]
+        decoded = decode_timestamps(texts, unit='ms').tolist()
+        self.assertEqual(decoded, [1738279956000, 1738279956500, 1738279956123,
+                                   1738279956000, 1738279956000, 1738279956000,
+                                   1738279956000])
+
+    def test_invalid_values(self):
+        """欠損や不正な値のテスト"""
+        texts = [None, '', 'not a time', '2025-02-30T00:00:00Z', '2025-01-30T24:00:00Z',
+                 '２０２５-01-30T23:32:36Z']
+        self.assertEqual(decode_timestamps(texts).tolist(), [NO_TIME] * len(texts))
+        self.assertEqual(len(decode_timestamps([])), 0)
+
+    def test_datetime64(self):
+        """datetime64への変換のテスト"""
+        decoded = decode_datetime64(['2025-01-30T23:32:36Z', None])
+        self.assertEqual(decoded.dtype, np.dtype('datetime64[s]'))
+        self.assertEqual(str(decoded[0]), '2025-01-30T23:32:36')
+        self.assertTrue(np.isnat(decoded[1]))
+
+    def test_parse_datetime(self):
+        """単一の時間文字列の変換のテスト"""
+        self.assertEqual(parse_datetime('2025-01-30T23:32:36Z'),
+                         datetime(2025, 1, 30, 23, 32, 36, tzinfo=timezone.utc))
+        self.assertEqual(parse_datetime('2025-01-31T08:32:36.5+09:00').utcoffset(), timedelta(hours=9))
+        self.assertEqual(parse_datetime('2025-01-30T23:32:36.5Z').microsecond, 500000)
+        with self.assertRaises(ValueError):
+            parse_datetime('not a time')
+
+
+if __name__ == '__main__':
+    unittest.main()
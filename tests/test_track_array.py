@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+TrackArray（列指向トラックポイントコンテナ）のテスト
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.universal_gpx_converter.converter import GPXConverter
+from src.universal_gpx_converter.parser import GPXParser
+from src.universal_gpx_converter.services import YamarecoService
+from src.universal_gpx_converter.track_array import NO_TIME, TrackArray
+
+
+class TestTrackArray(unittest.TestCase):
+    """TrackArrayのテストクラス"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.points = [
+            {'lat': '34.93294', 'lon': '135.765692', 'ele': '35.2',
+             'time': '2025-01-30T23:32:36Z', 'extensions': {'hr': '120'}},
+            {'lat': '34.933004', 'lon': '135.766165', 'ele': None,
+             'time': '2025-01-30T23:33:29Z', 'extensions': {}},
+            {'lat': '34.933001', 'lon': '135.766369', 'ele': '35.8',
+             'time': None, 'extensions': {'hr': '125'}},
+        ]
+        self.test_dir = Path(__file__).parent / "test_data"
+
+    def test_from_points(self):
+        """辞書のリストから列を作成するテスト"""
+        track = TrackArray.from_points(self.points)
+
+        self.assertEqual(len(track), 3)
+        self.assertEqual(track.lat.dtype, np.float64)
+        self.assertEqual(track.ele.dtype, np.float64)
+        self.assertEqual(track.time.dtype, np.int64)
+        self.assertTrue(np.isnan(track.ele[1]))
+        self.assertEqual(track.time[2], NO_TIME)
+        self.assertEqual(track.time[0], 1738279956)
+        np.testing.assert_array_equal(track.sensors['hr'], np.array([120, np.nan, 125], dtype=np.float32))
+
+    def test_dict_view(self):
+        """互換用の辞書表現のテスト"""
+        track = TrackArray.from_points(self.points)
+
+        point = track[0]
+        self.assertEqual(point['lat'], '34.93294')
+        self.assertEqual(point['lon'], '135.765692')
+        self.assertEqual(point['ele'], '35.2')
+        self.assertEqual(point['time'], '2025-01-30T23:32:36Z')
+        self.assertEqual(point['extensions'], {'hr': '120'})
+        self.assertEqual(point['datetime'].isoformat(), '2025-01-30T23:32:36+00:00')
+
+        self.assertIsNone(track[1]['ele'])
+        self.assertIsNone(track[-1]['time'])
+        self.assertNotIn('datetime', track[-1])
+        self.assertEqual([p['lat'] for p in track], ['34.93294', '34.933004', '34.933001'])
+
+        with self.assertRaises(IndexError):
+            track[3]
+
+        # 標高・座標は元の値に戻せる10進数で、指数表記を使わない
+        track = TrackArray([0.00001, 35.0], [1e-07, 139.0], [1234567.8, 2999.95])
+        self.assertEqual([(p['lat'], p['lon'], p['ele']) for p in track],
+                         [('0.00001', '0.0000001', '1234567.8'), ('35', '139', '2999.95')])
+
+    def test_slice_and_concatenate(self):
+        """スライスと連結のテスト"""
+        track = TrackArray.from_points(self.points)
+
+        head = track[:2]
+        self.assertIsInstance(head, TrackArray)
+        self.assertEqual(len(head), 2)
+        # スライスは列のビューを共有する
+        head.ele[0] = 40.0
+        self.assertEqual(track.ele[0], 40.0)
+
+        other = TrackArray([1.0], [2.0], [3.0], [1738279956])
+        merged = TrackArray.concatenate([track, other])
+        self.assertEqual(len(merged), 4)
+        self.assertTrue(np.isnan(merged.sensors['hr'][3]))
+
+    def test_round(self):
+        """丸めたコピーが桁数の指定を引き継ぐかのテスト"""
+        track = TrackArray.from_points(self.points).with_precision(6, 1)
+
+        copied = track.round(4, 0)
+        self.assertIsNot(copied, track)
+        self.assertEqual(copied.precision, (6, 1))
+        rounded = track.round(4, 0, in_place=True)
+        self.assertIs(rounded, track)
+        self.assertEqual(copied.to_points(), rounded.to_points())
+        self.assertEqual(copied[0]['lat'], '34.932900')
+
+    def test_parse_columnar(self):
+        """列指向モードで解析するテスト"""
+        parser = GPXParser()
+        yamareco_gpx = str(self.test_dir / "yamareco.gpx")
+        expected = parser.parse_file(yamareco_gpx)
+        gpx_data = parser.parse_file(yamareco_gpx, columnar=True)
+
+        self.assertIsInstance(gpx_data['all_points'], TrackArray)
+        self.assertEqual(len(gpx_data['all_points']), len(expected['all_points']))
+        self.assertEqual(gpx_data['metadata'], expected['metadata'])
+        self.assertEqual([len(t['points']) for t in gpx_data['tracks']],
+                         [len(t['points']) for t in expected['tracks']])
+        np.testing.assert_array_equal(gpx_data['all_points'].lat,
+                                      [float(p['lat']) for p in expected['all_points']])
+        self.assertEqual(gpx_data['all_points'].time_strings(),
+                         [p['time'] for p in expected['all_points']])
+
+    def test_service_and_converter(self):
+        """サービスとコンバーターがTrackArrayを扱えるかのテスト"""
+        gpx_data = GPXParser().parse_file(str(self.test_dir / "yamareco.gpx"), columnar=True)
+        universal_data = YamarecoService().convert_to_universal(gpx_data)
+
+        self.assertIsInstance(universal_data['all_points'], TrackArray)
+        self.assertEqual(universal_data['all_points'][0]['lat'], '34.932939835')
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_file = os.path.join(temp_dir, "output.gpx")
+            self.assertTrue(GPXConverter().convert_to_universal_format(universal_data, output_file))
+            with open(output_file, encoding='utf-8') as f:
+                content = f.read()
+
+        self.assertEqual(content.count('<trkpt '), len(universal_data['all_points']))
+        self.assertIn('<trkpt lat="34.932939835" lon="135.765692369">', content)
+
+
+if __name__ == '__main__':
+    unittest.main()
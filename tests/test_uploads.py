@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+アップロードの保存のテスト
+"""
+
+import io
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.trailsync.uploads import DOCUMENT_SIZE_FACTOR, UploadStore
+from src.yamareco_to_runkeeper_improved import convert_gpx, parse_gpx
+
+
+class TestUploads(unittest.TestCase):
+    """アップロードの保存のテストクラス"""
+
+    def setUp(self):
+        """テスト前の準備"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = Path(__file__).parent / "test_data" / "yamareco.gpx"
+
+    def tearDown(self):
+        """テスト後の後処理"""
+        self.temp_dir.cleanup()
+
+    def test_document(self):
+        """解析済みの文書を再利用し、変換結果が同じになるかのテスト"""
+        store = UploadStore(self.temp_dir.name)
+        content = self.file_path.read_bytes()
+        upload = store.add("山行.gpx", content)
+        self.assertEqual(store.get(upload.id).filename, "山行.gpx")
+        self.assertEqual(Path(upload.path).read_bytes(), content)
+
+        loads = []
+
+        def load(upload):
+            loads.append(upload.id)
+            return parse_gpx(upload.path)
+
+        tree = store.document(upload.id, load)
+        self.assertIs(store.document(upload.id, load), tree)
+        self.assertEqual(loads, [upload.id])
+
+        # 解析済みの文書からの変換はファイルからの変換と同じ（元の文書は変更しない）
+        outputs = []
+        with redirect_stdout(io.StringIO()):
+            for source in (content, tree, tree):
+                output = io.BytesIO()
+                self.assertTrue(convert_gpx(source, output, keep_source=False, coordinate_precision=5))
+                outputs.append(output.getvalue())
+        self.assertEqual(outputs[1], outputs[0])
+        self.assertEqual(outputs[2], outputs[0])
+
+        # 削除したアップロードは参照できない
+        store.remove(upload.id)
+        self.assertIsNone(store.get(upload.id))
+        self.assertIsNone(store.document(upload.id, load))
+        self.assertEqual(loads, [upload.id])
+
+    def test_evict_documents(self):
+        """解析済みの文書の件数とメモリ使用量（推定）の上限のテスト"""
+        store = UploadStore(self.temp_dir.name, max_documents=2, max_document_bytes=250 * DOCUMENT_SIZE_FACTOR)
+        uploads = [store.add(f"{i}.gpx", b'x' * 100) for i in range(3)]
+        loads = []
+
+        def load(upload):
+            loads.append(upload.filename)
+            return upload.filename
+
+        for upload in uploads[:2]:
+            store.document(upload.id, load)
+        store.document(uploads[0].id, load)
+        # 3件目で最後に使われた時刻が古い2件目を削除
+        store.document(uploads[2].id, load)
+        store.document(uploads[0].id, load)
+        store.document(uploads[1].id, load)
+        self.assertEqual(loads, ["0.gpx", "1.gpx", "2.gpx", "1.gpx"])
+
+        # メモリ使用量はファイルのサイズから推定し、上限を超える文書も直近の1件は保持する
+        store.max_document_bytes = 50 * DOCUMENT_SIZE_FACTOR
+        store.document(uploads[2].id, load)
+        store.document(uploads[2].id, load)
+        self.assertEqual(loads, ["0.gpx", "1.gpx", "2.gpx", "1.gpx", "2.gpx"])
+
+
+if __name__ == '__main__':
+    unittest.main()
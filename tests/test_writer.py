@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+GPXストリーミング出力のテスト
+"""
+
+import io
+import sys
+import unittest
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from xml.dom import minidom
+
+# テスト対象のモジュールをインポート
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.universal_gpx_converter.converter import GPXConverter
+from src.universal_gpx_converter.parser import GPXParser
+from src.universal_gpx_converter.services import StravaService
+from src.universal_gpx_converter.writer import GPXWriter
+
+# Garmin拡張データを含むGPX
+GARMIN_GPX = b'''<?xml version="1.0" encoding="UTF-8"?>
+<gpx xmlns="http://www.topografix.com/GPX/1/1" creator="StravaGPX" version="1.1"
+     xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v1">
+  <metadata><name>Morning &amp; "Run"</name></metadata>
+  <trk><name>Run</name><type>running</type><trkseg>
+    <trkpt lat="34.9" lon="135.7"><ele>10</ele><time>2025-01-30T23:32:36Z</time>
+      <extensions><gpxtpx:TrackPointExtension><gpxtpx:hr>120</gpxtpx:hr></gpxtpx:TrackPointExtension></extensions>
+    </trkpt>
+    <trkpt lat="34.8" lon="135.6"><time>2025-01-30T23:32:40Z</time></trkpt>
+  </trkseg></trk>
+</gpx>'''
+
+
+class TestGPXWriter(unittest.TestCase):
+    """GPXWriterのテストクラス"""
+
+    def test_matches_toprettyxml(self):
+        """minidomのtoprettyxmlと同じ形式で出力されるかのテスト"""
+        root = ET.Element('gpx', {'version': '1.1', 'creator': 'a & "b"'})
+        metadata = ET.SubElement(root, 'metadata')
+        ET.SubElement(metadata, 'name').text = '<A> & "B"'
+        ET.SubElement(metadata, 'empty')
+        trkseg = ET.SubElement(ET.SubElement(root, 'trk'), 'trkseg')
+        for lat, ele, time in [('1.0', '10', '2025-01-01T00:00:00Z'), ('1.1', None, None), ('1.2', '', 'x')]:
+            trkpt = ET.SubElement(trkseg, 'trkpt', {'lat': lat, 'lon': '2.0'})
+            if ele:
+                ET.SubElement(trkpt, 'ele').text = ele
+            if time:
+                ET.SubElement(trkpt, 'time').text = time
+        expected = minidom.parseString(ET.tostring(root)).toprettyxml(indent="  ")
+        expected = expected.replace('<?xml version="1.0" ?>', '<?xml version="1.0" encoding="UTF-8"?>')
+
+        output = io.BytesIO()
+        writer = GPXWriter(output)
+        writer.declaration()
+        writer.start('gpx', {'version': '1.1', 'creator': 'a & "b"'})
+        writer.start('metadata')
+        writer.element('name', '<A> & "B"')
+        writer.start('empty')
+        writer.end()
+        writer.end()
+        writer.start('trk')
+        writer.start('trkseg')
+        writer.trackpoint('1.0', '2.0', '10', '2025-01-01T00:00:00Z')
+        writer.trackpoint('1.1', '2.0')
+        writer.start('trkpt', {'lat': '1.2', 'lon': '2.0'})
+        writer.element('time', 'x')
+        writer.close()
+
+        self.assertEqual(output.getvalue().decode('utf-8'), expected)
+
+    def test_converter_namespaces(self):
+        """拡張データを含むデータを変換でき、名前空間が1回ずつ宣言されるかのテスト"""
+        gpx_data = StravaService().convert_to_universal(GPXParser().parse_file(GARMIN_GPX))
+        outputs = []
+        for indent in ["  ", None]:
+            output = io.BytesIO()
+            self.assertTrue(GPXConverter().convert_to_universal_format(gpx_data, output, indent=indent))
+            outputs.append(output.getvalue())
+
+        header = outputs[0].split(b'\n')[1]
+        self.assertEqual(header.count(b'xmlns:gpxtpx='), 1)
+        self.assertEqual(header.count(b'xmlns:strava='), 1)
+        self.assertEqual(len(outputs[1].split(b'\n')), 2)
+
+        for output in outputs:
+            root = ET.fromstring(output)
+            ns = {'gpx': 'http://www.topografix.com/GPX/1/1',
+                  'gpxtpx': 'http://www.garmin.com/xmlschemas/TrackPointExtension/v1'}
+            self.assertEqual(root.find('gpx:metadata/gpx:name', ns).text, 'Morning & "Run"')
+            self.assertEqual(root.find('.//gpxtpx:hr', ns).text, '120')
+            self.assertEqual(len(root.findall('.//gpx:trkpt', ns)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()